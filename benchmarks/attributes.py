@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+"""
+Attribute access benchmark: cell attribute reads and writes per second.
+
+Reading a cell attribute is the commonest thing a program using cells
+does, mostly from inside rules. Four kinds of access are timed:
+
+  - reading an input cell's attribute outside of any rule
+  - reading a rule cell's attribute outside of any rule
+  - reading input cells' attributes from inside a rule, which also
+    records the reads as dependencies
+  - setting an input cell's attribute which nothing reads
+
+Run from the top of the source tree:
+
+    $ python benchmarks/attributes.py [count] [--quick] [-o FILE]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import cells
+
+#: how many attributes the rule in L{rule_reads} reads per run
+WIDTH = 10
+
+
+class Reads(cells.Model):
+    a = cells.makecell(value=1)
+    b = cells.makecell(value=2)
+    c = cells.makecell(value=3)
+    d = cells.makecell(value=4)
+    e = cells.makecell(value=5)
+    f = cells.makecell(value=6)
+    g = cells.makecell(value=7)
+    h = cells.makecell(value=8)
+    i = cells.makecell(value=9)
+    j = cells.makecell(value=10)
+
+    loops = cells.makecell(value=0)
+    unread = cells.makecell(value=0)
+
+    @cells.fun2cell()
+    def total(model, prev):
+        return model.a + model.b + model.c
+
+    @cells.fun2cell()
+    def reader(model, prev):
+        total = 0
+        for n in range(model.loops):
+            total += (model.a + model.b + model.c + model.d + model.e +
+                      model.f + model.g + model.h + model.i + model.j)
+        return total
+
+
+def input_reads(model, count):
+    for n in range(count // 10):
+        model.a; model.a; model.a; model.a; model.a
+        model.a; model.a; model.a; model.a; model.a
+
+
+def rule_reads(model, count):
+    model.loops = count // WIDTH  # the rule does the reads
+
+
+def outside_rule_reads(model, count):
+    for n in range(count // 10):
+        model.total; model.total; model.total; model.total; model.total
+        model.total; model.total; model.total; model.total; model.total
+
+
+def writes(model, count):
+    for n in range(count):
+        model.unread = n
+
+
+def rate(test, count, repeat=5):
+    """
+    rate(test, count, repeat=5) -> float
+
+    Returns how many accesses per second C{test(model, count)} does,
+    the best of C{repeat} tries.
+    """
+    best = None
+    for n in range(repeat):
+        cells.reset()
+        model = Reads()
+        start = time.perf_counter()
+        test(model, count)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return count / best
+
+
+def run(count=200000):
+    """
+    run(count=200000) -> dict
+
+    Returns a mapping of access kind to accesses per second.
+    """
+    return {
+        "input reads": rate(input_reads, count),
+        "rule cell reads": rate(outside_rule_reads, count),
+        "reads in a rule": rate(rule_reads, count),
+        "writes": rate(writes, count // 10),
+    }
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Times cell attribute reads and writes.")
+    parser.add_argument("count", type=int, nargs="?", default=200000,
+                        help="how many accesses of each kind to time"
+                        " (default: %(default)s)")
+    parser.add_argument("-o", "--output",
+                        help="where to write the results as JSON")
+    parser.add_argument("--quick", action="store_true",
+                        help="use a small count (10000)")
+    args = parser.parse_args(argv[1:])
+    count = 10000 if args.quick else args.count
+
+    results = run(count)
+    for name in ("input reads", "rule cell reads", "reads in a rule",
+                 "writes"):
+        print("%-16s %12.0f /s" % (name, results[name]))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print("wrote " + args.output)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+"""
+Memory benchmark: bytes per cell.
+
+Builds a large number of cells and reports the memory each one costs,
+as measured by tracemalloc. Three shapes are measured:
+
+  - an C{InputCell} which nothing reads
+  - a C{RuleCell} which hasn't run yet
+  - a C{RuleCell} which has run, reading one C{InputCell} (the bytes
+    for the edge on both sides are charged to the rule)
+
+and two shapes of model, per model:
+
+  - a model with eight input cells, all left at their defaults
+  - the same model with one of them set
+
+Run from the top of the source tree:
+
+    $ python benchmarks/memory.py [count] [--quick] [-o FILE]
+"""
+
+import os
+import sys
+import gc
+import json
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import cells
+
+
+def measure(build, count):
+    """
+    measure(build, count) -> float
+
+    Returns the bytes allocated per call of C{build()}, averaged over
+    C{count} calls. The built objects are kept alive until measured.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    keep = [build(n) for n in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    total = sum(stat.size_diff for stat in stats)
+    # don't charge the list holding the cells to them
+    total -= sys.getsizeof(keep)
+    del keep
+    return total / float(count)
+
+
+def input_cell(n):
+    return cells.InputCell(None, n, name="x")
+
+
+def rule_cell(n):
+    return cells.RuleCell(None, name="r", rule=_read_nothing)
+
+
+def _read_nothing(model, prev):
+    return None
+
+
+class _Shared(object):
+    source = cells.InputCell(None, 1, name="source")
+
+
+def linked_rule_cell(n):
+    cell = cells.RuleCell(None, name="r", rule=_read_source)
+    cell.getvalue()
+    return cell
+
+
+def _read_source(model, prev):
+    return _Shared.source.getvalue()
+
+
+class Settings(cells.Model):
+    a = cells.makecell(value=1)
+    b = cells.makecell(value=2)
+    c = cells.makecell(value=3)
+    d = cells.makecell(value=4)
+    e = cells.makecell(value="e")
+    f = cells.makecell(value="f")
+    g = cells.makecell(value=None)
+    h = cells.makecell(value=None)
+
+
+def default_model(n):
+    return Settings()
+
+
+def one_set_model(n):
+    model = Settings()
+    model.a = n
+    return model
+
+
+def run(count=20000):
+    """
+    run(count=20000) -> dict
+
+    Returns a mapping of shape name to bytes per cell, or per model
+    for the model shapes.
+    """
+    cells.reset()
+    results = {}
+    results["InputCell"] = measure(input_cell, count)
+    results["RuleCell (unrun)"] = measure(rule_cell, count)
+    results["RuleCell (one edge)"] = measure(linked_rule_cell, count)
+    results["Model (defaults)"] = measure(default_model, count)
+    results["Model (one set)"] = measure(one_set_model, count)
+    return results
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Measures the bytes each cell and model costs.")
+    parser.add_argument("count", type=int, nargs="?", default=20000,
+                        help="how many of each shape to build"
+                        " (default: %(default)s)")
+    parser.add_argument("-o", "--output",
+                        help="where to write the results as JSON")
+    parser.add_argument("--quick", action="store_true",
+                        help="use a small count (1000)")
+    args = parser.parse_args(argv[1:])
+    count = 1000 if args.quick else args.count
+
+    results = run(count)
+    for name, size in sorted(results.items()):
+        unit = "model" if name.startswith("Model") else "cell"
+        print("%-22s %8.1f bytes/%s" % (name, size, unit))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print("wrote " + args.output)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
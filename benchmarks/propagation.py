@@ -0,0 +1,450 @@
+#!/usr/bin/env python
+
+"""
+Propogation benchmarks: what a set costs, over a range of topologies.
+
+Each benchmark builds a graph, then times a run of sets, each of
+which propogates before the set returns (set->settled latency). For
+each it records:
+
+  - C{build_seconds}: how long building the graph took
+  - C{latency}: the mean, median, 95th percentile and worst seconds
+    per set
+  - C{throughput}: sets per second
+  - C{rule_runs_per_set}: rule runs per set, counted by a tracer in a
+    separate run of sets
+  - C{peak_rss_kb}: the peak resident set of the benchmark's
+    process, interpreter included
+
+Every benchmark runs in a fresh process, so garbage from one doesn't
+land on another and the peak memory is its own. The results are
+written as JSON, tagged with the commit they were taken at, to
+C{benchmarks/results/propagation-<commit>.json} unless C{-o} says
+otherwise, so runs of different engine versions can be compared:
+
+    $ python benchmarks/propagation.py
+    $ git checkout my-branch
+    $ python benchmarks/propagation.py \
+          --compare benchmarks/results/propagation-<commit>.json
+
+Run from the top of the source tree. C{--quick} uses small sizes, for
+checking that the benchmarks run; C{--only chain,grid} runs just the
+named ones. The benchmarks are:
+
+  - C{chain}: a linear chain of rules off one input
+  - C{fanout}: one input read by many rules
+  - C{fanin}: many inputs summed by one rule; each set changes one
+  - C{diamond}: a lattice in which each rule reads two rules of the
+    rank below
+  - C{random_dag}: rules reading one to three random earlier cells
+  - C{grid}: a spreadsheet, each cell the sum of the cells above and
+    to the left of it; the sets change the top row
+  - C{family}: a L{cells.Family} whose total sums its kids' rules;
+    the sets change one kid
+  - C{dict_churn}: rules each reading one key of a L{cells.DictCell}
+    whose keys are set in turn
+  - C{list_churn}: rules over a L{cells.ListCell} which is appended
+    to and popped in turn
+  - C{observers}: a model whose rules are watched by many observers
+"""
+
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import cells
+
+try:
+    import resource
+except ImportError:  # not on this platform; no memory figures
+    resource = None
+
+#: name -> (builder, (size, sets), (quick size, quick sets))
+BENCHMARKS = {}
+ORDER = []
+
+
+def benchmark(size, sets, quick_size, quick_sets):
+    """
+    benchmark(size, sets, quick_size, quick_sets) -> decorator
+
+    Registers a builder. The builder is called as C{builder(size,
+    rng)} and returns a function C{step(n)} doing the C{n}th set.
+    """
+    def register(builder):
+        BENCHMARKS[builder.__name__] = (builder, (size, sets),
+                                        (quick_size, quick_sets))
+        ORDER.append(builder.__name__)
+        return builder
+    return register
+
+
+def _model(name, attrs):
+    """Returns a new Model subclass with the given cell attributes"""
+    return type(name, (cells.Model,), attrs)
+
+
+def _rule_reading(*names):
+    """Returns a rule summing the named attributes of its model"""
+    def rule(model, prev):
+        total = 0
+        for name in names:
+            total += getattr(model, name)
+        return total
+    return rule
+
+
+@benchmark(1000, 200, 100, 20)
+def chain(size, rng):
+    attrs = {"c0": cells.makecell(value=0)}
+    for n in range(1, size):
+        attrs["c%d" % n] = cells.makecell(rule=_rule_reading("c%d" % (n - 1)))
+    model = _model("Chain", attrs)()
+
+    def step(n):
+        model.c0 = n + 1
+    return step
+
+
+@benchmark(10000, 50, 500, 20)
+def fanout(size, rng):
+    attrs = {"x": cells.makecell(value=0)}
+    for n in range(size):
+        attrs["r%d" % n] = cells.makecell(
+            rule=(lambda k: lambda model, prev: model.x + k)(n))
+    model = _model("FanOut", attrs)()
+
+    def step(n):
+        model.x = n + 1
+    return step
+
+
+@benchmark(10000, 200, 500, 20)
+def fanin(size, rng):
+    names = ["i%d" % n for n in range(size)]
+    attrs = dict((name, cells.makecell(value=0)) for name in names)
+    attrs["total"] = cells.makecell(rule=_rule_reading(*names))
+    model = _model("FanIn", attrs)()
+
+    def step(n):
+        setattr(model, names[n % size], n + 1)
+    return step
+
+
+@benchmark(200, 50, 20, 20)
+def diamond(size, rng, width=8):
+    attrs = {"x": cells.makecell(value=0)}
+    below = ["x"] * width
+    for rank in range(size):
+        names = ["d%d_%d" % (rank, n) for n in range(width)]
+        for n, name in enumerate(names):
+            attrs[name] = cells.makecell(rule=_rule_reading(
+                below[n], below[(n + 1) % width]))
+        below = names
+    model = _model("Diamond", attrs)()
+
+    def step(n):
+        model.x = n + 1
+    return step
+
+
+@benchmark(5000, 200, 500, 20)
+def random_dag(size, rng, inputs=100):
+    names = ["n%d" % n for n in range(size)]
+    attrs = {}
+    for n, name in enumerate(names):
+        if n < inputs:
+            attrs[name] = cells.makecell(value=0)
+        else:
+            reads = rng.sample(names[:n], rng.randint(1, 3))
+            attrs[name] = cells.makecell(rule=_rule_reading(*reads))
+    model = _model("RandomDAG", attrs)()
+    order = [rng.randrange(inputs) for n in range(1000)]
+
+    def step(n):
+        setattr(model, names[order[n % len(order)]], n + 1)
+    return step
+
+
+@benchmark(60, 20, 15, 20)
+def grid(size, rng):
+    attrs = {}
+    for row in range(size):
+        for col in range(size):
+            name = "c%d_%d" % (row, col)
+            if row == 0 or col == 0:
+                attrs[name] = cells.makecell(value=1)
+            else:
+                attrs[name] = cells.makecell(rule=_rule_reading(
+                    "c%d_%d" % (row - 1, col), "c%d_%d" % (row, col - 1)))
+    model = _model("Grid", attrs)()
+
+    def step(n):
+        setattr(model, "c0_%d" % (1 + n % (size - 1)), n + 2)
+    return step
+
+
+class Kid(cells.Family):
+    x = cells.makecell(value=1)
+    y = cells.makecell(rule=lambda model, prev: model.x * 3)
+
+
+class Parent(cells.Family):
+    kid_slots = cells.makecell(value=Kid)
+    total = cells.makecell(
+        rule=lambda model, prev: sum(kid.y for kid in model.kids))
+
+
+@benchmark(100000, 10, 1000, 10)
+def family(size, rng):
+    parent = Parent()
+    # one datapulse for all the kids, rather than one each
+    with cells.transaction():
+        for n in range(size):
+            parent.make_kid(Kid)
+
+    def step(n):
+        parent.kids[n % size].x = n + 2
+    return step
+
+
+@benchmark(1000, 200, 100, 20)
+def dict_churn(size, rng, readers=100):
+    attrs = {"d": cells.makecell(celltype=cells.DictCell, value=dict(
+        ("k%d" % n, 0) for n in range(size)))}
+    for n in range(readers):
+        attrs["r%d" % n] = cells.makecell(
+            rule=(lambda key: lambda model, prev: model.d.get(key))(
+                "k%d" % n))
+    model = _model("DictChurn", attrs)()
+
+    def step(n):
+        model.d["k%d" % (n % size)] = n + 1
+    return step
+
+
+@benchmark(1000, 200, 100, 20)
+def list_churn(size, rng):
+    class ListChurn(cells.Model):
+        l = cells.makecell(celltype=cells.ListCell, value=list(range(size)))
+        length = cells.makecell(rule=lambda model, prev: len(model.l))
+        total = cells.makecell(rule=lambda model, prev: sum(model.l))
+        last = cells.makecell(rule=lambda model, prev: model.l[-1])
+    model = ListChurn()
+
+    def step(n):
+        if n % 2:
+            model.l.pop()
+        else:
+            model.l.append(n)
+    return step
+
+
+@benchmark(200, 100, 20, 20)
+def observers(size, rng):
+    attrs = {"x": cells.makecell(value=0)}
+    names = ["r%d" % n for n in range(size)]
+    for n, name in enumerate(names):
+        attrs[name] = cells.makecell(
+            rule=(lambda k: lambda model, prev: model.x + k)(n))
+    Observed = _model("Observed", attrs)
+    fired = []
+    for name in names:
+        def observe(model):
+            fired.append(1)
+        observe.__name__ = "observe_" + name  # observers go by name
+        Observed.observer(attrib=name)(observe)
+    model = Observed()
+
+    def step(n):
+        model.x = n + 1
+    return step
+
+
+class _RunCounter(cells.Tracer):
+    def __init__(self):
+        self.runs = 0
+
+    def on_run(self, cell, changed, elapsed):
+        self.runs += 1
+
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # bytes there, kilobytes elsewhere
+        peak //= 1024
+    return peak
+
+
+def measure(name, size, sets, seed=0):
+    """
+    measure(name, size, sets, seed=0) -> dict
+
+    Builds benchmark C{name} at C{size} in this process and returns
+    its figures. Meant to be run in a fresh process; see L{run}.
+    """
+    builder = BENCHMARKS[name][0]
+    cells.reset()
+
+    start = time.perf_counter()
+    step = builder(size, random.Random(seed))
+    build = time.perf_counter() - start
+
+    n = 0
+    for n in range(min(5, sets)):  # warm up
+        step(n)
+
+    latencies = []
+    for n in range(n + 1, n + 1 + sets):
+        start = time.perf_counter()
+        step(n)
+        latencies.append(time.perf_counter() - start)
+
+    counter = _RunCounter()
+    counted = min(sets, 20)
+    old = cells.set_tracer(counter)
+    try:
+        for n in range(n + 1, n + 1 + counted):
+            step(n)
+    finally:
+        cells.set_tracer(old)
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "name": name,
+        "size": size,
+        "sets": sets,
+        "build_seconds": build,
+        "latency": {
+            "mean": total / len(latencies),
+            "median": latencies[len(latencies) // 2],
+            "p95": latencies[int(0.95 * (len(latencies) - 1))],
+            "max": latencies[-1],
+        },
+        "throughput": len(latencies) / total if total else None,
+        "rule_runs_per_set": counter.runs / float(counted),
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+
+def _commit():
+    try:
+        out = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.decode("ascii").strip()
+
+
+def run(names=None, quick=False):
+    """
+    run(names=None, quick=False) -> dict
+
+    Runs the named benchmarks (by default, all of them), each in a
+    fresh process, and returns the report L{main} writes as JSON.
+    """
+    results = []
+    for name in names or ORDER:
+        builder, full, small = BENCHMARKS[name]
+        size, sets = small if quick else full
+        out = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), "--child", name,
+             str(size), str(sets)])
+        results.append(json.loads(out.decode("utf-8")))
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "quick": quick,
+        "benchmarks": results,
+    }
+
+
+def print_report(report, baseline=None, out=None):
+    """
+    print_report(report, baseline=None, out=None) -> None
+
+    Prints a table of C{report}, with the change in median latency
+    from C{baseline}, an earlier report, where it has the same
+    benchmark at the same size.
+    """
+    out = out or sys.stdout
+    before = {}
+    if baseline:
+        for result in baseline["benchmarks"]:
+            before[(result["name"], result["size"])] = result
+    out.write("%-11s %7s %9s %11s %11s %10s %9s %10s\n" %
+              ("benchmark", "size", "build s", "median ms", "p95 ms",
+               "sets/s", "runs/set", "peak KB"))
+    for result in report["benchmarks"]:
+        latency = result["latency"]
+        line = "%-11s %7d %9.3f %11.3f %11.3f %10.1f %9.1f %10s" % (
+            result["name"], result["size"], result["build_seconds"],
+            latency["median"] * 1000, latency["p95"] * 1000,
+            result["throughput"] or 0, result["rule_runs_per_set"],
+            result["peak_rss_kb"])
+        old = before.get((result["name"], result["size"]))
+        if old:
+            line += "  %+6.1f%%" % (
+                (latency["median"] / old["latency"]["median"] - 1) * 100)
+        out.write(line + "\n")
+
+
+def main(argv):
+    if argv[1:2] == ["--child"]:
+        name, size, sets = argv[2], int(argv[3]), int(argv[4])
+        sys.stdout.write(json.dumps(measure(name, size, sets)))
+        return
+
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Times propogation over a range of topologies.")
+    parser.add_argument("-o", "--output",
+                        help="where to write the JSON report (default: "
+                        "benchmarks/results/propagation-<commit>.json)")
+    parser.add_argument("--only", help="comma-separated benchmarks to run")
+    parser.add_argument("--quick", action="store_true",
+                        help="use small sizes")
+    parser.add_argument("--compare", metavar="JSON",
+                        help="an earlier report to compare against")
+    args = parser.parse_args(argv[1:])
+
+    names = args.only.split(",") if args.only else None
+    for name in names or ():
+        if name not in BENCHMARKS:
+            parser.error("no benchmark %r; there are %s" %
+                         (name, ", ".join(ORDER)))
+    report = run(names, args.quick)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    output = args.output
+    if not output:
+        results = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               "results")
+        if not os.path.isdir(results):
+            os.makedirs(results)
+        output = os.path.join(results, "propagation-%s.json" %
+                              (report["commit"] or "unknown"))
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print("wrote " + output)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+"""
+Warm restart benchmark: restoring models from a snapshot against
+building them again.
+
+Builds a hub model and C{count} spokes, each with two inputs and
+three rules (one reading the hub), and times:
+
+  - building them, which runs every rule
+  - taking a snapshot of them with C{cells.snapshot}
+  - restoring them with C{cells.restore}, which runs no rules
+
+Run from the top of the source tree:
+
+    $ python benchmarks/snapshots.py [count] [--quick] [-o FILE]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import cells
+
+
+def weighted(model, prev):
+    return model.x * model.weight
+
+
+def scaled(model, prev):
+    return model.weighted * model.hub.scale
+
+
+def label(model, prev):
+    return "%s=%d" % (model.model_name, model.scaled)
+
+
+class Hub(cells.Model):
+    scale = cells.makecell(value=2)
+
+
+class Spoke(cells.Model):
+    x = cells.makecell(value=0)
+    weight = cells.makecell(value=1)
+    hub = cells.makecell(value=None)
+    weighted = cells.makecell(rule=weighted)
+    scaled = cells.makecell(rule=scaled)
+    label = cells.makecell(rule=label)
+
+
+def build(count):
+    hub = Hub()
+    return [Spoke(hub=hub, x=n, weight=n % 7, model_name="s%d" % n)
+            for n in range(count)]
+
+
+def run(count=20000):
+    """
+    run(count=20000) -> dict
+
+    Returns the seconds each step took, and the snapshot's size.
+    """
+    cells.reset()
+    start = time.perf_counter()
+    spokes = build(count)
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    blob = cells.snapshot(spokes)
+    snapped = time.perf_counter() - start
+
+    start = time.perf_counter()
+    restored = cells.restore(blob)
+    restoring = time.perf_counter() - start
+
+    assert [s.label for s in restored] == [s.label for s in spokes]
+    return {"build": built, "snapshot": snapped, "restore": restoring,
+            "bytes": len(blob)}
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Times restoring models from a snapshot against "
+        "building them.")
+    parser.add_argument("count", type=int, nargs="?", default=20000,
+                        help="how many spoke models to build"
+                        " (default: %(default)s)")
+    parser.add_argument("-o", "--output",
+                        help="where to write the results as JSON")
+    parser.add_argument("--quick", action="store_true",
+                        help="use a small count (1000)")
+    args = parser.parse_args(argv[1:])
+    count = 1000 if args.quick else args.count
+
+    results = run(count)
+    for step in ("build", "snapshot", "restore"):
+        print("%-10s %8.3f s  %6.1f us/model" %
+              (step, results[step], results[step] / count * 1e6))
+    print("%-10s %8d bytes  %6.1f bytes/model" %
+          ("size", results["bytes"], results["bytes"] / float(count)))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print("wrote " + args.output)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+
+"""
+Tracing benchmark: what propogation costs with and without a tracer.
+
+Builds a model whose input fans out to a number of observed rules,
+each heading a short chain, then times setting the input and letting
+the change propogate. Three configurations are timed:
+
+  - no tracer installed, the normal case, which should cost nothing
+    beyond an attribute check per event
+  - a L{cells.Tracer} whose hooks do nothing, which measures the
+    cost of the events themselves
+  - a L{cells.Tracer} which counts the events it sees
+
+Each configuration runs in a fresh process. C{--compare REV} also
+times the no-tracer case with the C{cells} package of an earlier
+commit, extracted with C{git archive}, so the cost the hooks replaced
+(or added) shows up as a before/after figure:
+
+    $ python benchmarks/tracing.py --compare HEAD~1
+
+Run from the top of the source tree:
+
+    $ python benchmarks/tracing.py [width] [sets] [--compare REV]
+"""
+
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+if sys.argv[1:2] == ["--child"]:  # run against the tree it was given
+    sys.path.insert(0, sys.argv[2])
+else:
+    sys.path.insert(0, os.path.join(HERE, ".."))
+import cells
+
+CONFIGS = ("no tracer", "no-op tracer", "counting tracer")
+
+
+def _counter():
+    """Returns a tracer counting the events of each kind."""
+    class Counter(cells.Tracer):
+        def __init__(self):
+            self.counts = {"set": 0, "run": 0, "propagate": 0,
+                           "observer": 0}
+
+        def on_set(self, cell, value):
+            self.counts["set"] += 1
+
+        def on_run(self, cell, changed, elapsed):
+            self.counts["run"] += 1
+
+        def on_propagate(self, world, changed):
+            self.counts["propagate"] += 1
+
+        def on_observer(self, observer, model, elapsed):
+            self.counts["observer"] += 1
+
+    return Counter()
+
+
+def build(width):
+    """
+    build(width) -> Model
+
+    Returns a model with an input cell C{x} read by C{width} rules,
+    each read by a rule of its own; an observer watches the second
+    rank.
+    """
+    attrs = {"x": cells.makecell(value=0)}
+    for n in range(width):
+        attrs["a%d" % n] = cells.makecell(
+            rule=(lambda k: lambda model, prev: model.x + k)(n))
+        attrs["b%d" % n] = cells.makecell(
+            rule=(lambda k: lambda model, prev:
+                  getattr(model, "a%d" % k) * 2)(n))
+    Fan = type("Fan", (cells.Model,), attrs)
+    seen = []
+
+    @Fan.observer(attrib=["b%d" % n for n in range(width)])
+    def watch(model):
+        seen.append(1)
+
+    return Fan()
+
+
+def time_sets(model, sets):
+    """
+    time_sets(model, sets) -> float
+
+    Returns the seconds each set of C{model.x} takes to propogate.
+    """
+    start = time.perf_counter()
+    for n in range(sets):
+        model.x = n + 1
+    return (time.perf_counter() - start) / sets
+
+
+def measure(config, width, sets, repeat=5):
+    """
+    measure(config, width, sets, repeat=5) -> float
+
+    Returns the seconds per set of configuration C{config}, the best
+    of C{repeat} tries, in this process. Trees from before tracing
+    hooks existed can only run C{"no tracer"}.
+    """
+    tracer = {"no tracer": lambda: None,
+              "no-op tracer": lambda: cells.Tracer(),
+              "counting tracer": _counter}[config]()
+    cells.reset()
+    model = build(width)
+    old = cells.set_tracer(tracer) if tracer is not None else None
+    try:
+        time_sets(model, 10)  # warm up
+        return min(time_sets(model, sets) for n in range(repeat))
+    finally:
+        if tracer is not None:
+            cells.set_tracer(old)
+
+
+def _child(tree, config, width, sets):
+    """Runs L{measure} in a fresh process, against C{tree}"""
+    out = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), "--child", tree,
+         config, str(width), str(sets)])
+    return json.loads(out.decode("utf-8"))
+
+
+def _extract(rev, into):
+    """Writes the C{cells} package as of commit C{rev} under C{into}"""
+    archive = subprocess.check_output(["git", "archive", rev, "cells"],
+                                      cwd=os.path.join(HERE, ".."))
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(into)
+
+
+def run(width=200, sets=200, compare=None):
+    """
+    run(width=200, sets=200, compare=None) -> dict
+
+    Returns a mapping of configuration name to seconds per set, each
+    timed in a fresh process. With C{compare}, a commit, the
+    no-tracer case is also timed at that commit, as C{"baseline"}.
+    """
+    tree = os.path.join(HERE, "..")
+    results = dict((config, _child(tree, config, width, sets))
+                   for config in CONFIGS)
+    if compare:
+        scratch = tempfile.mkdtemp()
+        try:
+            _extract(compare, scratch)
+            results["baseline"] = _child(scratch, "no tracer", width, sets)
+        finally:
+            shutil.rmtree(scratch)
+    return results
+
+
+def main(argv):
+    if argv[1:2] == ["--child"]:
+        config, width, sets = argv[3], int(argv[4]), int(argv[5])
+        sys.stdout.write(json.dumps(measure(config, width, sets)))
+        return
+
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Times propogation with and without a tracer.")
+    parser.add_argument("width", type=int, nargs="?", default=200)
+    parser.add_argument("sets", type=int, nargs="?", default=200)
+    parser.add_argument("--compare", metavar="REV",
+                        help="an earlier commit to time without a tracer")
+    args = parser.parse_args(argv[1:])
+
+    results = run(args.width, args.sets, args.compare)
+    base = results["no tracer"]
+    names = list(CONFIGS)
+    if args.compare:
+        names.insert(0, "baseline")
+        print("baseline is %s" % args.compare)
+    for name in names:
+        print("%-16s %8.3f ms/set  (%+.1f%%)" %
+              (name, results[name] * 1000,
+               (results[name] / base - 1) * 100))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
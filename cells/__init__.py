@@ -31,7 +31,7 @@ A short example:
     ...     ratio = cells.makecell(value=1.618)
     ...     @cells.fun2cell()
     ...     def length(self, prev):
-    ...         print "Length updating..."
+    ...         print("Length updating...")
     ...         return float(self.width) * float(self.ratio)
     ... 
     >>> r = Rectangle()
@@ -46,29 +46,25 @@ A short example:
 
 @var DEBUG: Turns on debugging messages for *all* submodules. This is
     a whole lot of text, so you'll probably want to use the
-    submodules' C{DEBUG} flags instead
+    submodules' C{DEBUG} flags instead. Propogation itself isn't
+    covered; install a tracer with L{set_tracer} to follow it.
 
-@var cellenv: Thread-local cell environment variables.
+@var cellenv: The default L{World}, which cells created outside of a
+    C{with world:} block belong to.
 """
 DEBUG = False
 
 _DECO_OFFSET = 9                 #: for the debug '  module > ' messages
 
-import threading
-
-cellenv = threading.local()
-cellenv.dp = 0
-cellenv.curr = None
-cellenv.curr_propogator = None
-cellenv.queued_updates = []
-cellenv.deferred_sets = []
+from .world import World, current_world, EVALUATION_MODES
+from .world import default as cellenv
 
 from .cellattr import CellAttr
 
 def makecell(*args, **kwargs):
     """
     makecell(rule=None, value=None, unchanged_if=None,
-    celltype=None) -> CellAttr
+    celltype=None, memo=None, persist=False) -> CellAttr
 
     Creates a new cell attribute in a L{Model}. This attribute may be
     accessed as one would access a non-cell attribute, and
@@ -116,12 +112,23 @@ def makecell(*args, **kwargs):
     @param celltype: Set the cell type to generate. You must pass C{rule}
         or C{value} correctly. Refer to L{cells.cell} for available
         types.
+
+    @param memo: Remember the results of this many of the rule's most
+        recent runs, and reuse one when the cells it read return to
+        the values they held. See L{cells.memo}.
+
+    @param persist: Keep the rule's results in the L{Store}, on disk,
+        and reuse one when the cells it read hold values it has a
+        result for, in this process or a later one. True, or a
+        version to change when the rule's results do. See
+        L{cells.persist}.
     """
     return CellAttr(*args, **kwargs)
 
 def fun2cell(*args, **kwargs):
     """
-    fun2cell(unchanged_if=None, celltype=None) -> decorator
+    fun2cell(unchanged_if=None, celltype=None, memo=None,
+    persist=False) -> decorator
 
     A decorator which creates a new RuleCell using the decorated
     function as the C{rule} parameter.
@@ -156,6 +163,16 @@ def fun2cell(*args, **kwargs):
     @param celltype: Set the cell type to generate. You must pass C{rule}
         or C{value} correctly. Refer to L{cells.cell} for available
         types.
+
+    @param memo: Remember the results of this many of the rule's most
+        recent runs, and reuse one when the cells it read return to
+        the values they held. See L{cells.memo}.
+
+    @param persist: Keep the rule's results in the L{Store}, on disk,
+        and reuse one when the cells it read hold values it has a
+        result for, in this process or a later one. True, or a
+        version to change when the rule's results do. See
+        L{cells.persist}.
     """
     def fun2cell_decorator(func):        
         return CellAttr(rule=func, *args, **kwargs)
@@ -163,12 +180,22 @@ def fun2cell(*args, **kwargs):
 
 from .cell import Cell, InputCell, RuleCell, RuleThenInputCell, OnceAskedLazyCell
 from .cell import UntilAskedLazyCell, AlwaysLazyCell, DictCell, ListCell
+from .cell import DictChange
 from .cell import _CellException, RuleCellSetError
 from .cell import InputCellRunError, SetDuringNotificationError
+from .cell import CyclicDependencyError, AsyncCellPendingError
+from .aio import AsyncRuleCell, settle
 
 from .model import Model, NonCellSetError
 from .family import Family, FamilyTraversalError
 from .synapse import ChangeSynapse
+from .transaction import Transaction, transaction, batch
+from .trace import Tracer, PrintTracer, set_tracer
+from .profiler import Profile, profile
+from .export import export_graph
+from .dispatch import ObservedChange, flush_observers
+from .snapshots import snapshot, restore, SnapshotError
+from .persist import Store, set_store, StoreNotSetError
 
 def _debug(*msgs):
     """
@@ -183,17 +210,58 @@ def reset():
     """
     reset() -> None
 
-    Resets all of PyCells' globals back to their on-package-import
-    values.  This is a pretty dangerous thing to do if you care about
-    the currently-instantiated cells' state, but quite useful while
-    fooling around in an ipython session.
+    Resets the current L{World}'s propogation state back to its
+    on-creation values. This is a pretty dangerous thing to do if you
+    care about the currently-instantiated cells' state, but quite
+    useful while fooling around in an ipython session. The dependency
+    graph is kept, since live cells hold ids in it.
+    """
+    current_world().reset()
+
+def set_evaluation(mode):
+    """
+    set_evaluation(mode) -> str
+
+    Sets how the current L{World}'s rule cells are brought up to date
+    when something they depend on changes, and returns the previous
+    mode:
+
+      - C{"push"} (the default): every affected rule is rerun during
+        the datapulse which changed it.
+
+      - C{"pull"}: the datapulse only marks the affected rules
+        stale. A stale rule reruns when it's next read, or during the
+        datapulse if an observer watches it.
+
+    A L{Model} class may choose its own mode with an C{evaluation}
+    class attribute, which wins over this one.
+
+    @raise ValueError: If C{mode} isn't one of L{EVALUATION_MODES}
+    """
+    return current_world().set_evaluation(mode)
+
+def set_executor(executor):
+    """
+    set_executor(executor) -> executor
+
+    Runs the current L{World}'s rules on C{executor}, a
+    C{concurrent.futures} thread pool, and returns the executor it
+    used before. Pass None to go back to running rules one at a time.
+
+    During a datapulse, rules are run a height at a time: the rules
+    at one height of the dependency graph can't call each other, so
+    all of those which need to rerun are handed to the executor
+    together, and the next height waits for them. Their results are
+    taken, and observers run, in the order a serial datapulse would
+    use, on the propogating thread. This pays off for rules which
+    release the GIL (NumPy, compression, I/O):
+
+        >>> from concurrent.futures import ThreadPoolExecutor
+        >>> cells.set_executor(ThreadPoolExecutor(8))
+
+    Rules run this way mustn't depend on the order they run in.
+    Cells with a C{memo}, C{persist} or a custom C{run} are run on
+    the propogating thread. A process pool won't do, since rules
+    read cells in this process.
     """
-    global cellenv
-    
-    cellenv.dp = 1
-    cellenv.curr = None
-    cellenv.curr_propogator = None
-    cellenv.queued_updates = []
-    cellenv.deferred_sets = []
-
-reset()
+    return current_world().set_executor(executor)
@@ -0,0 +1,328 @@
+# PyCells: Automatic dataflow management for Python
+# Copyright (C) 2006, Ryan Forsythe
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# See LICENSE for the full license text.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Async rules, and the asyncio engine which awaits them.
+
+A rule may be an C{async def}; C{L{cells.fun2cell}} and
+C{L{cells.makecell}} build an L{AsyncRuleCell} for one:
+
+    >>> class Page(cells.Model):
+    ...     path = cells.makecell(value="index.md")
+    ...     @cells.fun2cell()
+    ...     async def raw_source(self, prev):
+    ...         return await read_file(self.path)
+    ...     @cells.fun2cell()
+    ...     def html(self, prev):
+    ...         return markdown(self.raw_source)
+    ...
+    >>> async def serve(page):
+    ...     await page.set_async("path", "about.md")
+    ...     return await page.cell_async("html")
+
+A datapulse never blocks on an async rule. The async cells it
+reaches, and the cells which read them, are passed over and left
+stale; those an observer watches are kept in the world's C{pending}
+list. C{await L{settle}()} (which C{Model.set_async} does for you)
+or C{await model.cell_async(name)} brings them up to date: the stale
+cells are run a height at a time, and the async rules at one height
+are awaited concurrently, so one process can serve many
+propogations without a thread for each.
+
+Outside of an event loop none of this is needed: at the end of a
+datapulse the pending cells are settled on a private loop, and
+reading a stale async cell runs its rule to completion.
+
+Reads inside an async rule are recorded as in any rule. An async
+rule should read other async cells with C{await
+model.cell_async(name)}; plain reads of them raise
+L{AsyncCellPendingError} while a loop is running. Don't have two
+propogations in progress in one L{World} at once; give each request
+its own world.
+"""
+
+import asyncio
+import inspect
+
+import cells
+from .cell import RuleCell, ListCell, DictCell, AsyncCellPendingError
+from .cell import _IN_WORKERS, _worker, _height, _nonerule
+from . import trace as _trace
+
+
+def _loop_running():
+    """Is an event loop running in this thread?"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _run_coroutine(coroutine):
+    """Runs C{coroutine} to completion on a private event loop"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def _blocking(async_rule):
+    """
+    _blocking(async_rule) -> function
+
+    Returns a plain rule which runs C{async_rule} to completion.
+    """
+    def blocking_rule(model, prev):
+        return _run_coroutine(async_rule(model, prev))
+    return blocking_rule
+
+
+def iscoroutinerule(rule):
+    """Is C{rule} an C{async def}?"""
+    return inspect.iscoroutinefunction(rule)
+
+
+class AsyncRuleCell(RuleCell):
+    """
+    A cell whose rule is an C{async def}. See L{cells.aio}.
+
+    @ivar async_rule: The rule itself. The cell's C{rule} runs it to
+        completion, for when that's allowed.
+    """
+
+    __slots__ = ('async_rule',)
+
+    def __init__(self, owner, rule=_nonerule, *args, **kwargs):
+        RuleCell.__init__(self, owner, rule=_blocking(rule), *args,
+                          **kwargs)
+        self.async_rule = rule
+
+    @classmethod
+    def _restore_template(cls, world, kwargs):
+        rule = kwargs.get("rule", _nonerule)
+        cell = super(AsyncRuleCell, cls)._restore_template(
+            world, dict(kwargs, rule=_blocking(rule)))
+        cell.async_rule = rule
+        return cell
+
+    def _from_template(self, owner):
+        cell = RuleCell._from_template(self, owner)
+        cell.async_rule = self.async_rule
+        return cell
+
+    def run(self):
+        """
+        run(self) -> bool
+
+        Runs the async rule to completion, if no datapulse is in
+        progress and no event loop is running in this thread.
+
+        @raise AsyncCellPendingError: If the rule has to be awaited
+            instead
+        """
+        if self.world.curr_propogator is not None or _loop_running():
+            raise AsyncCellPendingError(
+                "'%s' has an async rule; await it with cell_async" %
+                self.name)
+        return RuleCell.run(self)
+
+    def _pulls(self):
+        """
+        Async cells are always passed over by a datapulse; those an
+        observer watches are left for L{settle}.
+        """
+        owner = self.owner
+        return owner is None or not owner._observes(self.name)
+
+
+async def _compute(cell):
+    """
+    _compute(cell) -> (value, reads, error, elapsed)
+
+    Awaits C{cell}'s async rule in its own task. Returns what it
+    computed, the graph ids of the cells it read, the exception it
+    raised, if any, and how long it took (if a tracer wants to know);
+    the caller links the reads.
+    """
+    _worker.curr, _worker.reads = cell, set()
+    reads = _worker.reads
+    timed = _trace.runner is not None
+    start = timed and _trace.clock()
+    try:
+        value, error = await cell.async_rule(cell.owner, cell.value), None
+    except Exception as e:
+        value, error = None, e
+    return value, reads, error, timed and _trace.clock() - start
+
+
+def _unsettled(targets):
+    """
+    _unsettled(targets) -> list
+
+    Returns the cells in C{targets} which are stale or unbound, and
+    the stale or unbound cells they (transitively) call, lowest
+    first.
+    """
+    found = []
+    seen = set()
+    pending = []
+    for cell in targets:
+        if cell.stale or not cell.bound:
+            if id(cell) not in seen:
+                seen.add(id(cell))
+                found.append(cell)
+        pending.append(cell)
+    while pending:
+        for cell in pending.pop().calls_list():
+            if cell is None or (cell.bound and not cell.stale):
+                continue
+            if id(cell) not in seen:
+                seen.add(id(cell))
+                found.append(cell)
+                pending.append(cell)
+    found.sort(key=_height)
+    return found
+
+
+async def _pull(world, targets):
+    """
+    _pull(world, targets) -> None
+
+    Brings C{targets} up to date, awaiting the async rules among
+    them, and among the cells they read, a height at a time.
+    """
+    tried = None
+    while True:
+        todo = _unsettled(targets)
+        try:
+            await _run_levels(world, todo)
+            return
+        except AsyncCellPendingError:
+            # a rule read an async cell it hadn't before; that cell is
+            # in its calls now, so go round again
+            ids = [id(cell) for cell in todo]
+            if ids == tried:  # (unless that got nowhere)
+                raise
+            tried = ids
+
+
+async def _run_levels(world, todo):
+    """
+    _run_levels(world, todo) -> None
+
+    Runs the cells in C{todo}, which is sorted by height, whose
+    calls changed. The async rules of each height are awaited
+    together; results are taken in order.
+    """
+    tracer = _trace.runner
+    start = 0
+    while start < len(todo):
+        height = todo[start].height
+        end = start
+        while end < len(todo) and todo[end].height == height:
+            end += 1
+        level, start = todo[start:end], end
+
+        torun = [cell for cell in level
+                 if not cell.bound or (cell.stale and cell._calls_changed())]
+        waiting = [cell for cell in torun if isinstance(cell, AsyncRuleCell)]
+        results = {}
+        if waiting:
+            for cell in waiting:
+                cell.dp = world.dp
+                cell.stale = False
+            oldcurr, world.curr = world.curr, _IN_WORKERS
+            try:
+                done = await asyncio.gather(*[_compute(cell)
+                                              for cell in waiting])
+            finally:
+                world.curr = oldcurr
+            results = dict(zip([id(cell) for cell in waiting], done))
+
+        for cell in torun:
+            if id(cell) not in results:
+                cell._rerun()
+                continue
+            newvalue, reads, error, elapsed = results.pop(id(cell))
+            cell._update_calls(reads)
+            if error is not None:
+                cell.dp = 0
+                cell.stale = True
+                for other in waiting:  # the results not taken yet
+                    if id(other) in results:
+                        other.dp = 0
+                        other.stale = True
+                raise error
+            cell.bound = True
+            changed = cell._take_value(newvalue)
+            if tracer is not None:
+                tracer.on_run(cell, changed, elapsed)
+            if changed:
+                cell._changed()
+
+
+async def settle(world=None):
+    """
+    settle(world=None) -> None
+
+    Awaits the async rules the datapulses of C{world} (by default,
+    the current one) left pending, bringing the cells observers
+    watch up to date.
+    """
+    world = world or cells.current_world()
+    while world.pending:
+        pending, world.pending = world.pending, []
+        await _pull(world, pending)
+
+
+def settle_if_no_loop(world):
+    """
+    settle_if_no_loop(world) -> None
+
+    Settles C{world} on a private loop, unless an event loop is
+    running in this thread (whose code should C{await L{settle}()}).
+    """
+    if not _loop_running():
+        _run_coroutine(settle(world))
+
+
+async def getvalue_async(cell):
+    """
+    getvalue_async(cell) -> value
+
+    Returns C{cell}'s up-to-date value, awaiting whatever async rules
+    that takes. Inside a rule, the read is recorded as usual.
+    """
+    env = cell.world
+    curr = env.curr
+    if curr is not None:
+        node = cell._graphnode()
+        reads = _worker.reads if curr is _IN_WORKERS else env.reads
+        if reads is not None:
+            reads.add(node.id)
+
+    try:
+        cell.updatecell()
+    except AsyncCellPendingError:
+        await _pull(env, [cell])
+
+    if isinstance(cell, (ListCell, DictCell)):
+        return cell
+    return cell.value
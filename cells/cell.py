@@ -33,7 +33,10 @@ type of cell for you:
     ...         return e["something"]
 
 
-@var DEBUG: Turns on debugging messages for the cell module.
+@var DEBUG: Turns on debugging messages for the cell module. Only the
+    rarer events print them; to follow propogation, install a tracer
+    with C{L{cells.set_tracer}} (C{cells.trace.PrintTracer} prints a
+    line per event).
 
 @group Only Inherited: Cell, LazyCell
 
@@ -47,8 +50,12 @@ type of cell for you:
 DEBUG = False
 
 import cells
-import weakref
-import copy
+import heapq
+import contextvars
+from collections import namedtuple
+from .memo import Memo
+from . import persist as _persist
+from . import trace as _trace
 from collections import UserDict
 
 
@@ -58,17 +65,79 @@ def _debug(*msgs):
 
     Prints debug messages.
     """
-    msgs = [str(_) for _ in msgs]
+    if not (DEBUG or cells.DEBUG):
+        return
+    msgs = [str(msg) for msg in msgs]
     msgs.insert(0, "cell".rjust(cells._DECO_OFFSET) + " > ")
-    if DEBUG or cells.DEBUG:
-        print((" ".join(msgs)))
+    print(" ".join(msgs))
+
+
+#: L{World.curr} while rules run on an executor or as asyncio tasks;
+#: see L{_drain_levels}
+_IN_WORKERS = object()
+
+_worker_curr = contextvars.ContextVar("curr", default=None)
+_worker_reads = contextvars.ContextVar("reads", default=None)
+
+
+class _WorkerStack(object):
+    """
+    The running cell and its reads, per executor thread or asyncio
+    task, for while L{World.curr} is C{_IN_WORKERS}.
+    """
+
+    __slots__ = ()
+
+    curr = property(lambda self: _worker_curr.get(),
+                    lambda self, cell: _worker_curr.set(cell))
+    reads = property(lambda self: _worker_reads.get(),
+                     lambda self, reads: _worker_reads.set(reads))
+
+_worker = _WorkerStack()
+
+
+#: one change to a L{DictCell}: C{op} is C{"add"} (C{old} is None),
+#: C{"set"} or C{"del"} (C{new} is None)
+DictChange = namedtuple("DictChange", "key old new op")
+
+#: a L{DictCell}'s C{last_value} when it's worked out from its changes
+_FROM_CHANGES = object()
+
+#: a read of a whole L{DictCell}, rather than of one of its keys
+_WHOLE = object()
+
+
+def _nonerule(model, prev):
+    """The default rule: a cell without one has the value None."""
+    return None
+
+
+def _unchanged_if_equal(old, new):
+    """The default C{unchanged_if}: the value changed if it's unequal."""
+    return old == new
 
 
 class Cell(object):
     """
     The base Cell class. Does everything interesting.
+
+    Cells are slotted, and the containers only some cells need (the
+    graph node holding the edges, and the synapse space) aren't
+    allocated until first used. C{__dict__} is the last slot, so
+    ad-hoc attributes still work; it's only allocated for a cell
+    which is given one.
     """
 
+    __slots__ = ('owner', 'name', 'rule', 'value', 'ephemeral',
+                 'unchanged_if', '_node', 'dp', 'changed_dp',
+                 'bound', 'constant', 'notifying', 'lazy', 'stale',
+                 'last_value', 'height', 'queued_dp', '_synapse_space',
+                 'memo', 'persist', 'world', '__weakref__', '__dict__')
+
+    #: Whether reading this cell's model attribute returns the cell
+    #: itself rather than its value (see L{CellAttr.__get__})
+    read_as_cell = False
+
     def __init__(self, owner, **kwargs):
         """
         __init__(self, owner, name=None, rule=None, value=None,
@@ -122,25 +191,45 @@ class Cell(object):
             after propogating when it is set. Only makes sense when
             applied to InputCells
 
+        @param memo: Remember the results of this many of the rule's
+            most recent runs, and reuse one instead of running the
+            rule when the cells it read hold the same values again.
+            See L{cells.memo}.
+
+        @param persist: Keep the rule's results on disk, and reuse one
+            instead of running the rule when the cells it read hold
+            values it has a result for, in this process or a later
+            one. True, or a version to change when the rule's results
+            do. See L{cells.persist}.
+
+        @param world: The L{World} this cell belongs to. By default,
+            its owner's, or else the current one.
+
         @raise RuleAndValueInitError: If both C{rule} and C{value} are
             passed, raise an exception
     
         """
-        _debug("running cell init for", kwargs.get("name") or 'anonymous')
-
         if kwargs.get("value", None) and kwargs.get("rule", None):
             raise RuleAndValueInitError(
                     "Cell.__init__ was passed both rule and value parameters")
 
         self.owner = owner
+        world = kwargs.get("world")
+        if world is None:
+            if isinstance(owner, Cell):  # a synapse
+                world = owner.world
+            else:
+                world = getattr(owner, "_world", None) or \
+                    cells.current_world()
+        self.world = world
         self.name = kwargs.get("name", None)
-        self.rule = kwargs.get("rule", lambda s, p: None)
+        self.rule = kwargs.get("rule", _nonerule)
         self.value = kwargs.get("value", None)
         self.ephemeral = kwargs.get("ephemeral", False)
-        self.unchanged_if = kwargs.get("unchanged_if", lambda o, n: o == n)
+        self.unchanged_if = kwargs.get("unchanged_if", _unchanged_if_equal)
 
-        self.called_by = set([])  #: the cells whose rules call this cell
-        self.calls = set([])  #: the cells which this cell's rule calls
+        #: this cell's entry in the dependency graph; see L{cells.graph}
+        self._node = None
 
         self.dp = 0
         self.changed_dp = 0
@@ -149,17 +238,112 @@ class Cell(object):
         self.constant = False
         self.notifying = False
 
-        self.propogate_to = None
         self.lazy = False
+        self.stale = False  #: a lazy cell passed over by a propogation
         self.last_value = None
 
+        #: longest path to an input cell; orders the propogation queue
+        self.height = 0
+        self.queued_dp = 0
+
         #: storage for synapses used in this cell's (possible) rule
-        self.synapse_space = {}
+        self._synapse_space = None
+
+        #: this cell's remembered rule results, if it has any
+        memo = kwargs.get("memo")
+        self.memo = Memo(memo) if memo else None
+        self.persist = kwargs.get("persist") or False
 
         if "value" in kwargs:
             self.bound = True
-            self.changed_dp = cells.cellenv.dp
-            self.dp = cells.cellenv.dp
+            self.changed_dp = world.dp
+            self.dp = world.dp
+
+    @classmethod
+    def _restore_template(cls, world, kwargs):
+        """
+        _restore_template(cls, world, kwargs) -> Cell
+
+        Returns a cell of this class set up as C{cls(None, **kwargs)}
+        would be, but without running anything, for
+        L{_from_template} to copy. L{cells.restore} builds cells this
+        way, then puts their values and graph state back itself.
+        Subclasses whose constructors do more than configure the cell
+        override this and L{_from_template}.
+        """
+        cell = cls.__new__(cls)
+        Cell.__init__(cell, None, world=world, **kwargs)
+        return cell
+
+    def _from_template(self, owner):
+        """
+        _from_template(self, owner) -> Cell
+
+        Returns a new cell of this one's class for C{owner},
+        configured as this one, a L{_restore_template}, is. Its value
+        and graph state are the template's, to be overwritten.
+        """
+        cell = type(self).__new__(type(self))
+        cell.owner = owner
+        cell.world = self.world
+        cell.name = self.name
+        cell.rule = self.rule
+        cell.value = self.value
+        cell.ephemeral = self.ephemeral
+        cell.unchanged_if = self.unchanged_if
+        cell._node = None
+        cell.dp = self.dp
+        cell.changed_dp = self.changed_dp
+        cell.bound = self.bound
+        cell.constant = self.constant
+        cell.notifying = False
+        cell.lazy = self.lazy
+        cell.stale = self.stale
+        cell.last_value = None
+        cell.height = self.height
+        cell.queued_dp = 0
+        cell._synapse_space = None
+        cell.memo = Memo(self.memo.size) if self.memo is not None else None
+        cell.persist = self.persist
+        return cell
+
+    def _graphnode(self):
+        """
+        _graphnode(self) -> _Node
+
+        Returns this cell's node in the dependency graph, registering
+        the cell if it doesn't have one yet.
+        """
+        if self._node is None:
+            world = self.world
+            graph = world.graph
+            if world.curr is None and world.curr_propogator is None:
+                graph.collect()  # nothing's walking the graph; tidy up
+            self._node = graph.register(self)
+        return self._node
+
+    @property
+    def calls(self):
+        """The set of graph ids of the cells this cell's rule calls"""
+        node = self._graphnode()
+        if node.calls is None:
+            node.calls = set()
+        return node.calls
+
+    @property
+    def called_by(self):
+        """The set of graph ids of the cells whose rules call this cell"""
+        node = self._graphnode()
+        if node.called_by is None:
+            node.called_by = set()
+        return node.called_by
+
+    @property
+    def synapse_space(self):
+        """Storage for synapses used in this cell's (possible) rule"""
+        if self._synapse_space is None:
+            self._synapse_space = {}
+        return self._synapse_space
 
     def getvalue(self):
         """
@@ -167,14 +351,38 @@ class Cell(object):
 
         Returns this cell's up-to-date value.
         """
+        self._pregets()
+        return self.value
+
+    def _pregets(self):
+        """
+        _pregets(self) -> None
+
+        Does the bookkeeping for a read of this cell: records it as a
+        dependency of the running rule, if any, and brings this cell
+        up to date. Every value-reading method goes through here.
+
+        Reads are recorded as graph ids in the running rule's read
+        set, so reading the same cell again within one rule run is a
+        set lookup. The edges are linked once, when the rule finishes
+        (see L{run}).
+        """
         # if there's a cell on the call stack, this get is part of a rule
-        # run. so, make the appropriate changes to the cells' deps
-        if cells.cellenv.curr:  # (curr == None when not propogating)
-            cells.cellenv.curr.add_calls(self)
-            self.add_called_by(cells.cellenv.curr)
+        # run. so, record the read
+        env = self.world
+        curr = env.curr
+        if curr is not None:  # (curr == None when not propogating)
+            node = self._node
+            if node is None:
+                node = self._graphnode()
+            if curr is _IN_WORKERS:  # rules are running on the executor
+                reads = _worker.reads
+                if reads is not None:  # (None if not read by a rule)
+                    reads.add(node.id)
+            else:
+                env.reads.add(node.id)
 
         self.updatecell()
-        return self.value
 
     def set(self, value):
         """
@@ -185,25 +393,57 @@ class Cell(object):
 
         @param value: The value to set this cell's value to.
         """
-        if cells.cellenv.curr_propogator:  # if a propogation is happening
-            _debug(self.name, "sees in-progress propogation; deferring set.")
-            # ... defer the set
-            cells.cellenv.deferred_sets.append((self, ("set",
-                                                       ((value,), {}))))
-        else:
-            _debug(self.name, "setting")
-            if not self.unchanged_if(self.value, value):
-                _debug(self.name, "new value is different; propogating change")
-                self.last_value = self.value
-                self.value = value
+        if self._should_defer("set", ((value,), {})):
+            return
 
-                cells.cellenv.dp += 1
-                self.dp = cells.cellenv.dp
+        if not self.unchanged_if(self.value, value):
+            self.last_value = self.value
+            self.value = value
+            self._propogate_set()
+
+    def _should_defer(self, name, argtuple):
+        """
+        _should_defer(self, name, argtuple) -> bool
 
-                self.propogate()
+        Defers a set-ish command if a propogation is happening (it
+        runs once the propogation is complete) or buffers it if a
+        L{cells.transaction} is open (it runs when the transaction
+        commits). Returns True if the command was put off.
 
-        if self.ephemeral:
-            self.value = None
+        @param name: The name of the method to run later
+
+        @param argtuple: The C{(args, kwargs)} to run it with
+        """
+        env = self.world
+        if env.curr_propogator is not None:  # if a propogation is happening
+            env.deferred_sets.append((self, (name, argtuple)))
+            return True
+        if env.transaction and not env.transaction.committing:
+            env.transaction.buffer(self, name, argtuple)
+            return True
+
+        return False
+
+    def _propogate_set(self):
+        """
+        _propogate_set(self) -> None
+
+        Starts a new datapulse for a set-ish command which changed
+        this cell and propogates it. While a transaction is
+        committing, the change is handed to the transaction instead,
+        which propogates all of its changes in one datapulse.
+        """
+        if _trace.tracer is not None:
+            _trace.tracer.on_set(self, self.value)
+
+        env = self.world
+        if env.transaction and env.transaction.committing:
+            env.transaction.changed(self)
+            return
+
+        env.dp += 1
+        self.dp = env.dp
+        self.propogate()
 
     def updatecell(self, queryer=None):
         """
@@ -212,157 +452,202 @@ class Cell(object):
         Updates this cell to the current global DP (datapulse),
         returning True if it changed, False otherwise.
 
-        @param queryer: The cell to L{propogate} to first, if
-            neccessary
-        """
-        _debug(self.name, "updating")
-        if queryer:
-            self.propogate_to = queryer
+        Outside of a propogation, and during one for every cell below
+        the height currently being drained, non-stale cells are
+        current by construction and this is O(1). Only cells which
+        are read before the scheduler reaches them (dynamic
+        dependencies) or lazy cells which were passed over are
+        verified against the cells they call.
 
+        @param queryer: Unused; kept for backwards compatibility.
+        """
+        if _trace.checker is not None:
+            _trace.checker.on_check(self)
         if not self.bound:  # if this cell has never been calc'd:
-            _debug(self.name, "unbound, rerunning")
             self.run()  # it's never current
             return True
-        if self.changed():  # if this cell was changed in this DP
-            _debug(self.name, "changed, telling queryer to recalc")
+        world = self.world
+        if self.changed_dp == world.dp:  # if this cell changed in this DP
             return True  # the asking cell must recalculate.
-        if self.dp == cells.cellenv.dp:  # if this cell is current,
-            _debug(self.name, "is current.")
+        if self.dp == world.dp:  # if this cell is current,
             return False  # it's current.
-        if not cells.cellenv.curr_propogator:  # if the system isn't propogating,
-            if not self.lazy:  # and we're not lazy,
-                _debug(self.name, "sees system is not propogating; is current.")
-                self.dp = cells.cellenv.dp
-                return False  # this cell is current.
-
-        # otherwise, verify we're current: (by the above ifs, the
-        # system is propogating and this cell is not current)
-        for cell in self.calls_list():
-            _debug(self.name, "asking", cell.name, "to update")
-            if cell.updatecell(self):  # if any called cell requires us,
-                _debug(self.name, "got recalc command from", cell.name)
-                if not self.dp == cells.cellenv.dp:
-                    if self.run():  # we need to re-run
-                        # the run changed the value of this cell, so
-                        # propogate the change, starting at the cell which
-                        # requested this cell update
-                        pt = queryer
-                        if self.propogate_to:
-                            pt = self.propogate_to
-                        self.propogate(pt)
-                        self.propogate_to = None
-
-                    # after that run(), self.calls is out of date, and
-                    # all the cells the rule calls are neccessarily
-                    # up-to-date, so bomb out of this loop right
-                    # now. This cell's up-to-date.
-                    return False
-
-        # if we get here, no cell called by this cell required this cell to
-        # update, so update DP and return False (since this cell didn't change)
-        _debug(self.name,
-               "finished asking called cells to update without getting recalc;",
-               "is current.")
-        self.dp = cells.cellenv.dp
+        if not self.stale:
+            if world.curr_propogator is None or \
+                    self.height < world.drain_height:
+                # every cell the scheduler could have reached below this
+                # height has been settled, so this cell is current.
+                self.dp = world.dp
+                return False
+
+        if world.curr is _IN_WORKERS:
+            # a rule on the executor read a cell the scheduler hasn't
+            # settled; verify it one thread at a time
+            with world.lock:
+                if self.stale:
+                    self._pull_stale()
+                return self._verify()
+
+        if self.stale:
+            self._pull_stale()
+        return self._verify()
+
+    def _pull_stale(self):
+        """
+        _pull_stale(self) -> None
+
+        Verifies the stale cells this cell (transitively) calls,
+        lowest first, so that verifying this cell afterwards finds
+        every cell it calls settled. This keeps reading the end of a
+        long stale chain from recursing.
+        """
+        stale = []
+        seen = set()
+        pending = [self]
+        while pending:
+            for cell in pending.pop().calls_list():
+                if cell is None or not cell.stale:
+                    continue
+                id = cell._node.id
+                if id not in seen:
+                    seen.add(id)
+                    stale.append(cell)
+                    pending.append(cell)
+
+        stale.sort(key=_height)
+        for cell in stale:
+            if cell.stale:
+                cell._verify()
+
+    def _pulls(self):
+        """
+        _pulls(self) -> bool
+
+        Should a datapulse only mark this cell stale, rather than
+        rerun it? True for lazy cells, and in pull evaluation (see
+        L{cells.set_evaluation}) for cells no observer watches.
+        """
+        if self.lazy:
+            return True
+        owner = self.owner
+        mode = getattr(owner, "evaluation", None) or self.world.evaluation
+        if mode != "pull":
+            return False
+        if owner is not None and owner._observes(self.name):
+            return False
+        return True
+
+    def _verify(self):
+        """
+        _verify(self) -> bool
+
+        Brings the cells this cell calls up to date, then re-runs this
+        cell if any of them changed after this cell was last
+        current. Returns True if this cell's value changed.
+        """
+        if self._calls_changed():
+            return self._rerun()
+        return False
+
+    def _calls_changed(self):
+        """
+        _calls_changed(self) -> bool
+
+        Brings the cells this cell calls up to date, and returns True
+        if any of them changed after this cell was last current. If
+        none did, this cell is marked current.
+        """
+        for cell in list(self.calls_list()):
+            if cell is None:
+                continue
+            cell.updatecell()
+            if cell.changed_dp > self.dp:
+                return True
+
+        # no called cell changed since this cell was last current
+        self.dp = self.world.dp
+        self.stale = False
         return False
 
+    def _rerun(self):
+        """
+        _rerun(self) -> bool
+
+        Runs this cell and, if its value changed, records the change
+        in the current datapulse. Returns True if it changed.
+        """
+        if not self.run():
+            return False
+        self._changed()
+        return True
+
+    def _changed(self):
+        """
+        _changed(self) -> None
+
+        Records that this just-rerun cell's value changed.
+        """
+        if self.world.curr_propogator is not None:
+            self._schedule_change()
+        else:
+            # pulled between datapulses. the cells which call this
+            # one were marked stale when it was, and will pull it in
+            # turn.
+            self.changed_dp = self.world.dp
+
     def propogate(self, propogate_first=None):
         """
         propogate(self, propogate_first=None) -> None
 
-        Propogates an updatecell command to the set of cells which call
-        this cell.
+        Propogates this cell's change to every cell which
+        (transitively) calls it. Dependent cells are scheduled on a
+        priority queue keyed on their height in the dependency graph
+        and drained lowest-first, so each affected rule runs at most
+        once per datapulse and only after everything it calls has
+        settled. Draining is iterative; deep graphs do not recurse.
 
-        @param propogate_first: If cell C{A} asks cell C{B} to update,
-            and cell C{B}'s value changes (causing a C{propogate}
-            call), it must propogate to C{A} first, before any of the
-            other cells which call C{B}.
+        If a propogation is already in progress, the change is merged
+        into it rather than starting a new one.
+
+        @param propogate_first: Unused; the height ordering subsumes
+            it. Kept for backwards compatibility.
         """
-        if cells.cellenv.curr_propogator:
-            _debug(self.name, "propogating. Old propogator was",
-                   cells.cellenv.curr_propogator.name)
-        else:
-            _debug(self.name, "propogating. No old propogator")
+        _propogate(self.world, (self,))
 
-        prev_propogator = cells.cellenv.curr_propogator
-        cells.cellenv.curr_propogator = self
-        self.changed_dp = cells.cellenv.dp
+    def _schedule_change(self):
+        """
+        _schedule_change(self) -> None
+
+        Records that this cell changed in the current datapulse, runs
+        its observers and pushes the cells which call it onto the
+        propogation queue.
+        """
+        env = self.world
+        self.changed_dp = env.dp
         self.notifying = True
+        env.changed_cells.append(self)
 
         if self.owner:
             self.owner._run_observers(self)
 
-        # first, notify the 'propogate_first' cell
-        if propogate_first:
-            # append everything but the propogate_first cell onto the deferred
-            # propogation FIFO            
-            cells.cellenv.queued_updates.extend(
-                    Cell.propogation_list(self, propogate_first))
-
-            _debug(self.name, "first propogating to", propogate_first.name,
-                   "then adding",
-                   [cell.name for cell in
-                    Cell.propogation_list(self, propogate_first)],
-                   "to deferred")
+        self._schedule_dependents()
 
-            _debug(self.name, "asking", propogate_first.name, "to update first")
-            propogate_first.updatecell()
-            _debug(self.name, "finished propogating to first update",
-                   propogate_first.name)
-
-        else:
-            _debug(self.name, "propogating to",
-                   [cell.name for cell in
-                    Cell.propogation_list(self, propogate_first)])
-
-            # weird for testing
-            for cell in Cell.propogation_list(self, propogate_first):
-                if cell.lazy:
-                    _debug(self.name, "saw", cell.name,
-                           ", but it's lazy -- not updating")
-                else:
-                    _debug(self.name, "asking", cell.name, "to update")
-                    cell.updatecell(self)
-
-        self.notifying = False
-        cells.cellenv.curr_propogator = prev_propogator
+    def _schedule_dependents(self):
+        """
+        _schedule_dependents(self) -> None
 
-        if cells.cellenv.curr_propogator:
-            _debug(self.name, "finished propogating; switching to propogating",
-                   str(cells.cellenv.curr_propogator.name))
-        else:
-            _debug(self.name, "finished propogating. No old propogator")
-
-        # run deferred stuff if no cell is currently propogating
-        if not cells.cellenv.curr_propogator:
-            # first, updates:            
-            # okay, this is a little hacky:
-            cells.cellenv.curr_propogator = cells.Cell(None,
-                                                       name="queued propogation dummy")
-
-            _debug("no cell propogating! running deferred updates.")
-            to_update = cells.cellenv.queued_updates
-            cells.cellenv.queued_updates = []
-            for cell in to_update:
-                if cell.lazy:
-                    _debug(self.name, "saw", cell.name,
-                           ", but it's lazy -- not running deferred updated")
-                else:
-                    _debug("Running deferred update on", cell.name)
-                    cell.updatecell(self)
-
-            cells.cellenv.curr_propogator = None
-
-            # next, deferred set-ish commands:
-            _debug("running deferred sets")
-            to_set = cells.cellenv.deferred_sets
-            cells.cellenv.deferred_sets = []
-            for cell, cmdargtuple in to_set:
-                cmd, argtuple = cmdargtuple
-                args, kwargs = argtuple
-                _debug("running deferred", cmd, "on", cell.name)
-                args, kwargs = argtuple
-                getattr(cell, cmd)(*args, **kwargs)
+        Pushes each cell which calls this one onto the propogation
+        queue, at most once per datapulse. Stale cells are passed
+        over: whatever calls them was marked stale along with them.
+        """
+        env = self.world
+        queue = env.queued_updates
+        dp = env.dp
+        for cell in Cell.propogation_list(self):
+            if cell is None or cell.queued_dp == dp or cell.stale:
+                continue
+            cell.queued_dp = dp
+            env.queue_seq += 1
+            heapq.heappush(queue, (cell.height, env.queue_seq, cell))
 
     def run(self):
         """
@@ -370,43 +655,41 @@ class Cell(object):
 
         Runs the backing function (rule) for this cell. The sequence is:
         
-          1. Remove this cell from all other cell's called-by sets
-          
-          2. Empty this cell's calls set.
-          
-          3. Run the function, which as a side effect may add this
-             cell to other cells' called-by sets and add links in this
-             cell's calls set
+          1. Run the function, recording the cells it reads
              
-          4. If this cell's value changes,
+          2. Make those cells this cell's calls, relinking only the
+             edges which changed
+             
+          3. If this cell's value changes,
 
-             4.1 Run any L{observer}s in this cell's Model
+             3.1 Run any L{observer}s in this cell's Model
 
-             4.2 Return C{True}
+             3.2 Return C{True}
         """
-        _debug(self.name, "running")
-        # call stack manipulation
-        oldcurr = cells.cellenv.curr
-        cells.cellenv.curr = self
-
-        # the rule run may rewrite the dep graph; prepare for that by nuking
-        # c-b links to this cell and calls links from this cell:
-        self.remove_called_bys()
-        self.reset_calls()
-
-        self.dp = cells.cellenv.dp  # we're up-to-date
-        newvalue = self.rule(self.owner, self.value)  # run the rule
-        self.bound = True
-
-        # restore old running cell
-        cells.cellenv.curr = oldcurr
+        tracer = _trace.runner
+        if tracer is None:
+            return self._take_value(self._run_rule())
+
+        tracer.on_start(self)
+        start = _trace.clock()
+        newvalue = self._run_rule()
+        elapsed = _trace.clock() - start
+        changed = self._take_value(newvalue)
+        tracer.on_run(self, changed, elapsed)
+        return changed
+
+    def _take_value(self, newvalue):
+        """
+        _take_value(self, newvalue) -> bool
 
+        Makes C{newvalue}, just computed by this cell's rule, this
+        cell's value unless it's unchanged; if it changed, runs this
+        cell's observers and returns True.
+        """
         # return changed status
         if self.unchanged_if(self.value, newvalue):
-            _debug(self.name, "unchanged.")
             return False
         else:
-            _debug(self.name, "changed.")
             self.last_value = self.value
             self.value = newvalue
 
@@ -416,15 +699,151 @@ class Cell(object):
 
             return True
 
+    def _run_rule(self):
+        """
+        _run_rule(self) -> value
+
+        Runs this cell's rule with this cell as the running cell and
+        returns what it computed. The cells the rule reads replace
+        this cell's calls, even if the rule raises.
+        """
+        env = self.world
+        # rules running on an executor keep their call stack per thread
+        stack = _worker if env.curr is _IN_WORKERS else env
+        # call stack manipulation
+        oldcurr, oldreads = stack.curr, stack.reads
+        stack.curr, stack.reads = self, set()
+        reads = stack.reads
+
+        self.dp = env.dp  # we're up-to-date
+        self.stale = False
+        memo = self.memo
+        if memo is not None:
+            entry = memo.lookup(self)
+            if entry is not None:
+                # a remembered run read the same values; reuse it
+                stack.curr, stack.reads = oldcurr, oldreads
+                reads.update(node.id for node in entry[0])
+                self._update_calls(reads)
+                self.bound = True
+                return entry[2]
+        if self.persist:
+            found, value = _persist.lookup(self, stack)
+            if found:
+                # a stored run read the same values; reuse its result
+                reads = stack.reads
+                stack.curr, stack.reads = oldcurr, oldreads
+                self._update_calls(reads)
+                self.bound = True
+                return value
+            reads = stack.reads = set()  # forget what the lookup read
+
+        try:
+            newvalue = self.rule(self.owner, self.value)  # run the rule
+        except AsyncCellPendingError:
+            # it read an async cell which has to be awaited; run again
+            # once it has been
+            self.dp = 0
+            self.stale = True
+            raise
+        finally:
+            # restore old running cell, and rewire the dep graph to
+            # what the rule read this time
+            stack.curr, stack.reads = oldcurr, oldreads
+            self._update_calls(reads)
+        self.bound = True
+        if memo is not None:
+            memo.record(self, newvalue)
+        if self.persist:
+            _persist.record(self, newvalue)
+        return newvalue
+
+    def _update_calls(self, reads):
+        """
+        _update_calls(self, reads) -> None
+
+        Makes the set of graph ids in C{reads} this cell's calls. The
+        new set is diffed against the old one, so only the edges
+        which were added or dropped are touched; a rule which reads
+        the same cells as last time costs one set comparison. The
+        L{Graph}'s C{edges_kept}, C{edges_added} and C{edges_dropped}
+        counters are updated.
+
+        @raise CyclicDependencyError: If one of the read cells already
+            (transitively) calls this cell
+        """
+        graph = self.world.graph
+        node = self._node
+        old = node.calls if node is not None else None
+        if not old:
+            if not reads:
+                return
+            old = ()
+        elif old == reads:
+            # (the new set is kept: a DictCell knows the run which read
+            # its keys by it)
+            node.calls = reads
+            graph.edges_kept += len(old)
+            return
+        if node is None:
+            node = self._graphnode()
+        nodes = graph.nodes
+
+        # drop the edges to cells the rule didn't read this time
+        dropped = 0
+        for id in old:
+            if id not in reads:
+                other = nodes[id]
+                if other is not None and other.called_by:
+                    other.called_by.discard(node.id)
+                dropped += 1
+
+        # and add the ones to cells it read for the first time
+        added = 0
+        cycle = None
+        for id in list(reads):
+            if id in old:
+                continue
+            cell = nodes[id]()
+            if cell is None or cell is self:
+                # dead, or a self-read
+                reads.discard(id)
+                continue
+            if cell.height >= self.height:
+                try:
+                    self._raise_height(cell.height + 1, cell)
+                except CyclicDependencyError as e:
+                    # leave the edge out, but finish the rewiring
+                    reads.discard(id)
+                    cycle = e
+                    continue
+            other = cell._node
+            if other.called_by is None:
+                other.called_by = set()
+            other.called_by.add(node.id)
+            added += 1
+
+        node.calls = reads
+        graph.edges_kept += len(reads) - added
+        graph.edges_added += added
+        graph.edges_dropped += dropped
+        if cycle is not None:
+            raise cycle
+
     def remove_called_bys(self):
         """
         remove_called_bys(self) -> None
 
         Remove this cell from the called_by lists of all cells this cell calls
         """
-        for cell in self.calls_list():
-            _debug(self.name, "removing c-b link from", cell.name)
-            cell.remove_cb(self)
+        node = self._node
+        if node is None or not node.calls:
+            return
+        nodes = self.world.graph.nodes
+        for id in node.calls:
+            called_by = nodes[id].called_by
+            if called_by:
+                called_by.discard(node.id)
 
     def changed(self):
         """
@@ -432,23 +851,35 @@ class Cell(object):
 
         Did this cell's value change in this DP (datapulse)?
         """
-        return cells.cellenv.dp == self.changed_dp
+        return self.world.dp == self.changed_dp
 
     def calls_list(self):
         """
         calls_list(self) -> generator
 
-        Returns a generator of cell objects whose rules call this cell
+        Returns a generator of cell objects which this cell's rule
+        calls. Cells which have died but not yet been collected come
+        out as None.
         """
-        return (r() for r in self.calls)
+        node = self._node
+        if node is None or not node.calls:
+            return ()
+        nodes = self.world.graph.nodes
+        return (nodes[id]() for id in node.calls)
 
     def called_by_list(self):
         """
         called_by_list(self) -> generator
 
-        Returns a generator of cell objects which this cell's rule calls
+        Returns a generator of cell objects whose rules call this
+        cell. Cells which have died but not yet been collected come
+        out as None.
         """
-        return (r() for r in self.calls)
+        node = self._node
+        if node is None or not node.called_by:
+            return ()
+        nodes = self.world.graph.nodes
+        return (nodes[id]() for id in node.called_by)
 
     def propogation_list(self, elide=None):
         """
@@ -461,33 +892,352 @@ class Cell(object):
             propogate a change to. Used by L{propogate} to remove a
             cell it had to propogate to first.
         """
-        return (r() for r in self.called_by - {elide})
+        node = self._node
+        if node is None or not node.called_by:
+            return ()
+        nodes = self.world.graph.nodes
+        if elide is None:
+            return (nodes[id]() for id in node.called_by)
+        elide = elide._node.id if elide._node is not None else None
+        return (nodes[id]() for id in node.called_by if id != elide)
 
     def add_calls(self, *calls_cells):
-        """Appends the passed list of cells to this cell's calls list"""
-        self.calls.update(set([weakref.ref(cell) for cell in calls_cells]))
+        """
+        Appends the passed list of cells to this cell's calls list,
+        raising this cell's height above each of theirs.
+
+        @raise CyclicDependencyError: If one of the passed cells
+            already (transitively) calls this cell
+        """
+        calls = self.calls
+        for cell in calls_cells:
+            if cell is self:  # reading yourself is harmless; don't link
+                continue
+            if cell.height >= self.height:
+                self._raise_height(cell.height + 1, cell)
+            calls.add(cell._graphnode().id)
+
+    def _raise_height(self, height, callee):
+        """
+        _raise_height(self, height, callee) -> None
+
+        Sets this cell's height and raises the cells which
+        (transitively) call it until every caller sits above what it
+        calls. Heights never decrease, so this only walks the part of
+        the graph which actually moves.
+
+        @param callee: The cell whose new link caused the raise. If
+            the walk reaches it, the link would close a cycle.
+        """
+        self.height = height
+        pending = [self]
+        while pending:
+            cell = pending.pop()
+            height = cell.height + 1
+            for caller in cell.called_by_list():
+                if caller is None or caller.height >= height:
+                    continue
+                if caller is callee:
+                    raise CyclicDependencyError(
+                        "'%s' reading '%s' creates a dependency cycle" %
+                        (self.name, callee.name))
+                caller.height = height
+                pending.append(caller)
 
     def add_called_by(self, *cb_cells):
         """Appends the passed list of cells to this cell's called-by list"""
-        self.called_by.update(set([weakref.ref(cell) for cell in cb_cells]))
+        called_by = self.called_by
+        for cell in cb_cells:
+            if cell is not self:
+                called_by.add(cell._graphnode().id)
 
     def remove_cb(self, *cb_cells):
         """Removes the passed list of cells from this cell's called-by list"""
-        self.called_by.difference_update(set(
-                [weakref.ref(cell) for cell in cb_cells]))
+        node = self._node
+        if node is None or not node.called_by:
+            return
+        for cell in cb_cells:
+            if cell._node is not None:
+                node.called_by.discard(cell._node.id)
 
     def reset_calls(self):
         """Resets the calls list to empty"""
-        self.calls = set([])
+        node = self._node
+        if node is not None and node.calls:
+            node.calls.clear()
+
+
+def _height(cell):
+    return cell.height
+
+
+def _propogate(env, changed):
+    """
+    _propogate(env, changed) -> None
+
+    Propogates the changes of every cell in C{changed} in the current
+    datapulse, draining the queue once for all of them.
+    """
+    if env.curr_propogator is not None:
+        for cell in changed:
+            cell._schedule_change()
+        return
+
+    env.curr_propogator = changed[0]
+    if _trace.tracer is not None:
+        _trace.tracer.on_propagate(env, changed)
+    try:
+        for cell in changed:
+            cell._schedule_change()
+        _drain(env)
+    finally:
+        _end_pulse(env)
+
+    if env.pending:
+        # cells left waiting on async rules; finish them now, unless
+        # an event loop is running to await cells.settle()
+        from .aio import settle_if_no_loop
+        settle_if_no_loop(env)
+    _run_deferred(env)
+
+
+def _drain(env):
+    """
+    _drain(env) -> None
+
+    Runs the propogation queue until it's empty. Cells come off the
+    queue lowest-height first, so by the time a cell is looked at
+    every cell it calls has settled for this datapulse.
+    """
+    if env.executor is not None:
+        return _drain_levels(env)
+
+    queue = env.queued_updates
+    while queue:
+        height, seq, cell = heapq.heappop(queue)
+        if cell.height != height:  # raised since it was queued; re-sort
+            heapq.heappush(queue, (cell.height, seq, cell))
+            continue
+
+        env.drain_height = height
+        if _passed_over(env, cell):
+            continue
+
+        try:
+            cell._verify()
+        except AsyncCellPendingError:
+            _defer(cell)
+
+
+def _passed_over(env, cell):
+    """
+    _passed_over(env, cell) -> bool
+
+    Returns True if the scheduler needn't verify C{cell}: it's been
+    pulled up to date already, or it only needs marking stale (which
+    this does).
+    """
+    if cell.dp == env.dp:  # already pulled up to date this DP
+        return True
 
+    if cell._pulls():
+        if not cell.stale:
+            cell.stale = True
+            # whatever reads this cell may need it; let them check
+            cell._schedule_dependents()
+        return True
+
+    return False
+
+
+def _defer(cell):
+    """
+    _defer(cell) -> None
+
+    Leaves C{cell}, which needs an async rule awaited first, for
+    L{cells.settle}, and passes its dependents over too.
+    """
+    _debug(cell.name, "waits on an async rule -- deferring")
+    cell.dp = 0
+    cell.stale = True
+    cell.world.pending.append(cell)
+    cell._schedule_dependents()
+
+
+def _drain_levels(env):
+    """
+    _drain_levels(env) -> None
+
+    Runs the propogation queue a height at a time, running the rules
+    of each height on C{env.executor} at once. Cells at one height
+    can't call each other, so their rules are independent. The
+    results are taken in queue order, on this thread, so observers
+    and scheduling see the same sequence as L{_drain} gives.
+
+    A rule can start reading a cell at its own height, though (a
+    dynamic dependency). The cells of the level are marked current
+    while the workers run, so such a read sees the old value; its
+    result is dropped, and the rule is rerun here once the rest of
+    the level's results are taken.
+    """
+    queue = env.queued_updates
+    tracer = _trace.runner
+    while queue:
+        height = queue[0][0]
+        level = []
+        while queue and queue[0][0] == height:
+            height, seq, cell = heapq.heappop(queue)
+            if cell.height != height:  # raised since it was queued
+                heapq.heappush(queue, (cell.height, seq, cell))
+            else:
+                level.append(cell)
+
+        env.drain_height = height
+        torun = []
+        for cell in level:
+            try:
+                if not _passed_over(env, cell) and cell._calls_changed():
+                    torun.append(cell)
+            except AsyncCellPendingError:
+                _defer(cell)
+
+        if len(torun) < 2:
+            for cell in torun:
+                try:
+                    cell._rerun()
+                except AsyncCellPendingError:
+                    _defer(cell)
+            continue
+
+        # rules the executor can run: plain rule cells, no memo or
+        # persisting
+        parallel = [cell for cell in torun if cell.memo is None and
+                    not cell.persist and type(cell).run is Cell.run]
+        olddps = {}
+        levelids = set()
+        for cell in parallel:
+            olddps[id(cell)] = cell.dp
+            levelids.add(cell._graphnode().id)
+            cell.dp = env.dp
+            cell.stale = False
+        oldcurr, env.curr = env.curr, _IN_WORKERS
+        try:
+            futures = [(cell, env.executor.submit(_compute, cell))
+                       for cell in parallel]
+            results = dict((id(cell), future.result())
+                           for cell, future in futures)
+        finally:
+            env.curr = oldcurr
+
+        reread = []
+        for cell in torun:
+            if id(cell) not in results:
+                try:
+                    cell._rerun()
+                except AsyncCellPendingError:
+                    _defer(cell)
+                continue
+            newvalue, reads, error, elapsed = results.pop(id(cell))
+            peers = levelids.intersection(reads)
+            peers.discard(cell._node.id)
+            if peers:
+                # it read a cell of this level, which may not have
+                # had its new value yet
+                reread.append(cell)
+                continue
+            cell._update_calls(reads)
+            if isinstance(error, AsyncCellPendingError):
+                _defer(cell)
+                continue
+            cell.bound = True
+            if error is not None:
+                # the results not taken yet are dropped; those cells
+                # will rerun when next asked
+                for other in parallel:
+                    if id(other) in results:
+                        other.dp = olddps[id(other)]
+                for other in reread:
+                    other.dp = olddps[id(other)]
+                raise error
+            changed = cell._take_value(newvalue)
+            if tracer is not None:
+                tracer.on_run(cell, changed, elapsed)
+            if changed:
+                cell._changed()
+
+        for cell in reread:
+            cell.dp = olddps[id(cell)]  # not current until it's rerun
+        for cell in reread:
+            if cell.dp == env.dp:  # brought up to date by an earlier one
+                continue
+            try:
+                cell._rerun()
+            except AsyncCellPendingError:
+                _defer(cell)
+
+
+def _compute(cell):
+    """
+    _compute(cell) -> (value, reads, error, elapsed)
+
+    Runs C{cell}'s rule on an executor thread. Returns what it
+    computed, the graph ids of the cells it read, the exception it
+    raised, if any, and how long it took (if a tracer wants to know);
+    the caller links the reads.
+    """
+    _worker.curr, _worker.reads = cell, set()
+    reads = _worker.reads
+    timed = _trace.runner is not None
+    start = timed and _trace.clock()
+    try:
+        value, error = cell.rule(cell.owner, cell.value), None
+    except Exception as e:
+        value, error = None, e
+    finally:
+        _worker.curr = _worker.reads = None
+    return value, reads, error, timed and _trace.clock() - start
+
+
+def _end_pulse(env):
+    """
+    _end_pulse(env) -> None
+
+    Clears the per-datapulse propogation state.
+    """
+    for cell in env.changed_cells:
+        cell.notifying = False
+        if cell.ephemeral:
+            cell.value = None
+    env.changed_cells = []
+    del env.queued_updates[:]
+    env.drain_height = 0
+    env.curr_propogator = None
+    if env.curr is None:
+        env.graph.collect()
+
+
+def _run_deferred(env):
+    """
+    _run_deferred(env) -> None
+
+    Runs the set-ish commands which were deferred because they
+    happened during a propogation. Each starts its own datapulse.
+    """
+    to_set = env.deferred_sets
+    env.deferred_sets = []
+    for cell, cmdargtuple in to_set:
+        cmd, argtuple = cmdargtuple
+        args, kwargs = argtuple
+        _debug("running deferred", cmd, "on", cell.name)
+        getattr(cell, cmd)(*args, **kwargs)
 
-# epydoc can't handle lambdas in a param list, apparently
-_nonerule = lambda s, p: None
 
 
 class RuleCell(Cell):
     """A cell whose value is determined by a function (a rule)."""
 
+    __slots__ = ()
+
     def __init__(self, owner, rule=_nonerule, *args, **kwargs):
         """
         __init__(self, owner, name=None, rule=lambda s,p: None,
@@ -530,6 +1280,8 @@ class RuleCell(Cell):
 class InputCell(Cell):
     """A cell whose value can be set"""
 
+    __slots__ = ()
+
     def __init__(self, owner, value=None, *args, **kwargs):
         """
         __init__(self, owner, name=None, rule=None, value=None,
@@ -568,6 +1320,8 @@ class InputCell(Cell):
 class RuleThenInputCell(Cell):
     """Runs the rule to determine initial value, then acts like a InputCell"""
 
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         """
         __init__(self, owner, name=None, rule=lambda s,p: None,
@@ -602,6 +1356,17 @@ class RuleThenInputCell(Cell):
         self.rule = None
         self.bound = True
 
+    @classmethod
+    def _restore_template(cls, world, kwargs):
+        """
+        Its rule has already run, so the template, unlike the
+        constructor, doesn't run it.
+        """
+        cell = super(RuleThenInputCell, cls)._restore_template(world, kwargs)
+        cell.rule = None
+        cell.bound = True
+        return cell
+
     def run(self):
         """
         run(self) -> None
@@ -624,6 +1389,8 @@ class LazyCell(RuleCell):
     C{L{get}()} run, it updates as other Cells do.
     """
 
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         """
         __init__(self, owner, name=None, rule=lambda s,p: None,
@@ -652,16 +1419,23 @@ class LazyCell(RuleCell):
         RuleCell.__init__(self, *args, **kwargs)
         self.lazy = True
 
+    @classmethod
+    def _restore_template(cls, world, kwargs):
+        cell = super(LazyCell, cls)._restore_template(world, kwargs)
+        cell.lazy = True
+        return cell
+
 
 class OnceAskedLazyCell(LazyCell):
-    pass
+    __slots__ = ()
 
 
 class AlwaysLazyCell(LazyCell):
     """
     A LazyCell variant that is *always* Lazy
     """
-    pass
+
+    __slots__ = ()
 
 
 class UntilAskedLazyCell(LazyCell):
@@ -670,6 +1444,8 @@ class UntilAskedLazyCell(LazyCell):
     post-init C{L{get}()}
     """
 
+    __slots__ = ()
+
     def getvalue(self, init=False, *args, **kwargs):
         v = LazyCell.getvalue(self, *args, **kwargs)
         if not init:
@@ -721,8 +1497,35 @@ class DictCell(InputCell, UserDict):
 
     Note that C{unchanged_if} now operates on dictionary values,
     rather than the dictionary itself.
+
+    A change doesn't copy the dictionary. Instead it's recorded, as a
+    L{DictChange}, in C{changes}, which holds every change made in the
+    datapulse in which the cell last changed: one for a single set or
+    delete, more for a L{cells.transaction} or a set of the whole
+    dictionary. Observers and rules which only care about what
+    changed should go by them:
+
+        >>> @A.observer(attrib="x")
+        ... def x_obs(model):
+        ...     for key, old, new, op in model.x.changes:
+        ...         print(op, key, new)
+
+    C{last_value}, the whole dictionary as it was before that
+    datapulse, is worked out from the changes when it's asked for,
+    which costs as much as a copy.
+
+    A rule which reads only some keys, with C{[]}, C{get} or C{in},
+    depends only on those: a change to another key doesn't rerun it.
+    A rule which iterates the dictionary, or reads its C{keys} or
+    C{changes}, depends on all of it. (This holds for rules the
+    datapulse reruns. Lazy and pull-mode rules, and remembered runs
+    reused by C{memo} or C{persist}, depend on all of it.)
+
+    @ivar changes_dp: The datapulse C{changes} were made in
     """
 
+    read_as_cell = True
+
     def __init__(self, owner, *args, **kwargs):
         """
         __init__(self, owner, name=None, rule=None, value=None,
@@ -744,11 +1547,192 @@ class DictCell(InputCell, UserDict):
         """
         if kwargs.get("rule", None):
             raise InputCellRunError("You may not give an InputCell a rule")
+        self._changes = []
+        self.changes_dp = 0
+        #: the keys read by each rule which reads this cell, by its
+        #: graph id, as C{[reads, keys]}: C{reads} is the read set of
+        #: the run which read them, and C{keys} None if it read the
+        #: whole dict
+        self._readers = {}
         Cell.__init__(self, owner, value=kwargs.pop("value", {}),
                       *args, **kwargs)
 
+    @classmethod
+    def _restore_template(cls, world, kwargs):
+        cell = super(DictCell, cls)._restore_template(world, kwargs)
+        cell._changes = []
+        cell.changes_dp = 0
+        cell._readers = {}
+        return cell
+
+    def _from_template(self, owner):
+        cell = InputCell._from_template(self, owner)
+        cell._changes = []
+        cell.changes_dp = 0
+        cell._readers = {}
+        return cell
+
+    def _last_value(self):
+        last = self._explicit_last_value
+        if last is not _FROM_CHANGES:
+            return last
+        # undo this datapulse's changes, newest first
+        last = dict(self.value)
+        for key, old, new, op in reversed(self._changes):
+            if op == "add":
+                del last[key]
+            else:
+                last[key] = old
+        return last
+
+    def _set_last_value(self, value):
+        self._explicit_last_value = value
+
+    last_value = property(_last_value, _set_last_value, doc="""
+        The dictionary as it was before the datapulse in which this
+        cell last changed, or None if it hasn't. Worked out from
+        C{changes} when it's read.""")
+
+    @property
+    def changes(self):
+        """
+        The L{DictChange}s of the datapulse in which this cell last
+        changed, oldest first. Reading them is a read of the cell.
+        """
+        self._pregets()
+        return self._changes
+
+    def _pregets(self):
+        """
+        _pregets(self) -> None
+
+        Does the bookkeeping for a read of the whole dict: see
+        L{Cell._pregets}.
+        """
+        self._note_read(_WHOLE)
+        Cell._pregets(self)
+
+    def _pregets_key(self, key):
+        """
+        _pregets_key(self, key) -> None
+
+        Does the bookkeeping for a read of C{key}: see
+        L{Cell._pregets}.
+        """
+        self._note_read(key)
+        Cell._pregets(self)
+
+    def _note_read(self, key):
+        """
+        _note_read(self, key) -> None
+
+        Records that the running rule, if any, read C{key}, or the
+        whole dict if C{key} is C{_WHOLE}.
+        """
+        env = self.world
+        curr = env.curr
+        if curr is None:
+            return
+        if curr is _IN_WORKERS:
+            curr, reads = _worker.curr, _worker.reads
+            if reads is None:
+                return
+        else:
+            reads = env.reads
+        node = curr._node
+        if node is None:
+            node = curr._graphnode()
+        entry = self._readers.get(node.id)
+        if entry is None or entry[0] is not reads:  # a new run
+            self._readers[node.id] = [reads,
+                                      None if key is _WHOLE else set([key])]
+        elif entry[1] is not None:
+            if key is _WHOLE:
+                entry[1] = None
+            else:
+                entry[1].add(key)
+
+    def _schedule_dependents(self):
+        """
+        _schedule_dependents(self) -> None
+
+        Pushes the cells which call this one and read one of the keys
+        which changed in this datapulse, or the whole dict, onto the
+        propogation queue. See L{Cell._schedule_dependents}.
+        """
+        node = self._node
+        readers = self._readers
+        if self.changes_dp != self.world.dp or not readers or \
+                node is None or not node.called_by:
+            return Cell._schedule_dependents(self)
+
+        changed = set(change.key for change in self._changes)
+        env = self.world
+        queue = env.queued_updates
+        dp = env.dp
+        nodes = env.graph.nodes
+        for id in node.called_by:
+            other = nodes[id]
+            cell = other() if other is not None else None
+            if cell is None or cell.queued_dp == dp or cell.stale:
+                continue
+            entry = readers.get(id)
+            if entry is not None and entry[1] is not None and \
+                    entry[0] is other.calls and entry[1].isdisjoint(changed):
+                continue  # it read only keys which didn't change
+            cell.queued_dp = dp
+            env.queue_seq += 1
+            heapq.heappush(queue, (cell.height, env.queue_seq, cell))
+
+        if len(readers) > 2 * len(node.called_by) + 16:
+            # forget the rules which no longer read this cell
+            for id in [id for id in readers if id not in node.called_by]:
+                del readers[id]
+
+    def _pulse_changes(self):
+        """
+        _pulse_changes(self) -> list
+
+        Returns C{changes} to add a change to, first forgetting those
+        of an earlier datapulse. A change is made before the
+        datapulse it belongs to begins: a set-ish command starts the
+        next one, and a committing transaction's changes all share it.
+        """
+        dp = self.world.dp + 1
+        if self.changes_dp != dp:
+            self._changes = []
+            self.changes_dp = dp
+            self._explicit_last_value = _FROM_CHANGES
+        return self._changes
+
+    def set(self, value):
+        """
+        set(self, value) -> None
+
+        Replaces the whole dictionary, recording the difference
+        between the old and new ones as C{changes}.
+
+        @param value: The new dictionary
+        """
+        if self._should_defer("set", ((value,), {})):
+            return
+
+        old = self.value
+        if self.unchanged_if(old, value):
+            return
+        changes = self._pulse_changes()
+        for key, oldvalue in old.items():
+            if key not in value:
+                changes.append(DictChange(key, oldvalue, None, "del"))
+            elif not self.unchanged_if(oldvalue, value[key]):
+                changes.append(DictChange(key, oldvalue, value[key], "set"))
+        for key, newvalue in value.items():
+            if key not in old:
+                changes.append(DictChange(key, None, newvalue, "add"))
+        self.value = value
+        self._propogate_set()
+
     def setdefault(self, key, value):
-        _debug(self.name, "got setdefault")
         self.value.setdefault(key, value)
 
     def __setitem__(self, key, value):
@@ -762,50 +1746,35 @@ class DictCell(InputCell, UserDict):
         
         @param value: The value to set this cell's value's key's value to.
         """
-        _debug(self.name, "setting setitem as dictcell")
-        if cells.cellenv.curr_propogator:  # if a propogation is happening
-            _debug(self.name, "sees in-progress propogation; deferring set.")
-            # defer the set
-            cells.cellenv.deferred_sets.append((self, ("__setitem__",
-                                                       ((key, value), {}))))
+        if self._should_defer("__setitem__", ((key, value), {})):
+            return
+
+        d = self.value
+        if key not in d:
+            change = DictChange(key, None, value, "add")
+        elif not self.unchanged_if(d[key], value):
+            change = DictChange(key, d[key], value, "set")
         else:
-            _debug(self.name, "setting")
-            if key not in self.value or \
-                    not self.unchanged_if(self.value[key], value):
-                _debug(self.name, "new value is different; propogating change")
-                self.last_value = copy.copy(self.value)
-                self.value[key] = value
-
-                cells.cellenv.dp += 1
-                self.dp = cells.cellenv.dp
-
-                if self.owner:
-                    self.owner._run_observers(self)
-
-                self.propogate()
+            return
+        self._pulse_changes().append(change)
+        d[key] = value
+        self._propogate_set()
 
     def __delitem__(self, key):
-        del (self.value[key])
-        cells.cellenv.dp += 1
-        self.dp = cells.cellenv.dp
+        if self._should_defer("__delitem__", ((key,), {})):
+            return
 
-        if self.owner:
-            self.owner._run_observers(self)
-
-        self.propogate()
+        d = self.value
+        change = DictChange(key, d[key], None, "del")
+        self._pulse_changes().append(change)
+        del d[key]
+        self._propogate_set()
 
     def __repr__(self):
         return repr(self.value)
 
     def get(self, key, default=None):
-        # if there's a cell on the call stack, this get is part of a rule
-        # run. so, make the appropriate changes to the cells' deps
-        _debug(self.name, "getting", repr(key))
-        if cells.cellenv.curr:  # (curr == None when not propogating)
-            cells.cellenv.curr.add_calls(self)
-            self.add_called_by(cells.cellenv.curr)
-
-        self.updatecell()
+        self._pregets_key(key)
 
         return self.value.get(key, default)
 
@@ -817,11 +1786,7 @@ class DictCell(InputCell, UserDict):
 
         @param key: lookup
         """
-        if cells.cellenv.curr:  # (curr == None when not propogating)
-            cells.cellenv.curr.add_calls(self)
-            self.add_called_by(cells.cellenv.curr)
-
-        self.updatecell()
+        self._pregets_key(key)
         return self.value[key]
 
     def keys(self):
@@ -830,35 +1795,19 @@ class DictCell(InputCell, UserDict):
 
 	Gets self.value.keys()
 	"""
-        if cells.cellenv.curr:  # (curr == None when not propogating)
-            cells.cellenv.curr.add_calls(self)
-            self.add_called_by(cells.cellenv.curr)
-
-        self.updatecell()
+        self._pregets()
         return list(self.value.keys())
 
     def __contains__(self, key):
-        if cells.cellenv.curr:  # (curr == None when not propogating)
-            cells.cellenv.curr.add_calls(self)
-            self.add_called_by(cells.cellenv.curr)
-
-        self.updatecell()
+        self._pregets_key(key)
         return self.value.__contains__(key)
 
     def __iter__(self):
-        if cells.cellenv.curr:  # (curr == None when not propogating)
-            cells.cellenv.curr.add_calls(self)
-            self.add_called_by(cells.cellenv.curr)
-
-        self.updatecell()
+        self._pregets()
         return self.value.__iter__()
 
     def iteritems(self):
-        if cells.cellenv.curr:  # (curr == None when not propogating)
-            cells.cellenv.curr.add_calls(self)
-            self.add_called_by(cells.cellenv.curr)
-
-        self.updatecell()
+        self._pregets()
         return iter(list(self.value.items()))
 
 
@@ -909,6 +1858,10 @@ class ListCell(InputCell):
     entire value.
     """
 
+    read_as_cell = True
+
+    __slots__ = ()
+
     def __init__(self, owner, *args, **kwargs):
         """
         __init__(self, owner, name=None, rule=None, value=None,
@@ -934,27 +1887,6 @@ class ListCell(InputCell):
         Cell.__init__(self, owner, value=kwargs.pop("value", []),
                       *args, **kwargs)
 
-    def _onchanges(self):
-        if self.owner: self.owner._run_observers(self)
-        self.propogate()
-
-    def _pregets(self):
-        if cells.cellenv.curr:  # (curr == None when not propogating)
-            cells.cellenv.curr.add_calls(self)
-            self.add_called_by(cells.cellenv.curr)
-
-        self.updatecell()
-
-    def _should_defer(self, name, argtuple):
-        _debug(self.name, "wonders if it should defer a", name)
-        if cells.cellenv.curr_propogator:  # if a propogation is happening
-            _debug(self.name, "sees in-progress propogation; deferring set.")
-            # defer the set
-            cells.cellenv.deferred_sets.append((self, (name, argtuple)))
-            return True
-
-        return False
-
     # "get"-ish calls
     def count(self, v):
         self._pregets()
@@ -988,12 +1920,12 @@ class ListCell(InputCell):
 	be altered until the end of the propogation (thus ensuring all
 	cells "see" the same value of this cell during the DP).
 	"""
-        if not self._should_defer("pop", (index,)):
+        if not self._should_defer("pop", ((index,), {})):
             # not deferred, so do a real pop
+            if index is None:
+                index = -1
             r = self.value.pop(index)
-            cells.cellenv.dp += 1
-            self.dp = cells.cellenv.dp
-            self._onchanges()
+            self._propogate_set()
         else:
             # deferred. grab the asked-for element of the list
             if index is None:
@@ -1006,9 +1938,7 @@ class ListCell(InputCell):
         def fn(self, *args, **kwargs):
             if not self._should_defer(name, (args, kwargs)):
                 getattr(self.value, name)(*args, **kwargs)
-                cells.cellenv.dp += 1
-                self.dp = cells.cellenv.dp
-                self._onchanges()
+                self._propogate_set()
 
         fn.__name__ = name
         return fn
@@ -1070,3 +2000,22 @@ class RuleAndValueInitError(_CellException):
     Both C{rule} and C{value} were passed to C{L{__init__}}.
     """
     pass
+
+
+class AsyncCellPendingError(_CellException):
+    """
+    A cell with an async rule (or one which reads such a cell) needs
+    to rerun, but can't be run to completion here: either a
+    datapulse is in progress, or an asyncio event loop is running in
+    this thread. Await the cell (C{await model.cell_async(name)}) or
+    C{cells.settle()} instead.
+    """
+    pass
+
+
+class CyclicDependencyError(_CellException):
+    """
+    A rule read a cell which (transitively) reads the rule's own
+    cell.
+    """
+    pass
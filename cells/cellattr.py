@@ -24,6 +24,7 @@ CellAttr, a wrapper for C{L{Cell}} objects within C{L{Models}}
 
 import cells
 from .cell import Cell, RuleCell, InputCell
+from .aio import AsyncRuleCell, iscoroutinerule
 
 DEBUG = False
 
@@ -34,10 +35,11 @@ def debug(*msgs):
 
     Prints debug messages.
     """
-    msgs = list(msgs)
+    if not (DEBUG or cells.DEBUG):
+        return
+    msgs = [str(msg) for msg in msgs]
     msgs.insert(0, "cell attr".rjust(cells._DECO_OFFSET) + " > ")
-    if DEBUG or cells.DEBUG:
-        print(" ".join(msgs))
+    print(" ".join(msgs))
 
 
 class CellAttr(object):
@@ -47,13 +49,25 @@ class CellAttr(object):
     A descriptor which auto-vivifies a new Cell in each instance of a
     Model, and which does the hiding of C{Cell.L{get}()} and
     C{Cell.L{set}()}.
+
+    A plain input cell attribute (just a C{value}, and maybe an
+    C{unchanged_if}) is shared: a model which doesn't override it
+    needn't build its cell until the cell is set, or read by a rule,
+    which has to record the read. Until then, reading the attribute
+    returns the class's default value. See L{Model}.
+
+    @ivar shared: Whether this is a shared input cell attribute
     """
 
+    #: the cell arguments a shared input cell attribute may have
+    _SHARED_KWARGS = frozenset(("value", "unchanged_if"))
+
     # kid_overrides is essentially internal, so it's hidden from the
     # documentation
     def __init__(self, kid_overrides=True, *args, **kwargs):
         """
-        __init__(self, rule=None, value=None, unchanged_if=None, celltype=None)
+        __init__(self, rule=None, value=None, unchanged_if=None, celltype=None,
+        memo=None, persist=False)
 
         Sets the parameters which will be used as defaults to build a
         Cell when the time comes. 
@@ -76,10 +90,19 @@ class CellAttr(object):
         @param celltype: Set the cell type to generate. You must pass
             C{rule} or C{value} correctly. Refer to L{cells.cell} for
             available types.
+
+        @param memo: Remember the results of this many of the rule's
+            most recent runs. See L{cells.memo}.
+
+        @param persist: Keep the rule's results on disk for later
+            runs and processes to reuse. See L{cells.persist}.
         """
         self.kid_overrides = kid_overrides
         self.args = args
         self.kwargs = kwargs
+        self.shared = ("value" in kwargs and not args and
+                       self._SHARED_KWARGS.issuperset(kwargs))
+        self.default = kwargs.get("value")
 
         if "rule" in kwargs:
             self.__doc__ = kwargs['rule'].__doc__
@@ -95,7 +118,10 @@ class CellAttr(object):
 
         @param value: The value to set
         """
-        self.getcell(owner).set(value)
+        cell = owner.__dict__.get(self.name)
+        if cell is None:
+            cell = self.getcell(owner)
+        cell.set(value)
 
     def __get__(self, owner, ownertype):
         """
@@ -109,14 +135,20 @@ class CellAttr(object):
 
         @param ownertype: (unused)
         """
-        if not owner: return self
-
-        cell = self.getcell(owner)
-        if isinstance(cell, (cells.cell.ListCell, cells.cell.DictCell)):
+        if owner is None:
+            return self
+
+        # the cell is looked up directly; only the first access builds it
+        cell = owner.__dict__.get(self.name)
+        if cell is None:
+            if (self.shared and owner._world.curr is None and
+                    self.name not in owner._initregistry):
+                return self.default  # no rule to record the read
+            cell = self.getcell(owner)
+        if cell.read_as_cell:  # ListCells and DictCells
             return cell
-        else:
-            # return the value in owner.myname
-            return cell.getvalue()
+        # return the value in owner.myname
+        return cell.getvalue()
 
     def getkwargs(self, owner):
         """
@@ -146,17 +178,16 @@ class CellAttr(object):
         @param owner: The Model instance in which to look for the Cell.
         """
         # if there isn't a value in owner.myname, make it a cell
-        debug("got request for cell in", self.name)
-        if self.name not in list(owner.__dict__.keys()):
+        if self.name not in owner.__dict__:
             debug(self.name, "not in owner. Building a new cell in it.")
             newcell = self.buildcell(owner, *self.args, **self.getkwargs(owner))
-            owner.__dict__[self.name] = newcell
-
-            # observers have to be run *after* the cell is embedded in the
-            # instance!
-            owner._run_observers(newcell)
+            # rules on an executor may build a shared cell at once;
+            # only one cell may be the model's
+            if owner.__dict__.setdefault(self.name, newcell) is newcell:
+                # observers have to be run *after* the cell is
+                # embedded in the instance!
+                owner._run_observers(newcell)
 
-        debug("finished getting", self.name)
         return owner.__dict__[self.name]
 
     def buildcell(self, owner, *args, **kwargs):
@@ -172,7 +203,8 @@ class CellAttr(object):
         
         @param rule: Define a rule which backs this cell. You must
             only define one of C{rule} or C{value}. Lacking C{celltype},
-            this creates a L{RuleCell}.  This must be passed a
+            this creates a L{RuleCell}, or an L{AsyncRuleCell} for an
+            C{async def}.  This must be passed a
             callable with the signature C{f(self, prev) -> value},
             where C{self} is the model instance the cell is in and
             C{prev} is the cell's out-of-date value.
@@ -191,18 +223,10 @@ class CellAttr(object):
         """
 
         """Creates a new cell of the appropriate type"""
-        debug("Building cell: owner:", str(owner))
-        debug("                name:", self.name)
-        debug("                args:", str(args))
-        debug("              kwargs:", str(kwargs))
-        # figure out what type the user wants:
-        if 'celltype' in kwargs:  # user-specified cell
-            celltype = kwargs["celltype"]
-        elif 'rule' in kwargs:  # it's a rule-cell.
-            celltype = RuleCell
-        elif 'value' in kwargs:  # it's a value-cell
-            celltype = InputCell
-        else:
+        debug("Building cell", self.name, "in", owner, "args:", args,
+              "kwargs:", kwargs)
+        celltype = self.celltype(kwargs)
+        if celltype is None:
             raise Exception("Could not determine target type for cell " +
                             "given owner: " + str(owner) +
                             ", name: " + self.name +
@@ -212,3 +236,20 @@ class CellAttr(object):
         kwargs['name'] = self.name
 
         return celltype(owner, *args, **kwargs)
+
+    def celltype(self, kwargs):
+        """
+        celltype(self, kwargs) -> type
+
+        Returns the type of Cell C{L{buildcell}} builds given
+        C{kwargs}, or None if they don't say.
+        """
+        if 'celltype' in kwargs:  # user-specified cell
+            return kwargs["celltype"]
+        elif 'rule' in kwargs:  # it's a rule-cell.
+            if iscoroutinerule(kwargs['rule']):
+                return AsyncRuleCell
+            return RuleCell
+        elif 'value' in kwargs:  # it's a value-cell
+            return InputCell
+        return None
@@ -0,0 +1,288 @@
+# PyCells: Automatic dataflow management for Python
+# Copyright (C) 2006, Ryan Forsythe
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# See LICENSE for the full license text.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Observers which run off the propogation path.
+
+An observer which does I/O holds up the datapulse it runs in. Given
+an C{executor}, it's queued instead, and the datapulse carries on:
+
+    >>> class Table(cells.Model):
+    ...     rows = cells.makecell(value=())
+    ...
+    >>> @Table.observer(attrib="rows", executor="thread")
+    ... def insert_rows(model, change):
+    ...     database.insert(change.new_value)
+    ...
+    >>> table = Table()
+    >>> table.rows = (1, 2, 3)      # returns before the insert is done
+    >>> cells.flush_observers()     # waits for it
+
+An observer which takes two arguments is called with the model and
+an L{ObservedChange}, a snapshot of the attribute taken when the
+observer was queued (or, inline, when it ran); one which takes only
+the model is called with the model alone, queued or not. A queued
+observer runs on another thread, or on another thread's event loop,
+while propogation goes on, so it should go by the snapshot rather
+than reading the model's cells. (A L{DictCell}'s or L{ListCell}'s
+new value is a shallow copy of its contents.)
+
+C{"thread"} observers run on a small thread pool and C{"asyncio"}
+observers on an event loop in a thread of its own, where an C{async
+def} observer is awaited. The observers of one model with one
+executor run one at a time, in the order they'd have run inline:
+datapulse by datapulse, and by priority within one. Observers of
+different models may run at once. L{flush_observers} waits for all
+queued observers to finish. If one raises something which isn't an
+C{Exception} (C{KeyboardInterrupt}, say), the observers queued
+behind it for that model are dropped.
+
+@var EXECUTORS: The executors an observer may be given
+
+@var THREADS: How many threads C{"thread"} observers run on
+"""
+
+import asyncio
+import collections
+import copy
+import inspect
+import sys
+import threading
+
+from . import trace as _trace
+from .aio import _run_coroutine
+from .cell import Cell
+
+EXECUTORS = ("thread", "asyncio")
+
+THREADS = 4
+
+#: what a queued observer is told about the attribute which set it off
+ObservedChange = collections.namedtuple(
+    "ObservedChange", "model name cell old_value new_value")
+
+_local = threading.local()   # .dispatching: in a dispatcher thread
+
+
+def snapshot(model, attr, name=None):
+    """
+    snapshot(model, attr, name=None) -> ObservedChange
+
+    Returns an L{ObservedChange} for C{attr}, a cell of C{model} or
+    the value of its non-cell attribute C{name}.
+    """
+    if isinstance(attr, Cell):
+        new_value = attr.value
+        if attr.read_as_cell:  # the container changes in place
+            new_value = copy.copy(new_value)
+        return ObservedChange(model, attr.name, attr, attr.last_value,
+                              new_value)
+    return ObservedChange(model, name, None, None, attr)
+
+
+class _Dispatcher(object):
+    """
+    Runs queued observers, a lane per model and executor.
+
+    @ivar lanes: The jobs waiting in each lane, by C{(executor,
+        id(model))}. A lane is here while it's being drained.
+
+    @ivar outstanding: How many jobs are queued or running
+
+    @ivar errors: The exceptions raised by observers since the last
+        L{flush_observers}
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.lanes = {}
+        self.outstanding = 0
+        self.errors = []
+        self.pool = None
+        self.loop = None
+
+    def submit(self, executor, observer, model, change):
+        """
+        submit(self, executor, observer, model, change) -> None
+
+        Queues C{observer} to run for C{model} on C{executor}.
+        """
+        key = (executor, id(model))
+        job = (observer, model, change)
+        with self.lock:
+            self.outstanding += 1
+            lane = self.lanes.get(key)
+            if lane is not None:  # it's being drained; get in line
+                lane.append(job)
+                return
+            self.lanes[key] = collections.deque([job])
+            if executor == "thread":
+                pool = self._pool()
+            else:
+                loop = self._loop()
+        if executor == "thread":
+            pool.submit(self._drain, key)
+        else:
+            asyncio.run_coroutine_threadsafe(self._drain_async(key), loop)
+
+    def _pool(self):
+        if self.pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.pool = ThreadPoolExecutor(THREADS, "cells-observer")
+        return self.pool
+
+    def _loop(self):
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=self._run_loop,
+                                      name="cells-observer-loop")
+            thread.daemon = True
+            thread.start()
+        return self.loop
+
+    def _run_loop(self):
+        _local.dispatching = True
+        asyncio.set_event_loop(self.loop)
+        while True:
+            try:
+                self.loop.run_forever()
+                return
+            except BaseException:
+                # an observer's KeyboardInterrupt or SystemExit, which
+                # the loop lets out; it's been counted as the observer's
+                # error, so carry on
+                pass
+
+    def _next(self, key):
+        """Returns the lane's next job, or None once it's empty"""
+        with self.lock:
+            lane = self.lanes[key]
+            if lane:
+                return lane.popleft()
+            del self.lanes[key]
+            return None
+
+    def _done(self, error=None, dropped=0):
+        with self.lock:
+            if error is not None:
+                self.errors.append(error)
+            self.outstanding -= 1 + dropped
+            if not self.outstanding:
+                self.idle.notify_all()
+
+    def _abandon(self, key):
+        """
+        Drops the lane whose running job raised something which isn't
+        an C{Exception}, counting that job and those behind it done,
+        so later observers get a lane of their own and
+        L{flush_observers} doesn't wait for them.
+        """
+        with self.lock:
+            dropped = len(self.lanes.pop(key, ()))
+        self._done(sys.exc_info()[1], dropped)
+
+    def _drain(self, key):
+        _local.dispatching = True
+        job = self._next(key)
+        try:
+            while job is not None:
+                observer, model, change = job
+                start = _trace.clock()
+                try:
+                    if observer.takes_change:
+                        result = observer.func(model, change)
+                    else:
+                        result = observer.func(model)
+                    if inspect.isawaitable(result):
+                        _run_coroutine(result)
+                except Exception as e:
+                    self._done(e)
+                else:
+                    self._finished(observer, model, start)
+                job = self._next(key)
+        finally:
+            if job is not None:  # left by a BaseException
+                self._abandon(key)
+
+    async def _drain_async(self, key):
+        job = self._next(key)
+        try:
+            while job is not None:
+                observer, model, change = job
+                start = _trace.clock()
+                try:
+                    if observer.takes_change:
+                        result = observer.func(model, change)
+                    else:
+                        result = observer.func(model)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    self._done(e)
+                else:
+                    self._finished(observer, model, start)
+                job = self._next(key)
+        finally:
+            if job is not None:  # left by a BaseException
+                self._abandon(key)
+
+    def _finished(self, observer, model, start):
+        tracer = _trace.tracer
+        if tracer is not None:
+            tracer.on_observer(observer, model, _trace.clock() - start)
+        self._done()
+
+    def flush(self, timeout=None):
+        """See L{flush_observers}"""
+        if getattr(_local, "dispatching", False):
+            raise RuntimeError("flush_observers() called from a queued "
+                               "observer would wait for itself")
+        with self.lock:
+            if not self.idle.wait_for(lambda: not self.outstanding,
+                                      timeout):
+                raise TimeoutError("%d queued observers still running" %
+                                   self.outstanding)
+            errors, self.errors = self.errors, []
+        if errors:
+            raise errors[0]
+
+
+_dispatcher = _Dispatcher()
+
+
+def submit(executor, observer, model, change):
+    """Queues C{observer} to run for C{model}; see L{_Dispatcher}"""
+    _dispatcher.submit(executor, observer, model, change)
+
+
+def flush_observers(timeout=None):
+    """
+    flush_observers(timeout=None) -> None
+
+    Waits until every queued observer has run, including those they
+    queued in turn. If any of them raised an exception since the last
+    flush, raises the first one.
+
+    @param timeout: Give up after this many seconds
+
+    @raise TimeoutError: If observers are still running at C{timeout}
+
+    @raise RuntimeError: If called from a queued observer
+    """
+    _dispatcher.flush(timeout)
@@ -0,0 +1,213 @@
+# PyCells: Automatic dataflow management for Python
+# Copyright (C) 2006, Ryan Forsythe
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# See LICENSE for the full license text.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Exports the dependency graph around some cells, for Graphviz or for
+scripts:
+
+    >>> with cells.profile() as p:
+    ...     run_the_app()
+    ...
+    >>> open("cells.dot", "w").write(
+    ...     cells.export_graph(app_models, format="dot", profile=p))
+
+Starting from the given cells (or every cell of the given models),
+L{export_graph} follows what each cell calls and is called by, so the
+export covers everything connected to them. Each node is labelled
+with its model's class, its attribute name and its cell type, and
+carries its fan-in (how many cells it reads) and fan-out (how many
+cells read it), which is what gives away a hub such as a C{parent}
+cell read by every kid. Given a L{Profile}, nodes also carry the run
+counts and times recorded for their class and attribute, and the DOT
+output draws the heaviest ones thickest.
+
+@var FORMATS: The formats L{export_graph} can write
+"""
+
+import json
+
+from .cell import Cell
+
+FORMATS = ("dot", "json")
+
+#: the profile counter L{export_graph} weighs nodes by, for each name
+WEIGHTS = ("runs", "cumtime", "selftime", "checks", "fanout")
+
+
+def _roots(root_or_models):
+    """Returns the cells to start walking from"""
+    if isinstance(root_or_models, Cell) or \
+            not hasattr(root_or_models, "__iter__"):
+        root_or_models = [root_or_models]
+    roots = []
+    for root in root_or_models:
+        if isinstance(root, Cell):
+            roots.append(root)
+        else:  # a model; start from every cell built in it
+            roots.extend(value for value in list(vars(root).values())
+                         if isinstance(value, Cell))
+    return roots
+
+
+def _walk(roots, depth):
+    """
+    _walk(roots, depth) -> (list, list)
+
+    Returns the cells connected to C{roots} within C{depth} hops (any
+    number if None), in the order found, and the C{(called, caller)}
+    edges among them.
+    """
+    found = []
+    seen = {}
+    frontier = []
+    for cell in roots:
+        if id(cell) not in seen:
+            seen[id(cell)] = cell
+            found.append(cell)
+            frontier.append(cell)
+
+    hops = 0
+    while frontier and (depth is None or hops < depth):
+        hops += 1
+        reached = []
+        for cell in frontier:
+            for other in list(cell.calls_list()) + \
+                    list(cell.called_by_list()):
+                if other is not None and id(other) not in seen:
+                    seen[id(other)] = other
+                    found.append(other)
+                    reached.append(other)
+        frontier = reached
+
+    edges = []
+    for cell in found:
+        for called in cell.calls_list():
+            if called is not None and id(called) in seen:
+                edges.append((called, cell))
+    return found, edges
+
+
+def _describe(cells_found, edges, profile, weight):
+    """Returns a dict describing each cell, keyed on id(cell)"""
+    fanin = dict((id(cell), 0) for cell in cells_found)
+    fanout = dict(fanin)
+    for called, caller in edges:
+        fanout[id(called)] += 1
+        fanin[id(caller)] += 1
+
+    models = {}
+    nodes = {}
+    for n, cell in enumerate(cells_found):
+        owner = cell.owner
+        node = {
+            "id": n,
+            "name": cell.name,
+            "type": type(cell).__name__,
+            "owner": type(owner).__name__ if owner is not None else None,
+            "model": (models.setdefault(id(owner), len(models))
+                      if owner is not None else None),
+            "fanin": fanin[id(cell)],
+            "fanout": fanout[id(cell)],
+        }
+        if profile is not None:
+            stats = profile.cells.get((type(owner), cell.name))
+            for counter in WEIGHTS:
+                node[counter] = getattr(stats, counter) if stats else 0
+            node["weight"] = node[weight]
+        nodes[id(cell)] = node
+    return nodes
+
+
+def _label(node):
+    if node["owner"] is None:
+        label = str(node["name"])
+    else:
+        label = "%s.%s" % (node["owner"], node["name"])
+    label += "\\n%s" % node["type"]
+    label += "\\nin %d, out %d" % (node["fanin"], node["fanout"])
+    if "runs" in node:
+        label += "\\n%d runs, %.3gs" % (node["runs"], node["cumtime"])
+    return label
+
+
+def _dot(nodes, edges):
+    lines = ["digraph cells {", "    node [shape=box];"]
+    heaviest = max([node.get("weight", 0) for node in nodes.values()] + [0])
+    for node in sorted(nodes.values(), key=lambda node: node["id"]):
+        attrs = 'label="%s"' % _label(node).replace('"', '\\"')
+        if heaviest and node.get("weight"):
+            attrs += ", penwidth=%.2f" % (1 + 4.0 * node["weight"] /
+                                          heaviest)
+        if node["type"].endswith("LazyCell"):
+            attrs += ", style=dashed"
+        lines.append("    n%d [%s];" % (node["id"], attrs))
+    for called, caller in edges:
+        lines.append("    n%d -> n%d;" % (nodes[id(called)]["id"],
+                                          nodes[id(caller)]["id"]))
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def _json(nodes, edges):
+    return json.dumps({
+        "nodes": sorted(nodes.values(), key=lambda node: node["id"]),
+        "edges": [{"source": nodes[id(called)]["id"],
+                   "target": nodes[id(caller)]["id"]}
+                  for called, caller in edges],
+    }, indent=2, sort_keys=True)
+
+
+def export_graph(root_or_models, format="dot", profile=None,
+                 weight="runs", depth=None):
+    """
+    export_graph(root_or_models, format="dot", profile=None,
+    weight="runs", depth=None) -> str
+
+    Returns the dependency graph connected to C{root_or_models} as a
+    Graphviz DOT digraph or a JSON document. Edges point the way
+    changes flow, from the cell read to the cell whose rule reads it.
+    JSON nodes carry C{id}, C{name}, C{type}, C{owner} (the model's
+    class name), C{model} (a number per model instance), C{fanin} and
+    C{fanout}, and, given a profile, the counters in L{WEIGHTS} and
+    C{weight}; edges carry C{source} and C{target} ids.
+
+    @param root_or_models: A cell or model, or a sequence of them
+
+    @param profile: A L{Profile} whose recorded runs weigh the nodes
+
+    @param weight: The profile counter (one of L{WEIGHTS}) the DOT
+        output draws heavier nodes thicker for
+
+    @param depth: Follow edges at most this many hops from the roots;
+        by default, as far as they go
+
+    @raise ValueError: If C{format} isn't one of L{FORMATS}, or
+        C{weight} isn't one of L{WEIGHTS}
+    """
+    if format not in FORMATS:
+        raise ValueError("unknown graph format %r; use one of %s" %
+                         (format, ", ".join(FORMATS)))
+    if weight not in WEIGHTS:
+        raise ValueError("can't weigh nodes by %r; use one of %s" %
+                         (weight, ", ".join(WEIGHTS)))
+
+    found, edges = _walk(_roots(root_or_models), depth)
+    nodes = _describe(found, edges, profile, weight)
+    if format == "dot":
+        return _dot(nodes, edges)
+    return _json(nodes, edges)
@@ -36,10 +36,35 @@ def _debug(*msgs):
 
     Prints debug messages.
     """
-    msgs = list(msgs)
+    if not (DEBUG or cells.DEBUG):
+        return
+    msgs = [str(msg) for msg in msgs]
     msgs.insert(0, "family".rjust(cells._DECO_OFFSET) + " > ")
-    if DEBUG or cells.DEBUG:
-        print(" ".join(msgs))
+    print(" ".join(msgs))
+
+
+def _kid_overrides(kid_slots):
+    """
+    _kid_overrides(kid_slots) -> list
+
+    Returns the names of the attributes a L{Family} copies from its
+    C{kid_slots} class into the classes of the kids it makes.
+    """
+    family_names = set(dir(Family))
+    override_attrnames = []
+    for attrname in dir(kid_slots):
+        cvar = getattr(kid_slots, attrname)
+        # if it's a cell attribute, check to see if it's one of
+        # the "special", non-overriding slots (eg kids)
+        if isinstance(cvar, CellAttr):
+            if cvar.kid_overrides:
+                # and if it isn't, add it to the list of overrides
+                override_attrnames.append(attrname)
+        # if it's a normal attribute, override only if it doesn't
+        # exist in the base class (and isn't the class's init plan)
+        elif attrname not in family_names and attrname != "_init_plan":
+            override_attrnames.append(attrname)
+    return override_attrnames
 
 
 class Family(Model):
@@ -73,39 +98,35 @@ class Family(Model):
 
         @param klass: The base type for the new kid instance
         """
+        kid_slots = self.kid_slots
         if not klass:
-            klass = self.kid_slots
-        _debug("making an instance of", str(klass))
+            klass = kid_slots
+        _debug("making an instance of", klass)
         # first, find the attributes the kid_slots attrib actual wants to
-        # define:
-        override_attrnames = []
-        for attrname in dir(self.kid_slots):
-            cvar = getattr(self.kid_slots, attrname)
-            # if it's a cell attribute, check to see if it's one of
-            # the "special", non-overriding slots (eg kids)
-            if isinstance(cvar, CellAttr):
-                if cvar.kid_overrides:
-                    # and if it isn't, add it to the list of overrides
-                    override_attrnames.append(attrname)
-            # if it's a normal attribute, override only if it doesn't
-            # exist in the base class
-            else:
-                if attrname not in dir(cells.Family):
-                    override_attrnames.append(attrname)
-
-        # now, do the overrides, bypassing normal getattrs
-        for attrib_name in override_attrnames:
-            _debug("overriding", attrib_name, "in", str(klass))
-            setattr(klass, attrib_name, self.kid_slots.__dict__[attrib_name])
+        # define. they're worked out once per kid_slots class, and
+        # thrown away with its init plan when the class changes
+        plan = kid_slots.init_plan()
+        if plan.kid_overrides is None:
+            plan.kid_overrides = _kid_overrides(kid_slots)
+
+        # now, do the overrides, bypassing normal getattrs. (overrides
+        # already in place are skipped, so klass keeps its init plan)
+        for attrib_name in plan.kid_overrides:
+            override = kid_slots.__dict__[attrib_name]
+            if klass.__dict__.get(attrib_name) is not override:
+                _debug("overriding", attrib_name, "in", klass)
+                setattr(klass, attrib_name, override)
 
         # add any observers the kid_slots class defines:
-        klass._observernames.update(self.kid_slots._observernames)
-
-        # XXX: should we memoize all that work here?
+        added = kid_slots._observernames - klass._observernames
+        if added:
+            klass._observernames.update(added)
+            klass._forget_plans()  # its observer index is out of date
 
         # finally, return an instance of that munged class with this obj set
         # as its parent:
-        i = klass(parent=self)
+        with self._world:  # kids live in their family's world
+            i = klass(parent=self)
         return i
 
     def make_kid(self, klass):
@@ -118,7 +139,7 @@ class Family(Model):
 
         @param klass: the base type for the new kid instance
         """
-        _debug("make_kid called with", str(klass))
+        _debug("make_kid called with", klass)
         self._add_kid(self._kid_instance(klass))
 
     def _add_kid(self, kid):
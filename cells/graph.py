@@ -0,0 +1,146 @@
+# PyCells: Automatic dataflow management for Python
+# Copyright (C) 2006, Ryan Forsythe
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# See LICENSE for the full license text.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Graph, the storage for the dependency graph between C{L{Cell}}s.
+
+A cell which takes part in the graph is given a small integer id and
+a L{_Node} in a L{Graph}. The node is the one weak reference held to
+the cell, and it carries the cell's edges as sets of ids of the cells
+on the other end. Adding or following an edge doesn't allocate, and
+cells are still garbage collected normally: when one dies, its node
+is queued, and the next L{Graph.collect} unlinks it from its
+neighbours and frees its id for reuse.
+"""
+
+import weakref
+
+
+class _Node(weakref.ref):
+    """
+    A cell's entry in a L{Graph}. Calling the node returns the cell,
+    or None if it has been collected.
+
+    @ivar id: The cell's id in the graph
+
+    @ivar calls: Set of ids of the cells this cell's rule calls, or
+        None if there aren't any yet
+
+    @ivar called_by: Set of ids of the cells whose rules call this
+        cell, or None if there aren't any yet
+    """
+
+    __slots__ = ('id', 'calls', 'called_by')
+
+
+class Graph(object):
+    """
+    The registry of cell ids and their edges.
+
+    @ivar nodes: The L{_Node}s, indexed by id. Freed ids hold None
+        until they're reused.
+
+    @ivar edges_kept: How many edges rule runs found already in place
+
+    @ivar edges_added: How many edges rule runs added
+
+    @ivar edges_dropped: How many edges rule runs removed because the
+        rule stopped reading the cell
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self._free = []
+        self._dead = []
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        reset_stats(self) -> None
+
+        Zeroes the edge counters.
+        """
+        self.edges_kept = 0
+        self.edges_added = 0
+        self.edges_dropped = 0
+
+    def stats(self):
+        """
+        stats(self) -> dict
+
+        Returns the edge counters, and the number of edges rewired
+        (added plus dropped), by name.
+        """
+        return {"kept": self.edges_kept,
+                "added": self.edges_added,
+                "dropped": self.edges_dropped,
+                "rewired": self.edges_added + self.edges_dropped}
+
+    def register(self, cell):
+        """
+        register(self, cell) -> _Node
+
+        Gives C{cell} an id and returns its node.
+        """
+        node = _Node(cell, self._dead.append)
+        node.calls = None
+        node.called_by = None
+        if self._free:
+            node.id = self._free.pop()
+            self.nodes[node.id] = node
+        else:
+            node.id = len(self.nodes)
+            self.nodes.append(node)
+        return node
+
+    def cell(self, id):
+        """
+        cell(self, id) -> Cell
+
+        Returns the live cell with the passed id, or None.
+        """
+        node = self.nodes[id]
+        return node() if node is not None else None
+
+    def collect(self):
+        """
+        collect(self) -> None
+
+        Unlinks the cells which have died since the last collect from
+        their neighbours and frees their ids. This mutates other
+        nodes' edge sets, so it's only run when nothing can be
+        iterating over them.
+        """
+        nodes = self.nodes
+        while self._dead:
+            dead, self._dead[:] = self._dead[:], []
+            for node in dead:
+                for id in node.calls or ():
+                    other = nodes[id]
+                    if other is not None and other.called_by:
+                        other.called_by.discard(node.id)
+                for id in node.called_by or ():
+                    other = nodes[id]
+                    if other is not None and other.calls:
+                        other.calls.discard(node.id)
+                nodes[node.id] = None
+                self._free.append(node.id)
+
+    def __len__(self):
+        """The number of live ids"""
+        return len(self.nodes) - len(self._free) - len(self._dead)
@@ -0,0 +1,183 @@
+# PyCells: Automatic dataflow management for Python
+# Copyright (C) 2006, Ryan Forsythe
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# See LICENSE for the full license text.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Memo, a bounded record of a rule's recent results.
+
+A rule cell built with C{memo=N} remembers, for its last C{N} runs,
+which cells the rule read, what their values were, and what the rule
+returned. When the cell next needs to rerun and every cell one of
+those runs read holds the same value again, the remembered result is
+used and the rule isn't called:
+
+    >>> class A(cells.Model):
+    ...     mode = cells.makecell(value="fast")
+    ...     @cells.fun2cell(memo=4)
+    ...     def plan(self, prev):
+    ...         print("planning")
+    ...         return expensive_plan(self.mode)
+    ...
+    >>> a = A()
+    planning
+    >>> a.mode = "safe"
+    planning
+    >>> a.mode = "fast"
+    >>> a.__dict__["plan"].memo.hits
+    1
+
+Values are compared with each read cell's C{unchanged_if}, so they
+needn't be hashable. Only memoize rules whose result depends on
+nothing but the cells they read; the rule's C{prev} argument, for
+one, isn't part of what's remembered.
+
+@var DEBUG: Turns on debugging messages for the memo module.
+"""
+
+DEBUG = False
+
+import cells
+
+
+def _debug(*msgs):
+    """
+    debug() -> None
+
+    Prints debug messages.
+    """
+    if not (DEBUG or cells.DEBUG):
+        return
+    msgs = [str(msg) for msg in msgs]
+    msgs.insert(0, "memo".rjust(cells._DECO_OFFSET) + " > ")
+    print(" ".join(msgs))
+
+
+def _current(cell, world):
+    """
+    _current(cell, world) -> bool
+
+    Returns True if C{cell} is up to date in C{world}'s datapulse
+    without running anything: the cases L{Cell.updatecell} settles in
+    O(1).
+    """
+    if not cell.bound:
+        return False
+    if cell.dp == world.dp or cell.changed_dp == world.dp:
+        return True
+    return not cell.stale and (world.curr_propogator is None or
+                               cell.height < world.drain_height)
+
+
+class Memo(object):
+    """
+    The remembered results of one rule cell, most recently used last.
+
+    @ivar size: How many results are kept
+
+    @ivar hits: How many reruns used a remembered result
+
+    @ivar misses: How many reruns had to call the rule
+    """
+
+    __slots__ = ('size', 'entries', 'hits', 'misses')
+
+    def __init__(self, size):
+        """
+        @raise ValueError: If C{size} is less than 1
+        """
+        if size < 1:
+            raise ValueError("memo size must be at least 1")
+        self.size = size
+        self.entries = []  #: (nodes, values, result) tuples
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, cell):
+        """
+        lookup(self, cell) -> tuple or None
+
+        Returns the C{(nodes, values, result)} entry whose read cells
+        all hold the values they held when it was recorded, or None
+        if there isn't one, counting a hit or a miss.
+
+        Only cells which are already current are compared. A read
+        cell which would have to be brought up to date counts as a
+        mismatch, as does one which has died: the entry's run may
+        have read it only because of a value the current state
+        doesn't have, so running its rule could raise or do needless
+        work.
+        """
+        entries = self.entries
+        world = cell.world
+        for i in range(len(entries) - 1, -1, -1):
+            entry = entries[i]
+            nodes, values, result = entry
+            for node, value in zip(nodes, values):
+                read = node()
+                if read is None or not _current(read, world):
+                    break
+                if not read.unchanged_if(value, read.value):
+                    break
+            else:
+                _debug(cell.name, "memo hit")
+                self.hits += 1
+                if i != len(entries) - 1:
+                    del entries[i]
+                    entries.append(entry)
+                return entry
+
+        _debug(cell.name, "memo miss")
+        self.misses += 1
+        return None
+
+    def record(self, cell, result):
+        """
+        record(self, cell, result) -> None
+
+        Remembers C{result} as what C{cell}'s rule computed from the
+        current values of the cells it calls, evicting the least
+        recently used entry if the memo is full. Nothing is
+        remembered if the rule read a L{DictCell} or L{ListCell}:
+        they're changed in place, so an old value can't be told
+        from the current one.
+        """
+        containers = (cells.DictCell, cells.ListCell)
+        graphnodes = cell.world.graph.nodes
+        nodes = []
+        values = []
+        for id in cell.calls:
+            # the node, not the id: ids are reused once a cell dies
+            node = graphnodes[id]
+            read = node() if node is not None else None
+            if read is None or isinstance(read, containers):
+                return
+            nodes.append(node)
+            values.append(read.value)
+        self.entries.append((tuple(nodes), tuple(values), result))
+        if len(self.entries) > self.size:
+            del self.entries[0]
+
+    def clear(self):
+        """
+        clear(self) -> None
+
+        Forgets every remembered result. The counters are kept.
+        """
+        del self.entries[:]
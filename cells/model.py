@@ -23,11 +23,15 @@ may be embedded.
 @var DEBUG: Turns on debugging messages for the model module.
 """
 
+import gc
+from itertools import chain
+
 import cells
-from .cell import Cell, EphemeralCellUnboundError
+from .cell import Cell, EphemeralCellUnboundError, AsyncCellPendingError
 from .cellattr import CellAttr
 from .observer import Observer, ObserverAttr
-import collections
+from .dispatch import EXECUTORS
+from . import aio
 
 DEBUG = False
 
@@ -38,10 +42,125 @@ def debug(*msgs):
 
     Prints debug messages.
     """
-    msgs = list(msgs)
+    if not (DEBUG or cells.DEBUG):
+        return
+    msgs = [str(msg) for msg in msgs]
     msgs.insert(0, "model".rjust(cells._DECO_OFFSET) + " > ")
-    if DEBUG or cells.DEBUG:
-        print(" ".join((str(msg) for msg in msgs)))
+    print(" ".join(msgs))
+
+
+class _InitPlan(object):
+    """
+    What L{Model.__init__} does for every instance of a class, worked
+    out once. See L{ModelMetatype.init_plan}.
+
+    @ivar cells: C{(name, cellattr, eager)} for each cell attribute,
+        in C{dir()} order; C{eager} is False for always-lazy cells,
+        which aren't evaluated at init unless overridden to be
+
+    @ivar override_names: The names a constructor keyword may override
+
+    @ivar builds: C{(name, cellattr, eager, celltype, kwargs)} for
+        each cell attribute, in C{dir()} order: what to build when it
+        isn't overridden, for L{Model.create_many}. C{celltype} is
+        None if the cell attribute doesn't say what to build.
+
+    @ivar observer_order: The names of the class's observers, in
+        priority order
+
+    @ivar observer_index: For each attribute name some observer
+        watches, the names of the observers which watch it, including
+        those which watch every attribute, in priority order
+
+    @ivar observer_wildcard: The names of the observers which watch
+        every attribute, in priority order; they're all an attribute
+        missing from C{observer_index} has
+
+    @ivar shared: The names of the shared input cell attributes (see
+        L{CellAttr}) no observer watches, which a model leaves
+        unbuilt unless they're overridden
+
+    @ivar kid_overrides: The names a L{Family} copies from this class
+        into the classes of the kids it makes, once one has; see
+        C{Family._kid_instance}
+    """
+
+    __slots__ = ('cells', 'override_names', 'builds', 'observer_order',
+                 'observer_index', 'observer_wildcard', 'shared',
+                 'kid_overrides')
+
+    def __init__(self, klass):
+        names = dir(klass)
+        self.override_names = frozenset(names)
+        self.kid_overrides = None
+        self.cells = []
+        self.builds = []
+        for name in names:
+            cellattr = getattr(klass, name, None)
+            if isinstance(cellattr, CellAttr):
+                celltype = cellattr.kwargs.get('celltype', object)
+                eager = not issubclass(celltype, cells.AlwaysLazyCell)
+                self.cells.append((name, cellattr, eager))
+                kwargs = dict(cellattr.kwargs, name=name)
+                self.builds.append((name, cellattr, eager,
+                                    cellattr.celltype(kwargs), kwargs))
+
+        observers = []
+        for name in klass._observernames:
+            observerattr = getattr(klass, name, None)
+            if isinstance(observerattr, ObserverAttr):
+                observers.append((name, observerattr))
+        observers.sort(key=lambda observer: _priority_key(observer[1]),
+                       reverse=True)
+        self.observer_order = tuple(name for name, observerattr in observers)
+        self.observer_wildcard = tuple(name for name, observerattr
+                                       in observers
+                                       if not observerattr.attribs)
+        watched = set()
+        for name, observerattr in observers:
+            watched.update(observerattr.attribs or ())
+        self.observer_index = {}
+        for attrib in watched:
+            self.observer_index[attrib] = tuple(
+                name for name, observerattr in observers
+                if not observerattr.attribs or attrib in observerattr.attribs)
+
+        # observers hear about a cell when it's built, so watched
+        # cells are built with the model
+        self.shared = frozenset(
+            name for name, cellattr, eager in self.cells
+            if cellattr.shared and not self.observer_wildcard and
+            name not in self.observer_index)
+
+
+def _priority_key(observer):
+    """Sorts observers by priority, larger first (reversed), None last"""
+    return (observer.priority is not None, observer.priority or 0)
+
+
+def _cellinit(value):
+    """
+    _cellinit(value) -> dict
+
+    Normalizes a constructor keyword overriding a cell into the
+    keyword arguments for building it: a rule, a dict of cell
+    arguments, or a value.
+
+    @raise BadInitError: If C{value} is a dict without any of
+        C{'rule'}, C{'value'} or C{'celltype'}
+    """
+    if callable(value):
+        return {'rule': value}
+    if hasattr(value, 'keys'):
+        # kinda ran out of synonyms/shortened versions of keys,
+        # here. I just want to see if any of 'rule', 'value', or
+        # 'celltype' are in the keys of the dict in value:
+        for qui in ('rule', 'value', 'celltype'):
+            if qui in value:
+                return value
+        raise BadInitError(
+            "A cell initialization dictionary was not built. Try wrapping your value or rule assignment in a dictionary.")
+    return {'value': value}
 
 
 class ModelMetatype(type):
@@ -69,10 +188,44 @@ class ModelMetatype(type):
                 debug("registering observer", k)
                 klass._observernames.add(k)
 
+            elif k.startswith("__"):  # class machinery, not an attribute
+                continue
+
             else:  # non-cell, non-observer attrib
                 debug("registering noncell", k)
                 klass._noncells.add(k)
 
+    def init_plan(klass):
+        """
+        init_plan(klass) -> _InitPlan
+
+        Returns the plan L{Model.__init__} follows for C{klass},
+        working it out on the first call. Setting or deleting a class
+        attribute throws away the plans of the class and its
+        subclasses.
+        """
+        plan = klass.__dict__.get("_init_plan")
+        if plan is None:
+            plan = _InitPlan(klass)
+            type.__setattr__(klass, "_init_plan", plan)
+        return plan
+
+    def _forget_plans(klass):
+        pending = [klass]
+        while pending:
+            cls = pending.pop()
+            if "_init_plan" in cls.__dict__:
+                type.__delattr__(cls, "_init_plan")
+            pending.extend(cls.__subclasses__())
+
+    def __setattr__(klass, name, value):
+        type.__setattr__(klass, name, value)
+        klass._forget_plans()
+
+    def __delattr__(klass, name):
+        type.__delattr__(klass, name)
+        klass._forget_plans()
+
 
 class Model(object, metaclass=ModelMetatype):
     """
@@ -81,6 +234,15 @@ class Model(object, metaclass=ModelMetatype):
     altered at runtime by passing C{attrname=value}, or
     C{attrname=hash} to the constructor.
 
+    A model belongs to the L{World} which is current when it's
+    created, and its cells are built in that world.
+
+    A plain input cell attribute which a model doesn't override, and
+    no observer watches, isn't built at C{L{__init__}}-time; reading
+    it returns the class's default value until it's set or read by a
+    rule, when its cell is built. Models which leave most of their
+    inputs alone cost a fraction of the memory. See L{CellAttr}.
+
     @ivar model_name: A cell holding The name of this Model. By
         default, None.
 
@@ -89,9 +251,15 @@ class Model(object, metaclass=ModelMetatype):
 
     @ivar parent: A cell for C{L{Family}} graph traversal. By default,
         None.
+
+    @cvar evaluation: How this class's rule cells are brought up to
+        date: C{"push"}, C{"pull"}, or None (the default) to use the
+        graph-wide mode. See L{cells.set_evaluation}.
     """
 
     _initialized = False
+    _observer_plan = None
+    evaluation = None
 
     model_name = cells.makecell(value=None, kid_overrides=False)
     model_value = cells.makecell(value=None, kid_overrides=False)
@@ -154,73 +322,227 @@ class Model(object, metaclass=ModelMetatype):
             attributes will be overridden in the cell. Otherwise, it
             will override the value of the target cell.
         """
+        # not a registered non-cell; observers needn't hear about it
+        world = cells.current_world()
+        object.__setattr__(self, "_world", world)
         self._initregistry = {}
-        klass = self.__class__
+        plan = type(self).init_plan()
 
         # do automagic overriding:
         for k, v in kwargs.items():  # for each keyword arg
-            if k in dir(klass):  # if there's a match in my class
-                # normalize the input
-                if isinstance(v, collections.Callable):
-                    cellinit = {'rule': v}
-                elif 'keys' in dir(v):
-                    # kinda ran out of synonyms/shortened versions of
-                    # keys, here. I just want to see if any of 'rule',
-                    # 'value', or 'celltype' are in the keys of the
-                    # dict in v:
-                    quays = list(v.keys())
-                    for qui in ('rule', 'value', 'celltype'):
-                        if qui in quays:
-                            cellinit = v
-                            break
-                else:
-                    cellinit = {'value': v}
-
-                if not cellinit:
-                    raise BadInitError(
-                        "A cell initialization dictionary was not built. Try wrapping your value or rule assignment in a dictionary.")
-
+            if k in plan.override_names:  # if there's a match in my class
                 # set the new init in the registry for this cell name; to be
                 # read at cell-build time
-                self._initregistry[k] = cellinit
+                self._initregistry[k] = _cellinit(v)
 
-        # turn the observer name registry into a list of real Observers
-        self._observers = []
-        for name in self._observernames:
-            self._observers.append(getattr(self, name))
-        self._prioritize_observers()
+        if world.constructing is not None:
+            # create_many equalizes this model, and runs its
+            # observers, once every model in the batch is made
+            self._observers = []
+            world.constructing.append(self)
+            return
 
-        # do initial equalizations
+        self._make_observers()
+        self._equalize(plan)
+
+        # run observers on non-cell attributes
+        if self._observers:
+            for key in list(self._noncells):
+                self._run_observers(getattr(self, key), key)
+
+        # and now we're initialized. lock the object down.
+        self._initialized = True
+
+    def _make_observers(self):
+        """Turns the observer name registry into a list of real Observers"""
+        plan = type(self).init_plan()
+        self._observers = [getattr(self, name)
+                           for name in plan.observer_order]
+        # (not a registered non-cell; observers needn't hear about it)
+        object.__setattr__(self, "_observer_plan", plan)
+
+    def _equalize(self, plan):
+        """
+        _equalize(self, plan) -> None
+
+        Builds and evaluates this model's cells which aren't
+        always-lazy, as the class's L{_InitPlan} lists them.
+        """
         debug("INITIAL EQUALIZATIONS START")
-        for name in dir(self):
+        overrides = self._initregistry
+        shared = plan.shared
+        for name, cellattr, eager in plan.cells:
             try:
                 # if it's not been otherwise initialized
-                debug("examining", name)
-                if name not in self.__dict__:
-                    debug(name, "is already in this object")
-                    # grab the cell attr and figure out if it's an always-lazy
-                    cellattr = getattr(self.__class__, name)
-                    if isinstance(cellattr, cells.CellAttr):
-                        kwargs = cellattr.getkwargs(self)
-                        debug(name, "is a cellattr with kwargs", repr(kwargs))
-                        # if it isn't an always-lazy
-                        if issubclass(kwargs.get('celltype', object),
-                                      cells.AlwaysLazyCell):
-                            debug(name, "should be init'd")
-                            # get it, initializing it
-                            getattr(self, name)  # will run observers by itself
-                        else:
-                            debug(name, "is an always-lazy")
+                if name in self.__dict__:
+                    continue
+                if name in shared and name not in overrides:
+                    continue  # the class's default serves until it's set
+                if name in overrides:  # the celltype may be overridden
+                    kwargs = cellattr.getkwargs(self)
+                    debug(name, "is a cellattr with kwargs", kwargs)
+                    eager = not issubclass(kwargs.get('celltype', object),
+                                           cells.AlwaysLazyCell)
+                # if it isn't an always-lazy
+                if eager:
+                    # build it (which runs its observers) and evaluate
+                    # it; a read would be served a shared default
+                    cell = cellattr.getcell(self)
+                    if not cell.read_as_cell:
+                        cell.getvalue()
+                else:
+                    debug(name, "is an always-lazy")
             except EphemeralCellUnboundError as e:
                 debug(name, "was an unbound ephemeral")
+            except AsyncCellPendingError as e:
+                debug(name, "waits on an async rule")
+                self._world.pending.append(self.__dict__[name])
         debug("INITIAL EQUALIZATIONS END")
 
-        # run observers on non-cell attributes
-        for key in self._noncells:
-            self._run_observers(getattr(self, key))
+    @classmethod
+    def create_many(klass, rows):
+        """
+        create_many(rows) -> list
+
+        Makes an instance of this class for each mapping of
+        constructor keywords in C{rows}; the result is that of
+        C{[klass(**row) for row in rows]}, with the work done in
+        batches rather than an instance at a time:
+
+            >>> class Point(cells.Model):
+            ...     x = cells.makecell(value=0)
+            ...     y = cells.makecell(value=0)
+            ...     @cells.fun2cell()
+            ...     def norm(self, prev):
+            ...         return abs(self.x) + abs(self.y)
+            ...
+            >>> points = Point.create_many({'x': n, 'y': -n}
+            ...                            for n in range(3))
+            >>> [p.norm for p in points]
+            [0, 2, 4]
+
+        Each instance is made, then the cells of all of them are
+        built, then evaluated, then the observers of each one run. The
+        observers don't run as each cell is built, so those watching
+        new or old values see the evaluated ones. Models which the
+        made ones make as they're initialized are part of the batch.
+
+        The cyclic garbage collector is paused while the batch is
+        made. Every model and cell is a new object, and otherwise the
+        collector would walk the growing heap over and over, which
+        costs about as much as making the models does.
+
+        @param rows: An iterable of dicts of constructor keywords
+        """
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            return klass._create_batch(rows)
+        finally:
+            if collecting:
+                gc.enable()
 
-        # and now we're initialized. lock the object down.
-        self._initialized = True
+    @classmethod
+    def _create_batch(klass, rows):
+        """Does the work of L{create_many}"""
+        world = cells.current_world()
+        outer, world.constructing = world.constructing, []
+        try:
+            made = [klass(**row) for row in rows]
+        finally:
+            batch, world.constructing = world.constructing, outer
+
+        built = [model._build_eager() for model in batch]
+        for model, eager in zip(batch, built):
+            for cell in eager:
+                if cell.read_as_cell:  # read as itself, never evaluated
+                    continue
+                try:
+                    cell.getvalue()
+                except EphemeralCellUnboundError as e:
+                    debug(cell.name, "was an unbound ephemeral")
+                except AsyncCellPendingError as e:
+                    debug(cell.name, "waits on an async rule")
+                    model._world.pending.append(cell)
+
+        for model in batch:
+            model._make_observers()
+            observers = model._observers
+            if observers:
+                dp = model._world.dp
+                own = [(value, value.name)
+                       for value in model.__dict__.values()
+                       if isinstance(value, Cell)]
+                noncells = ((getattr(model, key), key)
+                            for key in list(model._noncells))
+                for attribute, name in chain(own, noncells):
+                    model._run_observers(attribute, name)
+                    # observers run once per datapulse at most, so
+                    # once they all have the rest can't run them
+                    for observer in observers:
+                        if observer.last_ran != dp:
+                            break
+                    else:
+                        break
+            model._initialized = True
+        return made
+
+    def _build_eager(self):
+        """
+        _build_eager(self) -> list
+
+        Builds this model's cells which aren't always-lazy, without
+        evaluating them, and returns them. For L{create_many}.
+        """
+        built = []
+        own = self.__dict__
+        overrides = self._initregistry
+        plan = type(self).init_plan()
+        shared = plan.shared
+        for name, cellattr, eager, celltype, kwargs in plan.builds:
+            if name in own:
+                continue
+            if name in shared and name not in overrides:
+                continue
+            if name in overrides or celltype is None:
+                # the usual way, which sorts out (or complains about)
+                # what to build
+                kwargs = cellattr.getkwargs(self)
+                if issubclass(kwargs.get('celltype', object),
+                              cells.AlwaysLazyCell):
+                    continue
+                own[name] = cellattr.buildcell(self, *cellattr.args,
+                                               **kwargs)
+            elif eager:
+                own[name] = celltype(self, *cellattr.args, **kwargs)
+            else:
+                continue
+            built.append(own[name])
+        return built
+
+    @classmethod
+    def create_columns(klass, columns):
+        """
+        create_columns(columns) -> list
+
+        Like L{create_many}, but the constructor keywords come as a
+        dict of equally long sequences, one per keyword:
+
+            >>> points = Point.create_columns({'x': [0, 1, 2],
+            ...                                'y': [0, -1, -2]})
+
+        @param columns: A dict of sequences of constructor values
+
+        @raise ValueError: If the sequences differ in length
+        """
+        names = list(columns)
+        values = [columns[name] for name in names]
+        if len(set(len(column) for column in values)) > 1:
+            raise ValueError("create_columns: columns differ in length: " +
+                             ", ".join("%s=%d" % (name, len(columns[name]))
+                                       for name in names))
+        return klass.create_many(dict(zip(names, row))
+                                 for row in zip(*values))
 
     def __setattr__(self, key, value):
         """
@@ -234,34 +556,85 @@ class Model(object, metaclass=ModelMetatype):
             object.__setattr__(self, key, value)
         # we can set noncells before init
         elif not self._initialized:
-            if key not in self._noncells:  # make sure it's registered, though
+            # make sure it's registered, though, unless it's a cell
+            # attribute whose cell isn't built yet
+            if key not in self._noncells and \
+                    not isinstance(getattr(type(self), key, None), CellAttr):
                 self._noncells.add(key)
             object.__setattr__(self, key, value)  # and then set it
         # we can set anything we've not seen, too
-        elif key not in list(self.__dict__.keys()):
+        elif key not in self.__dict__:
             object.__setattr__(self, key, value)
         # but the only thing left is non-cells we've seen, which is verboten
         else:
             raise NonCellSetError("Setting non-cell attributes of models " + \
                                   "after init is disallowed")
 
-    def _run_observers(self, attribute):
-        """Runs each observer in turn. There's some optimization that
-        could go on here, if it turns out to be neccessary.
+    def _run_observers(self, attribute, name=None):
         """
-        debug("model running observers -- ", str(len(self._observers)),
-              "to test")
-        for observer in self._observers:
-            observer.run_if_applicable(self, attribute)
+        _run_observers(self, attribute, name=None) -> None
+
+        Runs the observers which watch C{attribute}, in priority
+        order. They're found by name in the class's observer index, so
+        observers of other attributes cost nothing.
+
+        @param attribute: A cell, or the value of a non-cell attribute
+
+        @param name: The non-cell attribute's name. Without it, every
+            observer is asked whether it watches the value.
+        """
+        plan = self._observer_plan
+        if plan is None:  # not yet initialized, or made by create_many
+            return
+        if name is None:
+            if not isinstance(attribute, Cell):
+                for observer in self._observers:
+                    observer.run_if_applicable(self, attribute)
+                return
+            name = attribute.name
+        own = self.__dict__
+        for observer in plan.observer_index.get(name,
+                                                plan.observer_wildcard):
+            own[observer].run_matched(self, attribute, name)
+
+    async def cell_async(self, name):
+        """
+        cell_async(self, name) -> value
+
+        Returns the up-to-date value of the cell attribute C{name},
+        awaiting any async rules that takes. See L{cells.aio}.
+        """
+        cell = getattr(type(self), name).getcell(self)
+        return await aio.getvalue_async(cell)
+
+    async def set_async(self, name, value):
+        """
+        set_async(self, name, value) -> None
+
+        Sets the cell attribute C{name} to C{value}, then awaits the
+        async rules the change left pending (see L{cells.settle}).
+        """
+        setattr(self, name, value)
+        await aio.settle(self._world)
+
+    def _observes(self, name):
+        """
+        _observes(self, name) -> bool
+
+        Does any of this model's observers watch the cell named
+        C{name}? Observers without an attribute watch every cell.
+        """
+        plan = self._observer_plan
+        if plan is None:
+            return False
+        return bool(plan.observer_index.get(name, plan.observer_wildcard))
 
     def _buildcell(self, name, *args, **kwargs):
         """
         
         """
-        debug("Building cell: owner:", str(self))
-        debug("                name:", name)
-        debug("                args:", str(args))
-        debug("              kwargs:", str(kwargs))
+        debug("Building cell", name, "in", self, "args:", args,
+              "kwargs:", kwargs)
         # figure out what type the user wants:
         if 'celltype' in kwargs:
             celltype = kwargs["celltype"]
@@ -279,33 +652,29 @@ class Model(object, metaclass=ModelMetatype):
         kwargs['name'] = name
         return celltype(self, *args, **kwargs)
 
-    def _prioritize_observers(self):
-        """
-	_prioritize_observers(self) -> none
-
-	(re)Sorts the observer list by priorities
-	"""
-        self._observers.sort(key=lambda x: x.priority,
-                             reverse=True)
-
     @classmethod
     def observer(klass, attrib=None, oldvalue=None, newvalue=None,
-                 priority=None):
+                 priority=None, executor=None):
         """
-        observer(attrib=None, oldvalue=None, newvalue=None, priority=Non) -> decorator
+        observer(attrib=None, oldvalue=None, newvalue=None, priority=None,
+        executor=None) -> decorator
 
         A classmethod to add an observer attribute to a Model. The
         observer may be set to fire on any change in the model, any
         change in an attribute, or when a function testing the new or
         old value of a cell returns true.
 
+        The decorated function is called with the model, and if it
+        takes a second argument, an L{ObservedChange} describing the
+        attribute which set it off, whether it's queued or not.
+
 	    >>> import cells
 	    >>> class A(cells.Model):
 	    ...     x = cells.makecell(value=4)
 	    ... 
 	    >>> @A.observer(attrib="x", newvalue=lambda a: a % 2)
 	    ... def odd_x_obs(model):
-	    ...     print "New value of x is odd!"
+	    ...     print("New value of x is odd!")
 	    ... 
 	    >>> a = A()
 	    >>> a.x
@@ -333,13 +702,23 @@ class Model(object, metaclass=ModelMetatype):
             priorities are run first, None last. Observers with the
             same priority are run in arbitrary order.
 
+        @param executor: C{"thread"} or C{"asyncio"} to queue the
+            observer and run it off the propogation path, rather than
+            in the datapulse. See L{cells.dispatch}.
+
+        @raise ValueError: If C{executor} isn't one of
+            L{cells.dispatch.EXECUTORS}
         """
+        if executor is not None and executor not in EXECUTORS:
+            raise ValueError("unknown observer executor %r; use one of %s" %
+                             (executor, ", ".join(EXECUTORS)))
 
         def observer_decorator(func):
             klass._observernames.add(func.__name__)
             setattr(klass, func.__name__, ObserverAttr(func.__name__, attrib,
                                                        oldvalue, newvalue,
-                                                       func))
+                                                       func, priority,
+                                                       executor))
 
         return observer_decorator
 
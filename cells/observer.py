@@ -24,16 +24,50 @@ the observer, such as cell name or statements about the cell's value.
 @var DEBUG: Turns on debugging messages for the observer module.
 """
 
+import functools
+import inspect
+
 import cells
 from cells import Cell
+from . import trace as _trace
+from . import dispatch as _dispatch
 
 DEBUG = False
 
 def _debug(*msgs):
-    msgs = list(msgs)
+    if not (DEBUG or cells.DEBUG):
+        return
+    msgs = [str(msg) for msg in msgs]
     msgs.insert(0, "observer".rjust(cells._DECO_OFFSET) + " > ")
-    if DEBUG or cells.DEBUG:
-        print(" ".join(msgs))
+    print(" ".join(msgs))
+
+@functools.lru_cache(maxsize=None)
+def _takes_change(func):
+    """
+    _takes_change(func) -> bool
+
+    Does observer function C{func} take an L{ObservedChange} after
+    the model, that is, two arguments without defaults?
+    """
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):  # a builtin, say
+        return False
+    required = [param for param in params
+                if param.default is param.empty and
+                param.kind in (param.POSITIONAL_ONLY,
+                               param.POSITIONAL_OR_KEYWORD)]
+    return len(required) >= 2
+
+
+def _attribs(attrib):
+    """Returns the names an observer's C{attrib} watches, or None"""
+    if not attrib:
+        return None
+    if isinstance(attrib, str):
+        return (attrib,)
+    return tuple(attrib)
+
 
 # we want observers to be defined at the class level but have per-instance
 # information. So, do the same trick as is done with CellAttr/Cells
@@ -41,17 +75,26 @@ class ObserverAttr(object):
     """
     Wrapper for Observers within Models. Will auto-vivify an Observer
     within a Model instance the first time it's called. 
+
+    @ivar attribs: The attribute names the observer watches, or None
+        if it watches them all
+
+    @ivar priority: The observer's priority
     """
     def __init__(self, name, *args, **kwargs):
         self.name, self.args, self.kwargs = name, args, kwargs
+        params = dict(zip(("attrib", "oldvalue", "newvalue", "func",
+                           "priority", "executor"), args))
+        params.update(kwargs)
+        self.attribs = _attribs(params.get("attrib"))
+        self.priority = params.get("priority")
 
     def __get__(self, owner, ownertype):
         if not owner: return self
         # if there isn't a value in owner.myname, make it an observer
         _debug("got request for observer", self.name,
-              "args =", str(self.args),
-              "kwargs =", str(self.kwargs))
-        if self.name not in list(owner.__dict__.keys()):
+               "args =", self.args, "kwargs =", self.kwargs)
+        if self.name not in owner.__dict__:
             owner.__dict__[self.name] = Observer(*self.args,
                                                  **self.kwargs)
         return owner.__dict__[self.name]
@@ -77,21 +120,21 @@ class Observer(object):
     >>> @A.observer(attrib="x",
     ...             newvalue=lambda a: a % 2)
     ... def odd_x_obs(model):
-    ...     print "New value of x is odd!"
+    ...     print("New value of x is odd!")
     ...
     >>> @A.observer(attrib="x")
     ... def x_obs(model):
-    ...     print "x got changed!"
+    ...     print("x got changed!")
     ...
     >>> @A.observer()
     ... def model_obs(model):
-    ...     print "something in the model changed"
+    ...     print("something in the model changed")
     ...
     >>> @A.observer(attrib="x",
     ...             newvalue=lambda a: a % 2,
     ...             oldvalue=lambda a: not (a % 2))
     ... def was_even_now_odd_x_obs(model):
-    ...     print "New value of x is odd, and it was even!"
+    ...     print("New value of x is odd, and it was even!")
     ...
     >>> a = A()
     something in the model changed
@@ -133,10 +176,21 @@ class Observer(object):
 
     @ivar last_ran: The DP this observer last ran in. Observers only
         run once per DP.
+
+    @ivar executor: C{"thread"} or C{"asyncio"} to queue this observer
+        rather than run it in the datapulse, or None. See
+        L{cells.dispatch}.
+
+    @ivar takes_change: Whether C{func} is called with an
+        L{ObservedChange} after the model, as it takes two arguments,
+        rather than the model alone. It's called the same way whether
+        it's queued or not.
     """
     
-    def __init__(self, attrib, oldvalue, newvalue, func, priority=None):
-        """__init__(self, attrib, oldvalue, newvalue, func, priority)
+    def __init__(self, attrib, oldvalue, newvalue, func, priority=None,
+                 executor=None):
+        """__init__(self, attrib, oldvalue, newvalue, func, priority,
+        executor)
 
         Initializes a new Observer. All arguments are required, but
         only func is required to be anything but none.
@@ -144,10 +198,13 @@ class Observer(object):
         See attrib, oldvalue, and newvalue instance variable docs for
         explanation of their utility."""
         self.attrib_name = attrib
+        self._attribs = _attribs(attrib)
         self.oldvalue = oldvalue
         self.newvalue = newvalue
         self.func = func
         self.priority = priority
+        self.executor = executor
+        self.takes_change = _takes_change(func)
         self.last_ran = 0
 
     def run_if_applicable(self, model, attr):
@@ -160,40 +217,43 @@ class Observer(object):
 
         @param attr: the attribute which "asked" this observer to run.
         """
-        _debug("running observer", self.func.__name__)
-        if self.last_ran == cells.cellenv.dp:   # never run twice in one DP
-            _debug(self.func.__name__, "already ran in this dp")
+        if self.last_ran == model._world.dp:   # never run twice in one DP
             return
         
-        if self.attrib_name:
-            if isinstance(self.attrib_name, str):
-                attrs = (self.attrib_name,)
-            else:
-                attrs = self.attrib_name
-
-        for attrib_name in attrs:
-            if isinstance(attr, Cell):
-                if attr.name == attrib_name:
-                    _debug("found a cell with matching name!")
+        if self._attribs:
+            for attrib_name in self._attribs:
+                if isinstance(attr, Cell):
+                    if attr.name == attrib_name:
+                        break
+                elif not isinstance(model.__dict__.get(attrib_name), Cell) \
+                        and getattr(model, attrib_name) is attr:
                     break
-            elif getattr(model, attrib_name) is attr:
-                _debug(self.func.__name__, "looked in its model for an " +
-                   "attrib with its desired name; found one that " +
-                   "matched passed attr.")
-                break
             else:
-                _debug("Attribute name tests failed")
-        return
+                return
+
+        self.run_matched(model, attr)
+
+    def run_matched(self, model, attr, name=None):
+        """
+        Fire if this observer hasn't in this DP, and the old and new
+        value tests pass. The caller has checked C{attr} is one this
+        observer watches; L{Model._run_observers} does so by name.
+
+        @param model: the model instance C{attr} is in
+
+        @param attr: the attribute which "asked" this observer to run.
+
+        @param name: the attribute's name, if it isn't a cell
+        """
+        if self.last_ran == model._world.dp:   # never run twice in one DP
+            return
 
         if self.newvalue:
             if isinstance(attr, Cell):
                 if not self.newvalue(attr.value):
-                    _debug(self.func.__name__,
-                          "function didn't match cell's new value")
                     return
             else:
                 if not self.newvalue(attr):
-                    _debug(self.func.__name__, "function didn't match non-cell")
                     return
 
         # since this is immediately post-value change, the last_value attr
@@ -201,11 +261,20 @@ class Observer(object):
         if self.oldvalue:
             if isinstance(attr, Cell):
                 if not self.oldvalue(attr.last_value):
-                    _debug(self.func.__name__,
-                           "function didn't match old value")
                     return
 
         # if we're here, it passed all the tests, so
-        _debug(self.func.__name__, "running")
-        self.func(model)
-        self.last_ran = cells.cellenv.dp
+        change = self.takes_change and _dispatch.snapshot(model, attr, name)
+        if self.executor is not None:
+            _dispatch.submit(self.executor, self, model, change)
+            self.last_ran = model._world.dp
+            return
+        tracer = _trace.tracer
+        start = tracer is not None and _trace.clock()
+        if change:
+            self.func(model, change)
+        else:
+            self.func(model)
+        if tracer is not None:
+            tracer.on_observer(self, model, _trace.clock() - start)
+        self.last_ran = model._world.dp
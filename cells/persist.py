@@ -0,0 +1,600 @@
+# PyCells: Automatic dataflow management for Python
+# Copyright (C) 2006, Ryan Forsythe
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# See LICENSE for the full license text.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Rule results kept on disk, so a new process can reuse them.
+
+A rule cell built with C{persist=True} stores what its rule returns
+in a L{Store}, an sqlite database, keyed by a hash of the rule (its
+class, attribute and code; see L{_fold}) and of the values of the
+cells it read.
+There's no default store: call L{set_store} before a persisted rule
+runs, or it raises L{StoreNotSetError}.
+When the cell next needs to run, in this process or a later one, and
+the cells it read last time hold values it has a result for, that
+result is used and the rule isn't called:
+
+    >>> cells.set_store(cells.Store("/var/cache/myapp/rules.sqlite"))
+    >>> class Page(cells.Model):
+    ...     source = cells.makecell(value="")
+    ...     @cells.fun2cell(persist=True)
+    ...     def html(self, prev):
+    ...         return render(self.source)     # slow
+    ...
+
+The cells a rule read are found again by attribute: a cell of the
+rule's own model by its name, and a cell of another model by the
+name of the attribute of the rule's model which holds that model
+(C{self.site.theme}, say). A run which read a cell it can't find
+that way isn't stored. Values are pickled to hash them, so they
+must be picklable. A model in a value is keyed by its class and its
+C{model_name}, which must name it the same way in every process; a
+run which read a model without one isn't stored. Results must be
+picklable too, and are stored only if the
+rule read no L{DictCell} or L{ListCell}. As with L{cells.memo}, only
+persist rules whose result depends on nothing but the cells they
+read.
+
+The hash of a rule takes in the functions and constants it uses,
+but only those it names directly, by module-level name or closure:
+an object reached through an attribute (C{helpers.render},
+C{self.renderer}) is taken by name or type, not by what it does.
+When what a rule computes changes in a way its code doesn't show,
+pass a version in place of True, and change it along with the rule:
+
+    >>> @cells.fun2cell(persist="2")
+    ... def html(self, prev):
+    ...     return helpers.render(self.source)
+
+The store keeps its total size under C{max_bytes}, evicting the
+least recently used results first, and counts its hits, misses,
+writes, evictions, the results it skipped and those it couldn't
+read back; see L{Store.stats}.
+
+@var DEBUG: Turns on debugging messages for the persist module.
+
+@var MAX_BYTES: The default bound on a store's size
+
+@var TRACES: How many different sets of read cells are remembered
+    for each rule
+"""
+
+DEBUG = False
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import types
+import weakref
+
+import cells
+
+MAX_BYTES = 64 * 1024 * 1024
+
+TRACES = 4
+
+#: pickle protocol for keys; fixed, so keys don't change with Python
+_KEY_PROTOCOL = 4
+
+store = None
+
+
+def _debug(*msgs):
+    """
+    debug() -> None
+
+    Prints debug messages.
+    """
+    if not (DEBUG or cells.DEBUG):
+        return
+    msgs = [str(msg) for msg in msgs]
+    msgs.insert(0, "persist".rjust(cells._DECO_OFFSET) + " > ")
+    print(" ".join(msgs))
+
+
+def set_store(obj):
+    """
+    set_store(obj) -> Store
+
+    Makes C{obj} the L{Store} persisted rules use and returns the one
+    it replaces, which is left open. Pass None to unset it.
+    """
+    global store
+    old, store = store, obj
+    return old
+
+
+def current_store():
+    """
+    current_store() -> Store
+
+    Returns the L{Store} persisted rules use.
+
+    @raise StoreNotSetError: If L{set_store} hasn't been given one
+    """
+    if store is None:
+        raise StoreNotSetError("a persisted rule ran, but no store is "
+                               "set; call cells.set_store first")
+    return store
+
+
+class StoreNotSetError(Exception):
+    """A persisted rule ran before L{set_store} was called."""
+
+
+class Store(object):
+    """
+    An sqlite database of rule results.
+
+    @ivar path: The database's file
+
+    @ivar max_bytes: The most bytes of results kept
+
+    @ivar size: The bytes of results kept now
+
+    @ivar hits: How many runs used a stored result
+
+    @ivar misses: How many runs had to call the rule
+
+    @ivar writes: How many results were stored
+
+    @ivar evictions: How many results were evicted to make room
+
+    @ivar skipped: How many results weren't stored, being too big or
+        unpicklable, or read from cells which can't be found again
+
+    @ivar errors: How many stored results or read paths couldn't be
+        read back, being corrupt or naming classes which have gone,
+        or as the database failed; the rule was run instead
+    """
+
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        """
+        @param path: The database's file, made if it doesn't exist,
+            along with its directory
+
+        @param max_bytes: The most bytes of results to keep
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, isolation_level=None,
+                                  check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS results "
+                        "(key BLOB PRIMARY KEY, value BLOB, "
+                        "size INTEGER, used INTEGER)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_used "
+                        "ON results (used)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS traces "
+                        "(rule TEXT, reads BLOB, used INTEGER, "
+                        "PRIMARY KEY (rule, reads))")
+        self.size, self.clock = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0), MAX(COALESCE(MAX(used), 0), "
+            "(SELECT COALESCE(MAX(used), 0) FROM traces)) "
+            "FROM results").fetchone()
+        self.traces = {}  #: rule -> its read paths, most recent first
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def _count(self, counter):
+        """Adds one to the counter named C{counter}"""
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _tick(self):
+        self.clock += 1
+        return self.clock
+
+    def get(self, key):
+        """
+        get(self, key) -> bytes or None
+
+        Returns the pickled result stored under C{key}, or None,
+        marking it as just used.
+        """
+        with self.lock:
+            row = self.db.execute("SELECT value FROM results WHERE key = ?",
+                                  (key,)).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE results SET used = ? WHERE key = ?",
+                            (self._tick(), key))
+            return row[0]
+
+    def put(self, key, value):
+        """
+        put(self, key, value) -> None
+
+        Stores the pickled result C{value} under C{key}, evicting the
+        least recently used results if the store's over
+        C{max_bytes}. A result bigger than that isn't stored.
+        """
+        with self.lock:
+            if len(value) > self.max_bytes:
+                self.skipped += 1
+                return
+            row = self.db.execute("SELECT size FROM results WHERE key = ?",
+                                  (key,)).fetchone()
+            if row is not None:
+                self.size -= row[0]
+            self.db.execute("INSERT OR REPLACE INTO results "
+                            "VALUES (?, ?, ?, ?)",
+                            (key, value, len(value), self._tick()))
+            self.size += len(value)
+            self.writes += 1
+            while self.size > self.max_bytes:
+                oldest = self.db.execute(
+                    "SELECT key, size FROM results ORDER BY used "
+                    "LIMIT 32").fetchall()
+                for old, size in oldest:
+                    if self.size <= self.max_bytes:
+                        break
+                    self.db.execute("DELETE FROM results WHERE key = ?",
+                                    (old,))
+                    self.size -= size
+                    self.evictions += 1
+
+    def read_paths(self, rule):
+        """
+        read_paths(self, rule) -> list
+
+        Returns the sets of read paths stored for C{rule}, most
+        recently stored first. Each is a tuple of attribute name
+        tuples, one per cell read.
+        """
+        paths = self.traces.get(rule)
+        if paths is None:
+            with self.lock:
+                rows = self.db.execute(
+                    "SELECT reads FROM traces WHERE rule = ? "
+                    "ORDER BY used DESC", (rule,)).fetchall()
+            paths = self.traces[rule] = [pickle.loads(row[0])
+                                         for row in rows]
+        return paths
+
+    def add_read_paths(self, rule, reads):
+        """
+        add_read_paths(self, rule, reads) -> None
+
+        Stores C{reads} as the read paths of C{rule}'s latest run,
+        forgetting the least recent if it has more than L{TRACES}.
+        """
+        paths = self.read_paths(rule)
+        if paths and paths[0] == reads:
+            return
+        if reads in paths:
+            paths.remove(reads)
+        paths.insert(0, reads)
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO traces VALUES (?, ?, ?)",
+                            (rule, _dumps(reads), self._tick()))
+            for old in paths[TRACES:]:
+                self.db.execute("DELETE FROM traces WHERE rule = ? AND "
+                                "reads = ?", (rule, _dumps(old)))
+        del paths[TRACES:]
+
+    def stats(self):
+        """
+        stats(self) -> dict
+
+        Returns the counters, and the number and total bytes of the
+        results stored, by name.
+        """
+        with self.lock:
+            entries = self.db.execute(
+                "SELECT COUNT(*) FROM results").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses,
+                "writes": self.writes, "evictions": self.evictions,
+                "skipped": self.skipped, "errors": self.errors,
+                "entries": entries,
+                "bytes": self.size}
+
+    def clear(self):
+        """
+        clear(self) -> None
+
+        Forgets every stored result and read path. The counters are
+        kept.
+        """
+        with self.lock:
+            self.db.execute("DELETE FROM results")
+            self.db.execute("DELETE FROM traces")
+            self.traces.clear()
+            self.size = 0
+
+    def close(self):
+        """
+        close(self) -> None
+
+        Closes the database.
+        """
+        self.db.close()
+
+
+class _KeyPickler(pickle.Pickler):
+    """
+    Pickles values the same way in every process: sets sorted, and
+    models as their class's and C{model_name}'s names.
+    """
+
+    def persistent_id(self, obj):
+        if isinstance(obj, cells.Model):
+            # looked up without a read, as no rule's reading it
+            name = obj.__dict__.get("model_name")
+            if name is None or name.value is None:
+                raise pickle.PicklingError("can't key on a model with "
+                                           "no model_name")
+            klass = type(obj)
+            return "%s.%s:%s" % (klass.__module__, klass.__qualname__,
+                                 _dumps(name.value).hex())
+        if isinstance(obj, cells.Cell):
+            raise pickle.PicklingError("can't key on a cell")
+        return None
+
+    def reducer_override(self, obj):
+        if type(obj) in (set, frozenset):
+            return type(obj), (sorted(obj, key=_dumps),)
+        return NotImplemented
+
+
+def _dumps(obj):
+    """Returns C{obj} pickled by L{_KeyPickler}"""
+    buffer = _Buffer()
+    _KeyPickler(buffer, _KEY_PROTOCOL).dump(obj)
+    return b"".join(buffer)
+
+
+class _Buffer(list):
+    write = list.append
+
+
+#: model class -> {(attribute, rule, version): rule id}
+_rule_ids = weakref.WeakKeyDictionary()
+
+#: what reading a stored result back can raise, if it's corrupt or
+#: names something which has gone
+_UNREADABLE = (sqlite3.Error, pickle.UnpicklingError, EOFError,
+               ImportError, AttributeError)
+
+#: constants hashed by value; other objects a rule holds, by type
+_CONSTANTS = frozenset((type(None), bool, int, float, complex, str, bytes,
+                        type(Ellipsis)))
+
+
+def _fold(hash, obj, seen, namespace=None):
+    """
+    _fold(hash, obj, seen, namespace=None) -> None
+
+    Feeds C{obj}, part of a rule, to C{hash}: a function's code,
+    defaults and closure, and a code object's bytecode, names and
+    constants, code objects among them included. The module-level
+    names a code object uses are looked up in C{namespace}, its
+    function's globals, and what they hold is fed in too, so editing
+    a helper function or constant a rule calls changes the rule's
+    hash. Modules and classes are fed in by name. Other objects are
+    fed in by value if they're constants, and by type otherwise, as
+    their value may be no more than the rule's own state (a log, a
+    cache). C{seen} holds the ids of the functions and code objects
+    already fed in.
+    """
+    kind = type(obj)
+    if kind in _CONSTANTS:
+        hash.update(("%s:%r;" % (kind.__name__, obj)).encode())
+    elif kind in (tuple, frozenset):
+        items = sorted(obj, key=repr) if kind is frozenset else obj
+        hash.update(("%s:%d(" % (kind.__name__, len(obj))).encode())
+        for item in items:
+            _fold(hash, item, seen, namespace)
+        hash.update(b")")
+    elif kind is types.CodeType:
+        if id(obj) in seen:
+            return
+        seen.add(id(obj))
+        hash.update(obj.co_code)
+        hash.update(repr((obj.co_names, obj.co_freevars)).encode())
+        _fold(hash, obj.co_consts, seen, namespace)
+        if namespace is not None:
+            for name in obj.co_names:
+                if name in namespace:
+                    hash.update(("%s=" % name).encode())
+                    _fold(hash, namespace[name], seen, namespace)
+    elif kind is types.FunctionType:
+        if id(obj) in seen:
+            return
+        seen.add(id(obj))
+        namespace = obj.__globals__
+        _fold(hash, obj.__code__, seen, namespace)
+        _fold(hash, obj.__defaults__, seen, namespace)
+        _fold(hash, tuple(sorted((obj.__kwdefaults__ or {}).items())),
+              seen, namespace)
+        for cell in obj.__closure__ or ():
+            try:
+                contents = cell.cell_contents
+            except ValueError:  # not yet assigned
+                contents = None
+            _fold(hash, contents, seen, namespace)
+    elif kind is types.ModuleType:
+        hash.update(("module %s;" % obj.__name__).encode())
+    elif isinstance(obj, type):
+        hash.update(("class %s.%s;" % (obj.__module__,
+                                       obj.__qualname__)).encode())
+    else:
+        hash.update(("%s.%s;" % (kind.__module__,
+                                 kind.__qualname__)).encode())
+
+
+def _rule_id(cell):
+    """
+    _rule_id(cell) -> str
+
+    Returns the name C{cell}'s rule is stored under: its model's
+    class, its attribute and a hash of the rule (see L{_fold}) and of
+    the version it was given as C{persist}, so an edited rule doesn't
+    get the old one's results.
+    """
+    rule = cell.rule
+    klass = type(cell.owner)
+    version = cell.persist
+    ids = _rule_ids.get(klass)
+    if ids is None:
+        ids = _rule_ids[klass] = {}
+    try:
+        return ids[cell.name, rule, version]
+    except KeyError:
+        pass
+    hash = hashlib.sha1(repr(version).encode())
+    function = getattr(rule, "__func__", rule)
+    if hasattr(function, "__code__"):
+        _fold(hash, function, set())
+    else:
+        hash.update(repr(rule).encode())
+    digest = hash.hexdigest()[:16]
+    ident = "%s.%s.%s:%s" % (klass.__module__, klass.__qualname__,
+                             cell.name, digest)
+    ids[cell.name, rule, version] = ident
+    return ident
+
+
+def _key(rule, paths, values):
+    """Returns the key of C{rule}'s result for the read C{values}"""
+    hash = hashlib.sha256(rule.encode())
+    hash.update(_dumps(paths))
+    hash.update(_dumps(values))
+    return hash.digest()
+
+
+def _follow(model, path):
+    """Reads the cell at C{path} from C{model}, as a rule would"""
+    value = getattr(model, path[0])
+    if len(path) > 1:
+        value = getattr(value, path[1])
+    return value
+
+
+def _path(model, read):
+    """
+    _path(model, read) -> tuple or None
+
+    Returns the attribute path from C{model} to the cell C{read}, or
+    None if it hasn't one.
+    """
+    owner = read.owner
+    if owner is model:
+        return (read.name,)
+    if owner is None:
+        return None
+    for name, attr in sorted(model.__dict__.items()):
+        if isinstance(attr, cells.Cell):
+            if not attr.read_as_cell and attr.value is owner:
+                return (name, read.name)
+        elif attr is owner:
+            return (name, read.name)
+    return None
+
+
+def lookup(cell, stack):
+    """
+    lookup(cell, stack) -> (bool, value)
+
+    Looks for a stored result for C{cell}'s rule, reading the cells
+    its stored runs read as the rule would, into C{stack.reads}. If
+    one's found, returns True and it, with C{stack.reads} holding the
+    cells its run read; otherwise returns False. Counts a hit or a
+    miss, and an error for each stored result which can't be read
+    back.
+    """
+    persisted = current_store()
+    rule = _rule_id(cell)
+    model = cell.owner
+    try:
+        stored = persisted.read_paths(rule)
+    except _UNREADABLE as e:
+        _debug(cell.name, "unreadable persisted read paths:", e)
+        persisted._count("errors")
+        stored = ()
+    for paths in stored:
+        stack.reads = set()
+        try:
+            values = tuple(_follow(model, path) for path in paths)
+        except AttributeError:
+            # the run read something this model hasn't now
+            continue
+        try:
+            key = _key(rule, paths, values)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # values which can't be keyed; nothing's stored for them
+            continue
+        try:
+            blob = persisted.get(key)
+            if blob is None:
+                continue
+            value = pickle.loads(blob)
+        except _UNREADABLE as e:
+            _debug(cell.name, "unreadable persisted result:", e)
+            persisted._count("errors")
+            continue
+        _debug(cell.name, "persisted hit")
+        persisted._count("hits")
+        return True, value
+    _debug(cell.name, "persisted miss")
+    persisted._count("misses")
+    return False, None
+
+
+def record(cell, result):
+    """
+    record(cell, result) -> None
+
+    Stores C{result} as what C{cell}'s rule computed from the current
+    values of the cells it calls, if they can be found again and it
+    can be pickled.
+    """
+    persisted = current_store()
+    model = cell.owner
+    reads = []
+    for read in cell.calls_list():
+        if read is None or read.read_as_cell:
+            persisted._count("skipped")
+            return
+        path = _path(model, read)
+        if path is None:
+            persisted._count("skipped")
+            return
+        reads.append((path, read.value))
+    reads.sort(key=lambda read: read[0])
+    paths = tuple(path for path, value in reads)
+    rule = _rule_id(cell)
+    try:
+        key = _key(rule, paths, tuple(value for path, value in reads))
+        value = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        persisted._count("skipped")
+        return
+    persisted.put(key, value)
+    persisted.add_read_paths(rule, paths)
@@ -0,0 +1,281 @@
+# PyCells: Automatic dataflow management for Python
+# Copyright (C) 2006, Ryan Forsythe
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# See LICENSE for the full license text.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+A per-cell propogation profiler.
+
+    >>> with cells.profile() as p:
+    ...     model.x = 5
+    ...
+    >>> p.print_stats(sort="selftime", limit=10)
+
+Cells are grouped by their model's class and attribute name, so the
+thousand C{Row.total} cells of a table come out as one line. For
+each, the profile records:
+
+  - C{runs}: how many times the rule ran
+  - C{cumtime}: the seconds spent in the rule, including the rules
+    of the cells it pulled up to date while it ran
+  - C{selftime}: C{cumtime} less those pulled rules
+  - C{checks}: how many times the cell was checked for currency
+    (read, or verified for a cell which calls it)
+  - C{changed}, C{unchanged}: how many runs changed the value and
+    how many didn't
+  - C{fanout}: how many dependents the cell's changes (runs and sets)
+    propogated to, in total
+
+L{Profile.dump_stats} writes the runs in the format of the standard
+library's C{pstats} module, and C{pstats.Stats(p)} reads a profile
+directly, so the usual tools can browse them; each rule shows up as a
+function named for its cell, called by the cells which pulled it.
+
+The profile is a L{cells.Tracer}, installed for the length of the
+C{with} block in place of any other tracer.
+"""
+
+import marshal
+import sys
+import threading
+
+from .trace import Tracer, set_tracer
+
+#: the columns L{Profile.print_stats} can sort on
+SORT_KEYS = ("runs", "cumtime", "selftime", "checks", "changed",
+             "unchanged", "fanout", "name")
+
+
+def profile():
+    """
+    profile() -> Profile
+
+    Returns a new L{Profile}, to be used as a context manager:
+
+        >>> with cells.profile() as p:
+        ...     model.x = 5
+    """
+    return Profile()
+
+
+class CellStats(object):
+    """
+    What a L{Profile} recorded for one model class and attribute name.
+    See L{cells.profiler} for the counters.
+
+    @ivar name: C{"Class.attribute"}
+
+    @ivar func: The C{(filename, line, name)} of the rule, for
+        C{pstats}
+
+    @ivar callers: Maps the L{CellStats} of each cell which pulled
+        this one to C{[runs, selftime, cumtime]} for those runs
+    """
+
+    __slots__ = ('name', 'func', 'runs', 'cumtime', 'selftime', 'checks',
+                 'changed', 'unchanged', 'fanout', 'callers')
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+        self.runs = 0
+        self.cumtime = 0.0
+        self.selftime = 0.0
+        self.checks = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.fanout = 0
+        self.callers = {}
+
+
+def _fanout(cell):
+    node = cell._node
+    if node is None or not node.called_by:
+        return 0
+    return len(node.called_by)
+
+
+class Profile(Tracer):
+    """
+    Records what each cell's rule costs; see L{cells.profiler}.
+
+    @ivar cells: Maps C{(model class, attribute name)} to L{CellStats}
+
+    @ivar datapulses: How many datapulses started while profiling
+
+    @ivar stats: The C{pstats} data, filled in by L{create_stats}
+    """
+
+    def __init__(self):
+        self.cells = {}
+        self.datapulses = 0
+        self.stats = {}
+        self._local = threading.local()
+        self._old = None
+
+    def __enter__(self):
+        self._old = set_tracer(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        set_tracer(self._old)
+        self._old = None
+        return False
+
+    def _cellstats(self, cell):
+        owner = cell.owner
+        key = (type(owner), cell.name)
+        try:
+            return self.cells[key]
+        except KeyError:
+            pass
+        if owner is None:
+            name = str(cell.name)
+        else:
+            name = "%s.%s" % (type(owner).__name__, cell.name)
+        rule = getattr(cell, "async_rule", None) or cell.rule
+        code = getattr(rule, "__code__", None)
+        if code is None:
+            func = ("~", 0, name)
+        else:
+            func = (code.co_filename, code.co_firstlineno, name)
+        stats = self.cells[key] = CellStats(name, func)
+        return stats
+
+    def _stack(self):
+        try:
+            return self._local.stack
+        except AttributeError:
+            stack = self._local.stack = []
+            return stack
+
+    # tracer hooks
+    def on_set(self, cell, value):
+        self._cellstats(cell).fanout += _fanout(cell)
+
+    def on_check(self, cell):
+        self._cellstats(cell).checks += 1
+
+    def on_start(self, cell):
+        self._stack().append([cell, 0.0])
+
+    def on_run(self, cell, changed, elapsed):
+        stats = self._cellstats(cell)
+        stats.runs += 1
+        stats.cumtime += elapsed
+        if changed:
+            stats.changed += 1
+            stats.fanout += _fanout(cell)
+        else:
+            stats.unchanged += 1
+
+        # take the time spent in the rules this one pulled out of its
+        # self time, and charge this one to whatever pulled it
+        stack = self._stack()
+        for n in range(len(stack) - 1, -1, -1):
+            if stack[n][0] is cell:
+                pulled = stack[n][1]
+                del stack[n:]  # (and any left by rules which raised)
+                break
+        else:  # on an executor or awaited; nothing was nested
+            stats.selftime += elapsed
+            return
+
+        selftime = elapsed - pulled
+        stats.selftime += selftime
+        if stack:
+            stack[-1][1] += elapsed
+            caller = self._cellstats(stack[-1][0])
+            counts = stats.callers.setdefault(caller, [0, 0.0, 0.0])
+            counts[0] += 1
+            counts[1] += selftime
+            counts[2] += elapsed
+
+    def on_propagate(self, world, changed):
+        self.datapulses += 1
+
+    # reports
+    def sorted_stats(self, sort="cumtime"):
+        """
+        sorted_stats(self, sort="cumtime") -> list
+
+        Returns the L{CellStats} of every cell profiled, sorted on
+        C{sort} (one of L{SORT_KEYS}); numbers sort highest first,
+        names alphabetically.
+
+        @raise ValueError: If C{sort} isn't one of L{SORT_KEYS}
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError("can't sort on %r; use one of %s" %
+                             (sort, ", ".join(SORT_KEYS)))
+        stats = list(self.cells.values())
+        if sort == "name":
+            stats.sort(key=lambda s: s.name)
+        else:
+            stats.sort(key=lambda s: (-getattr(s, sort), s.name))
+        return stats
+
+    def print_stats(self, sort="cumtime", limit=None, out=None):
+        """
+        print_stats(self, sort="cumtime", limit=None, out=None) -> None
+
+        Prints a table of the cells profiled, sorted on C{sort} (see
+        L{sorted_stats}).
+
+        @param limit: Print only this many cells
+
+        @param out: The file to print to; by default, C{sys.stdout}
+        """
+        out = out or sys.stdout
+        stats = self.sorted_stats(sort)
+        out.write("%d datapulses, %d cells, %.6f seconds in rules\n\n" %
+                  (self.datapulses, len(stats),
+                   sum(s.selftime for s in stats)))
+        out.write("%8s %11s %11s %9s %8s %9s %8s  %s\n" %
+                  ("runs", "cumtime", "selftime", "checks", "changed",
+                   "unchanged", "fanout", "cell"))
+        for s in stats[:limit]:
+            out.write("%8d %11.6f %11.6f %9d %8d %9d %8d  %s\n" %
+                      (s.runs, s.cumtime, s.selftime, s.checks, s.changed,
+                       s.unchanged, s.fanout, s.name))
+
+    def create_stats(self):
+        """
+        create_stats(self) -> None
+
+        Fills in L{stats} with the rules' runs in C{pstats} format.
+        This is what C{pstats.Stats(profile)} calls.
+        """
+        self.stats = {}
+        for s in self.cells.values():
+            if not s.runs:
+                continue
+            callers = {}
+            for caller, (runs, selftime, cumtime) in s.callers.items():
+                callers[caller.func] = (runs, runs, selftime, cumtime)
+            self.stats[s.func] = (s.runs, s.runs, s.selftime, s.cumtime,
+                                  callers)
+
+    def dump_stats(self, filename):
+        """
+        dump_stats(self, filename) -> None
+
+        Writes the rules' runs to C{filename} in the format
+        C{pstats.Stats(filename)} reads.
+        """
+        self.create_stats()
+        with open(filename, "wb") as f:
+            marshal.dump(self.stats, f)
@@ -0,0 +1,340 @@
+# PyCells: Automatic dataflow management for Python
+# Copyright (C) 2006, Ryan Forsythe
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# See LICENSE for the full license text.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Snapshots of models, which are restored without running any rules:
+
+    >>> blob = cells.snapshot(app_models)
+    >>> open("models.snap", "wb").write(blob)
+    ...
+    >>> app_models = cells.restore(open("models.snap", "rb").read())
+
+A snapshot holds, for each model, the constructor overrides it was
+made with, its non-cell attributes, and for each cell built in it
+the cell's value, whether it's bound, stale or lazy, its height and
+the cells its rule read. Restoring builds the models' cells from
+their classes' cell attributes as C{Model.__init__} would, then puts
+all that back and relinks the dependency graph, so the restored
+models propogate as the originals would have. No rule runs and no
+observer fires. Cells which were stale when snapshotted (lazy cells
+not read since their calls changed, rules of C{"pull"} models) rerun
+when they're next read.
+
+Every model whose cells a snapshotted cell reads, or which turns up
+in a cell's value (a L{Family}'s kids, say), is snapshotted too.
+Models' classes, and the values and overrides in them, are pickled,
+so they must be picklable: classes and rules defined at the top
+level of a module are, lambdas aren't. Always-lazy cells which were
+never read aren't built, so aren't in the snapshot; they're built
+when first read, as usual.
+
+@var VERSION: The snapshot format written, and the one read
+"""
+
+import contextlib
+import gc
+import io
+import pickle
+import zlib
+
+import cells
+from .cell import Cell
+from .cellattr import CellAttr
+from .model import Model
+from .observer import Observer
+
+VERSION = 1
+
+_MAGIC = b"pycells-snapshot"
+
+#: instance attributes of models which are their machinery, not data
+_MACHINERY = frozenset(("_world", "_initregistry", "_observers",
+                        "_observer_plan", "_initialized"))
+
+#: override keys which only change what's put back anyway
+_VALUE_ONLY = frozenset(("value",))
+
+#: types pickled as themselves, which needn't be looked at for models
+_PLAIN = frozenset((type(None), bool, int, float, complex, str, bytes,
+                    tuple, list, dict, set, frozenset))
+
+
+class SnapshotError(Exception):
+    """A model couldn't be snapshotted, or a snapshot restored."""
+
+
+@contextlib.contextmanager
+def _collector_paused():
+    """
+    Pauses the cyclic garbage collector, which otherwise walks the
+    heap over and over as a snapshot's many objects are made; see
+    L{Model.create_many}.
+    """
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
+
+
+class _Pickler(pickle.Pickler):
+    """Pickles models as their index in the snapshot, adding them"""
+
+    def __init__(self, file, index, pending):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.index = index
+        self.pending = pending
+
+    def persistent_id(self, obj):
+        if type(obj) in _PLAIN:  # most of what's pickled
+            return None
+        if isinstance(obj, Model):
+            n = self.index.get(id(obj))
+            if n is None:
+                n = self.index[id(obj)] = len(self.index)
+                self.pending.append(obj)
+            return n
+        if isinstance(obj, Cell):
+            raise SnapshotError("a value holds the cell %r itself" %
+                                (obj.name,))
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    """Unpickles models' indices as the models being restored"""
+
+    def __init__(self, file, models):
+        pickle.Unpickler.__init__(self, file)
+        self.models = models
+
+    def persistent_load(self, pid):
+        return self.models[pid]
+
+
+def _state(model):
+    """
+    _state(model) -> tuple
+
+    Returns what a snapshot keeps of C{model}: its overrides, its
+    non-cell attributes, and its cells, each as C{(name, value, bound,
+    stale, lazy, height, calls)}, where C{calls} are the C{(model,
+    name)} of the cells its rule read.
+    """
+    noncells = {}
+    built = []
+    for name, value in model.__dict__.items():
+        if isinstance(value, Cell):
+            built.append(value)
+        elif name not in _MACHINERY and not isinstance(value, Observer):
+            noncells[name] = value
+
+    cellstates = []
+    for cell in built:
+        calls = []
+        if cell._node is not None and cell._node.calls:
+            for called in cell.calls_list():
+                if called is None:  # died, but not yet collected
+                    continue
+                if not isinstance(called.owner, Model):
+                    raise SnapshotError(
+                        "%s.%s reads a cell which isn't in a model" %
+                        (type(model).__name__, cell.name))
+                calls.append((called.owner, called.name))
+        cellstates.append((cell.name, cell.value, cell.bound, cell.stale,
+                           cell.lazy, cell.height, calls))
+    return (model._initregistry, noncells, cellstates)
+
+
+def snapshot(models):
+    """
+    snapshot(models) -> bytes
+
+    Returns a snapshot of C{models}, and of every model connected to
+    them, for L{restore}.
+
+    @param models: A model, or a sequence of them
+
+    @raise SnapshotError: If a model's state can't be pickled, or one
+        of its cells reads a cell outside of any model
+    """
+    with _collector_paused():
+        return _snapshot(models)
+
+
+def _snapshot(models):
+    """Does the work of L{snapshot}"""
+    single = isinstance(models, Model)
+    roots = [models] if single else list(models)
+    index = {}
+    pending = []
+    for model in roots:
+        if id(model) not in index:
+            index[id(model)] = len(index)
+            pending.append(model)
+
+    # one stream, so the classes and names the models share are
+    # pickled once
+    buffer = io.BytesIO()
+    pickler = _Pickler(buffer, index, pending)
+    classes = []
+    while len(classes) < len(pending):
+        model = pending[len(classes)]
+        try:
+            pickler.dump(_state(model))
+        except (SnapshotError, pickle.PicklingError, TypeError,
+                AttributeError) as e:
+            raise SnapshotError("can't snapshot a %s: %s" %
+                                (type(model).__name__, e))
+        classes.append(type(model))
+
+    roots = [index[id(model)] for model in roots]
+    body = pickle.dumps((VERSION, single, roots, classes, buffer.getvalue()),
+                        pickle.HIGHEST_PROTOCOL)
+    return _MAGIC + zlib.compress(body)
+
+
+def restore(blob):
+    """
+    restore(blob) -> model or list
+
+    Rebuilds the models in a L{snapshot}, in the current L{World},
+    and returns those it was taken of, as it was given them. The
+    other models in it are reachable from those.
+
+    @raise SnapshotError: If C{blob} isn't a snapshot this version of
+        PyCells reads, or a model's class no longer has one of the
+        cells in it
+    """
+    with _collector_paused():
+        return _restore(blob)
+
+
+def _template(klass, name, override, world):
+    """
+    _template(klass, name, override, world) -> Cell
+
+    Returns a template (see C{Cell._restore_template}) for the cell
+    attribute C{name} of C{klass}, as C{override}, the constructor
+    overrides of a model, if it has any, would build it.
+
+    @raise SnapshotError: If C{klass} has no such cell attribute, or
+        it builds its cells with positional arguments
+    """
+    cellattr = getattr(klass, name, None)
+    if not isinstance(cellattr, CellAttr):
+        raise SnapshotError("%s has no cell %r to restore" %
+                            (klass.__name__, name))
+    if cellattr.args:
+        raise SnapshotError("%s.%s is built with positional arguments; "
+                            "it can't be restored" % (klass.__name__, name))
+    kwargs = dict(cellattr.kwargs, name=name)
+    if override:
+        kwargs.update(override)
+    celltype = cellattr.celltype(kwargs)
+    if celltype is None:
+        raise SnapshotError("%s.%s doesn't say what cell to build" %
+                            (klass.__name__, name))
+    return celltype._restore_template(world, kwargs)
+
+
+def _restore(blob):
+    """Does the work of L{restore}"""
+    if not blob.startswith(_MAGIC):
+        raise SnapshotError("not a cells snapshot")
+    version, single, roots, classes, states = pickle.loads(
+        zlib.decompress(blob[len(_MAGIC):]))
+    if version != VERSION:
+        raise SnapshotError("can't read version %r snapshots" % (version,))
+
+    world = cells.current_world()
+    models = []
+    for klass in classes:
+        model = klass.__new__(klass)
+        object.__setattr__(model, "_world", world)
+        models.append(model)
+
+    templates = {}
+    unpickler = _Unpickler(io.BytesIO(states), models)
+    edges = []
+    dp = world.dp
+    for model in models:
+        overrides, noncells, cellstates = unpickler.load()
+        model._initregistry = overrides
+        for name, value in noncells.items():
+            setattr(model, name, value)
+        klass = type(model)
+        own = model.__dict__
+        for name, value, bound, stale, lazy, height, calls in cellstates:
+            override = overrides.get(name)
+            if override is None:
+                key = (klass, name)
+            else:
+                key = (klass, name, tuple(sorted(override)))
+            template = templates.get(key)
+            if template is None:
+                template = _template(klass, name, override, world)
+                if override is None or set(override) <= _VALUE_ONLY:
+                    # the values are put back anyway; one will do
+                    templates[key] = template
+            cell = template._from_template(model)
+            cell.value = value
+            cell.bound = bound
+            cell.stale = stale
+            cell.lazy = lazy
+            cell.height = height
+            # a stale cell's calls may have changed since it last ran,
+            # which the restored changed_dps (all 0) no longer say, so
+            # it's set below them, to rerun when it's next read
+            cell.dp = dp if bound and not stale else -1
+            cell.changed_dp = 0
+            own[name] = cell
+            if calls:
+                edges.append((cell, calls))
+
+    # now every cell's built, link them up as they were. the edges
+    # were consistent when snapshotted, so there's no rediffing or
+    # cycle checking to do; the sets are filled in directly
+    graph = world.graph
+    graph.collect()
+    register = graph.register
+    for cell, calls in edges:
+        node = cell._node
+        if node is None:
+            node = cell._node = register(cell)
+        id = node.id
+        reads = set()
+        for called, name in calls:
+            other = called.__dict__[name]
+            othernode = other._node
+            if othernode is None:
+                othernode = other._node = register(other)
+            reads.add(othernode.id)
+            if othernode.called_by is None:
+                othernode.called_by = set()
+            othernode.called_by.add(id)
+        node.calls = reads
+
+    for model in models:
+        model._make_observers()
+        model._initialized = True
+
+    if single:
+        return models[roots[0]]
+    return [models[n] for n in roots]
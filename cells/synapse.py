@@ -31,10 +31,11 @@ import cells.cell as cell
 DEBUG = False
 
 def debug(*msgs):
-    msgs = list(msgs)
+    if not (DEBUG or cells.DEBUG):
+        return
+    msgs = [str(msg) for msg in msgs]
     msgs.insert(0, "synapse".rjust(cells._DECO_OFFSET) + " > ")
-    if DEBUG or cells.DEBUG:
-        print(" ".join(msgs))
+    print(" ".join(msgs))
 
 class Synapse(cell.Cell):
     """
@@ -66,8 +67,8 @@ class Synapse(cell.Cell):
         # the owner Cell
         if name not in owner.synapse_space: # and if there isn't
             # make one in the owner
-            debug("building new synapse '" + name + "' in", str(owner))
-            owner.synapse_space[name] = cell.Cell.__new__(cls, owner, name=name, **kwargs)
+            debug("building new synapse", repr(name), "in", owner)
+            owner.synapse_space[name] = cell.Cell.__new__(cls)
 
         # finally, return the owner's synapse
         return owner.synapse_space[name]
@@ -101,23 +102,7 @@ class Synapse(cell.Cell):
         Slightly modified version of C{L{Cell.run}()}.
         """
         debug(self.name, "running")
-        # call stack manipulation
-        oldcurr = cells.cellenv.curr
-        cells.cellenv.curr = self
-
-        # the rule run may rewrite the dep graph; prepare for that by nuking
-        # c-b links to this cell and calls links from this cell:
-        for cell in self.calls_list():
-            debug(self.name, "removing c-b link from", cell.name)
-            cell.remove_cb(self)
-        self.reset_calls()
-
-        self.dp = cells.cellenv.dp                     # we're up-to-date
-        newvalue = self.rule(self.owner, self.value)   # run the rule
-        self.bound = True
-        
-        # restore old running cell
-        cells.cellenv.curr = oldcurr
+        newvalue = self._run_rule()
 
         # return changed status
         if self.unchanged_if(self.value, newvalue):
@@ -148,8 +133,8 @@ class ChangeSynapse(Synapse):
         debug("running ChangeSynapse rule")
         newval = self.readvar.getvalue()
         if not oldvalue or abs(newval - oldvalue) > self.delta:
-            debug("returning new value", str(newval))
+            debug("returning new value", newval)
             return newval
         else:
-            debug("returning old value", str(oldvalue))
+            debug("returning old value", oldvalue)
             return oldvalue
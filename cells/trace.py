@@ -0,0 +1,181 @@
+# PyCells: Automatic dataflow management for Python
+# Copyright (C) 2006, Ryan Forsythe
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# See LICENSE for the full license text.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Tracing hooks: a structured view of what propogation is doing.
+
+Install a L{Tracer} (or any object with the same methods) with
+C{L{cells.set_tracer}} and it is told about every set, rule run,
+datapulse, observer run and currency check, in every world:
+
+    >>> class Slow(cells.Tracer):
+    ...     def on_run(self, cell, changed, elapsed):
+    ...         if elapsed > 0.01:
+    ...             print(cell.name, "took", elapsed)
+    ...
+    >>> old = cells.set_tracer(Slow())
+
+With no tracer installed, each event costs a check of C{tracer}
+against None and nothing else; no arguments are built and no clocks
+are read. The same goes for the currency checks and rule runs of a
+tracer which doesn't override L{Tracer.on_check}, or L{Tracer.on_start}
+and L{Tracer.on_run}: those hooks aren't called at all. L{PrintTracer}
+prints the messages C{cells.DEBUG} used to.
+
+Hooks are called from whichever thread the event happens on, so a
+tracer used with L{cells.set_executor} should be thread-safe.
+
+@var tracer: The installed tracer, or None
+
+@var checker: The installed tracer if it overrides C{on_check}, or
+    None
+
+@var runner: The installed tracer if it overrides C{on_start} or
+    C{on_run}, or None
+"""
+
+import sys
+import time
+
+import cells
+
+tracer = None
+checker = None
+runner = None
+
+#: the clock C{elapsed} times are taken from
+clock = time.perf_counter
+
+
+def set_tracer(obj):
+    """
+    set_tracer(obj) -> tracer
+
+    Installs C{obj} as the tracer and returns the one it replaces.
+    Pass None to turn tracing off.
+    """
+    global tracer, checker, runner
+    old, tracer = tracer, obj
+    checker = obj if _overrides(obj, "on_check") else None
+    runner = obj if _overrides(obj, "on_start", "on_run") else None
+    return old
+
+
+def _overrides(obj, *names):
+    """
+    _overrides(obj, *names) -> bool
+
+    Returns True if C{obj} has any of the named hooks other than the
+    L{Tracer} one, which does nothing.
+    """
+    if obj is None:
+        return False
+    for name in names:
+        if name in getattr(obj, "__dict__", ()) or \
+                getattr(type(obj), name, None) is not getattr(Tracer, name):
+            return True
+    return False
+
+
+class Tracer(object):
+    """
+    The tracer interface. Every hook does nothing; override the
+    ones you need.
+    """
+
+    def on_set(self, cell, value):
+        """
+        on_set(self, cell, value) -> None
+
+        A set-ish command (a set, or a L{DictCell} or L{ListCell}
+        mutation) changed C{cell}, whose value is now C{value}, and
+        its datapulse is about to begin. Sets which don't change the
+        cell aren't reported; sets made during a propogation are
+        reported when they're run, after it.
+        """
+
+    def on_check(self, cell):
+        """
+        on_check(self, cell) -> None
+
+        C{cell} is being checked for currency, because it was read or
+        something which calls it is being verified.
+        """
+
+    def on_start(self, cell):
+        """
+        on_start(self, cell) -> None
+
+        C{cell}'s rule is about to run on this thread. Rules run on
+        an executor or awaited as asyncio tasks are only reported
+        when they finish, by L{on_run}.
+        """
+
+    def on_run(self, cell, changed, elapsed):
+        """
+        on_run(self, cell, changed, elapsed) -> None
+
+        C{cell}'s rule ran, taking C{elapsed} seconds (observers
+        excluded); C{changed} is True if its value changed.
+        """
+
+    def on_propagate(self, world, changed):
+        """
+        on_propagate(self, world, changed) -> None
+
+        A datapulse (C{world.dp}) is starting in C{world}, propogating
+        the changes of the cells in C{changed}.
+        """
+
+    def on_observer(self, observer, model, elapsed):
+        """
+        on_observer(self, observer, model, elapsed) -> None
+
+        C{observer} fired on C{model}, taking C{elapsed} seconds.
+        """
+
+
+class PrintTracer(Tracer):
+    """
+    Prints a line for every set, rule run, datapulse and observer
+    run, as C{cells.DEBUG} used to.
+
+    @ivar out: The file to print to; by default, C{sys.stdout}
+    """
+
+    def __init__(self, out=None):
+        self.out = out
+
+    def _print(self, source, *msgs):
+        out = self.out or sys.stdout
+        out.write(source.rjust(cells._DECO_OFFSET) + " > " +
+                  " ".join([str(msg) for msg in msgs]) + "\n")
+
+    def on_set(self, cell, value):
+        self._print("cell", cell.name, "setting to", repr(value))
+
+    def on_run(self, cell, changed, elapsed):
+        self._print("cell", cell.name, "ran;",
+                    changed and "changed." or "unchanged.")
+
+    def on_propagate(self, world, changed):
+        self._print("cell", "datapulse", world.dp, "propogating",
+                    [cell.name for cell in changed])
+
+    def on_observer(self, observer, model, elapsed):
+        self._print("observer", observer.func.__name__, "ran on", model)
@@ -0,0 +1,232 @@
+# PyCells: Automatic dataflow management for Python
+# Copyright (C) 2006, Ryan Forsythe
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# See LICENSE for the full license text.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Transactions, which gather many sets into a single datapulse.
+
+Without a transaction every C{set()} (and every C{L{DictCell}} or
+C{L{ListCell}} mutation) starts its own datapulse and propogates
+immediately, so setting fifty inputs reruns a rule which reads all of
+them fifty times. Inside a transaction the sets are buffered; when it
+commits they are applied together, and the union of the changed
+cells is propogated once:
+
+    >>> class A(cells.Model):
+    ...     x = cells.makecell(value=1)
+    ...     y = cells.makecell(value=2)
+    ...     @cells.fun2cell()
+    ...     def total(self, prev):
+    ...         print("total running")
+    ...         return self.x + self.y
+    ...
+    >>> a = A()
+    total running
+    >>> with cells.transaction():
+    ...     a.x = 10
+    ...     a.y = 20
+    ...
+    total running
+    >>> a.total
+    30
+
+Reads inside the transaction see the values from before it. A cell
+set and then set back to the value it had before the transaction
+hasn't changed, and isn't propogated. If the block raises, the sets
+buffered in it are thrown away. Transactions nest, and the outermost
+one commits; if a nested block raises, only its own sets are thrown
+away, and those of the enclosing blocks commit as usual if the
+exception is caught.
+
+@var DEBUG: Turns on debugging messages for the transaction module.
+"""
+
+DEBUG = False
+
+import cells
+import functools
+from .cell import _propogate
+
+
+def _debug(*msgs):
+    """
+    debug() -> None
+
+    Prints debug messages.
+    """
+    if not (DEBUG or cells.DEBUG):
+        return
+    msgs = [str(msg) for msg in msgs]
+    msgs.insert(0, "trans".rjust(cells._DECO_OFFSET) + " > ")
+    print(" ".join(msgs))
+
+
+class Transaction(object):
+    """
+    A context manager (and decorator) which buffers set-ish commands
+    and runs them in a single datapulse when it exits.
+
+    @ivar committing: True while the buffered commands are being
+        applied.
+
+    @ivar world: The L{World} whose sets are buffered. By default,
+        the current one when the transaction is entered.
+    """
+
+    def __init__(self, world=None):
+        self.world = world
+        self._env = None
+        self.commands = []
+        self.committing = False
+        self._marks = []  #: where each open block's commands start
+        self._changed = {}  #: id(cell) -> cell, in the order they changed
+        self._before = {}  #: id(cell) -> (value, last_value)
+
+    def __enter__(self):
+        env = self.world or cells.current_world()
+        self._env = env
+        if env.transaction is None:
+            env.transaction = self
+        trans = env.transaction
+        trans._marks.append(len(trans.commands))
+        return trans
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        env = self._env
+        trans = env.transaction
+        mark = trans._marks.pop()
+        if exc_type is not None:
+            _debug("discarding", len(trans.commands) - mark,
+                   "buffered commands")
+            del trans.commands[mark:]
+        if trans._marks:  # an enclosing transaction will commit
+            return False
+
+        if exc_type is None:
+            trans.commit()
+        else:
+            env.transaction = None
+        return False
+
+    def __call__(self, func):
+        """
+        Wraps C{func} so that each call runs in its own transaction.
+        """
+        @functools.wraps(func)
+        def transaction_wrapper(*args, **kwargs):
+            with Transaction(self.world):
+                return func(*args, **kwargs)
+        return transaction_wrapper
+
+    def buffer(self, cell, name, argtuple):
+        """
+        buffer(self, cell, name, argtuple) -> None
+
+        Holds a set-ish command until this transaction commits.
+
+        @param cell: The cell to run the command on
+
+        @param name: The name of the method to run
+
+        @param argtuple: The C{(args, kwargs)} to run it with
+        """
+        if not cell.read_as_cell and id(cell) not in self._before:
+            # what observers should see as the old value, and what to
+            # put back if the cell's set back to its value. (containers
+            # needn't: a DictCell's changes already span the
+            # transaction, and a ListCell keeps no last value)
+            self._before[id(cell)] = (cell.value, cell.last_value)
+        self.commands.append((cell, name, argtuple))
+
+    def changed(self, cell):
+        """
+        changed(self, cell) -> None
+
+        Called by a cell whose value a committing command changed.
+        """
+        self._changed.setdefault(id(cell), cell)
+
+    def commit(self):
+        """
+        commit(self) -> None
+
+        Applies every buffered command, then propogates the cells
+        they changed in one datapulse. Observers of those cells fire
+        once, during that propogation; cells which were set back to
+        their values from before the transaction aren't propogated.
+        Sets made during that propogation run after it as usual,
+        outside this transaction.
+        """
+        env = self._env
+        commands, self.commands = self.commands, []
+        _debug("committing", len(commands), "buffered commands")
+
+        self.committing = True
+        try:
+            for cell, name, (args, kwargs) in commands:
+                getattr(cell, name)(*args, **kwargs)
+        finally:
+            # even if a command failed, what did change must propogate
+            self.committing = False
+            env.transaction = None
+            candidates, self._changed = self._changed, {}
+            before, self._before = self._before, {}
+            changed = []
+            for cell in candidates.values():
+                if id(cell) in before:
+                    value, last_value = before[id(cell)]
+                    if cell.unchanged_if(value, cell.value):
+                        # set back; it hasn't changed after all
+                        cell.last_value = last_value
+                        continue
+                    cell.last_value = value
+                changed.append(cell)
+            if changed:
+                env.dp += 1
+                for cell in changed:
+                    cell.dp = env.dp
+                _propogate(env, changed)
+
+
+def transaction(func=None, world=None):
+    """
+    transaction(world=None) -> Transaction
+
+    Returns a L{Transaction}. Use it as a context manager:
+
+        >>> with cells.transaction():
+        ...     a.x = 10
+        ...     a.y = 20
+
+    or as a decorator, so that every call of the decorated function
+    is its own transaction:
+
+        >>> @cells.transaction()
+        ... def move(a, x, y):
+        ...     a.x, a.y = x, y
+
+    C{@cells.transaction} without the parentheses works too.
+
+    @param world: The L{World} whose sets to buffer. By default, the
+        current one.
+    """
+    if func is not None:
+        return Transaction(world)(func)
+    return Transaction(world)
+
+
+batch = transaction
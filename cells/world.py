@@ -0,0 +1,179 @@
+# PyCells: Automatic dataflow management for Python
+# Copyright (C) 2006, Ryan Forsythe
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# See LICENSE for the full license text.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+World, an independent dependency graph and the propogation state
+that goes with it.
+
+Every cell belongs to a world: its datapulse counter, propogation
+queue, deferred sets, open transaction and dependency graph are the
+world's. Cells and L{Model}s created inside a C{with} block belong
+to that world; everything else belongs to the default world,
+C{cells.cellenv}:
+
+    >>> tenant = cells.World()
+    >>> with tenant:
+    ...     a = A()
+    ...
+    >>> a.x = 5          # propogates in tenant, whatever the thread
+
+Worlds don't share anything, so unrelated graphs propogate
+independently, each world may be driven from its own thread, and
+dropping the last reference to a world and its models frees it all
+at once. A rule only picks up dependencies on cells of its own world.
+A single world must not be used from two threads at once.
+
+@var EVALUATION_MODES: The evaluation modes a world may be set to.
+    See L{cells.set_evaluation}.
+"""
+
+import threading
+
+from .graph import Graph
+
+EVALUATION_MODES = ("push", "pull")
+
+_local = threading.local()
+
+
+class World(object):
+    """
+    A dependency graph and its propogation state.
+
+    @ivar dp: The current datapulse
+
+    @ivar curr: The cell whose rule is running, if any
+
+    @ivar reads: The graph ids of the cells the running rule has read
+
+    @ivar curr_propogator: The cell which started the propogation in
+        progress, if any
+
+    @ivar queued_updates: The propogation queue; see L{cells.cell}
+
+    @ivar deferred_sets: Set-ish commands waiting for the propogation
+        in progress to finish
+
+    @ivar changed_cells: The cells which changed in this datapulse
+
+    @ivar transaction: The open L{Transaction}, if any
+
+    @ivar pending: Cells a datapulse left waiting for async rules to
+        be awaited; see L{cells.settle}
+
+    @ivar constructing: The models L{Model.create_many} is building,
+        whose cells are evaluated once they've all been made; None
+        outside of it
+
+    @ivar evaluation: C{"push"} or C{"pull"}; see
+        L{cells.set_evaluation}
+
+    @ivar graph: The L{Graph} of this world's cells
+
+    @ivar executor: A C{concurrent.futures} thread pool to run the
+        independent rules of a datapulse on, or None to run them one
+        at a time; see L{cells.set_executor}
+
+    @ivar lock: Held by executor threads while they bring a cell the
+        scheduler hasn't reached yet up to date
+    """
+
+    def __init__(self, evaluation="push", executor=None):
+        """
+        @raise ValueError: If C{evaluation} isn't one of
+            L{EVALUATION_MODES}
+        """
+        self.graph = Graph()
+        self.evaluation = "push"
+        self.executor = executor
+        self.lock = threading.RLock()
+        self.reset()
+        self.set_evaluation(evaluation)
+
+    def reset(self):
+        """
+        reset(self) -> None
+
+        Resets this world's propogation state. This is a pretty
+        dangerous thing to do if you care about the state of the
+        world's cells. The dependency graph is kept, since live cells
+        hold ids in it.
+        """
+        self.dp = 1
+        self.curr = None
+        self.reads = None
+        self.curr_propogator = None
+        self.queued_updates = []
+        self.deferred_sets = []
+        self.changed_cells = []
+        self.drain_height = 0
+        self.queue_seq = 0
+        self.transaction = None
+        self.pending = []
+        self.constructing = None
+
+    def set_evaluation(self, mode):
+        """
+        set_evaluation(self, mode) -> str
+
+        Sets this world's evaluation mode and returns the old one.
+
+        @raise ValueError: If C{mode} isn't one of L{EVALUATION_MODES}
+        """
+        if mode not in EVALUATION_MODES:
+            raise ValueError("unknown evaluation mode %r" % (mode,))
+        old, self.evaluation = self.evaluation, mode
+        return old
+
+    def set_executor(self, executor):
+        """
+        set_executor(self, executor) -> executor
+
+        Sets the executor this world runs independent rules on, and
+        returns the old one. Pass None to run rules one at a time.
+        """
+        old, self.executor = self.executor, executor
+        return old
+
+    def __enter__(self):
+        try:
+            _local.worlds.append(self)
+        except AttributeError:
+            _local.worlds = [self]
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.worlds.pop()
+        return False
+
+
+def current_world():
+    """
+    current_world() -> World
+
+    Returns the world of the innermost C{with} block in this thread,
+    or the default world if there isn't one.
+    """
+    worlds = getattr(_local, "worlds", None)
+    if worlds:
+        return worlds[-1]
+    return default
+
+
+#: the world cells belong to outside of any C{with} block
+default = World()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+import unittest, sys
+sys.path += "../"
+import cells
+
+"""
+Rules may be async defs:
+
+1. Outside an event loop, async rules run to completion as needed,
+   and observers of the cells which read them fire as usual.
+
+2. Inside an event loop a datapulse doesn't wait on them; awaiting a
+   cell (model.cell_async) or cells.settle() brings it up to date.
+
+3. The async rules of one height are awaited concurrently.
+
+4. Reading a stale async cell without awaiting it, in an event loop,
+   raises AsyncCellPendingError.
+"""
+
+import asyncio
+
+class AsyncTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+        self.observerlog = []
+        self.running = 0
+        self.both = None
+
+        test = self
+        class Page(cells.Model):
+            path = cells.makecell(value="index")
+
+            @cells.fun2cell()
+            async def source(model, prev):
+                await asyncio.sleep(0)
+                return "<" + model.path + ">"
+
+            @cells.fun2cell()
+            async def title(model, prev):
+                test.running += 1
+                if test.both is not None:
+                    if test.running == 2:
+                        test.both.set()
+                    await asyncio.wait_for(test.both.wait(), 1)
+                test.running -= 1
+                return model.path.title()
+
+            @cells.fun2cell()
+            def html(model, prev):
+                return model.title + ": " + model.source
+
+        @Page.observer(attrib="html")
+        def html_obs(model):
+            self.observerlog.append(model.html)
+
+        self.Page = Page
+
+    def test_1_WithoutALoop(self):
+        p = self.Page()
+        self.assertEqual(p.html, "Index: <index>")
+        p.path = "about"
+        self.assertEqual(self.observerlog[-1], "About: <about>")
+        self.assertEqual(p.source, "<about>")
+
+    def test_2_AwaitingInALoop(self):
+        async def main():
+            p = self.Page()
+            await cells.settle()
+            self.assertEqual(await p.cell_async("html"), "Index: <index>")
+            p.path = "about"            # doesn't wait
+            self.assertEqual(await p.cell_async("html"), "About: <about>")
+            await p.set_async("path", "faq")
+            self.assertEqual(self.observerlog[-1], "Faq: <faq>")
+        asyncio.run(main())
+
+    def test_3_ConcurrentAtOneHeight(self):
+        test = self
+        async def title(model, prev):
+            test.running += 1
+            if test.running == 2:
+                test.both.set()
+            await asyncio.wait_for(test.both.wait(), 1)
+            test.running -= 1
+            return model.path.title()
+
+        class Two(cells.Model):
+            path = cells.makecell(value="x")
+            a = cells.makecell(rule=title)
+            b = cells.makecell(rule=title)
+
+        @Two.observer(attrib=["a", "b"])
+        def ab_obs(model):
+            pass
+
+        async def main():
+            self.both = asyncio.Event()
+            two = Two()
+            await cells.settle()        # times out unless concurrent
+            self.both.clear()
+            await two.set_async("path", "y")
+            self.assertEqual(await two.cell_async("a"), "Y")
+            self.assertEqual(await two.cell_async("b"), "Y")
+        asyncio.run(main())
+
+    def test_4_PlainReadsInALoopRaise(self):
+        async def main():
+            p = self.Page()
+            await cells.settle()
+            p.path = "about"
+            self.assertRaises(cells.AsyncCellPendingError,
+                              lambda: p.source)
+            self.assertEqual(await p.cell_async("source"), "<about>")
+        asyncio.run(main())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,12 +29,9 @@ Def: Current: A cell is current if its datapulse is equal to the
    being at the global datapulse. Any cell which depends on the
    changed value X begins recalculating as in 2.
 
-4. If a cell has been queried, and this causes it to recalculate which
-   causes its value to change, it must first cause the querying cell
-   to recalculate. Any other recalculation commands by this cell must
-   be queued. After that cell finishes recalculating, (and that change
-   propogated up in the same manner) the queue of recalculations may
-   be run.
+4. Cells which must recalculate because of a change are run in
+   dependency order: a cell runs only after every cell it calls has
+   settled, and each cell runs at most once per datapulse.
 
 The following are far more trivial rules for all cells -- this just seemed
 the best place to test them
@@ -192,12 +189,9 @@ class AlgoTests_Rule3(unittest.TestCase):
         self.assertTrue(self.b.value == 6)
 
 class AlgoTests_Rule4(unittest.TestCase):
-    """4. If a cell has been queried, and this causes it to recalculate which
-    causes its value to change, it must first cause the querying cell
-    to recalculate. Any other recalculation commands by this cell must
-    be queued. After that cell finishes recalculating, (and that change
-    propogated up in the same manner) the queue of recalculations may
-    be run.
+    """4. Cells which must recalculate because of a change are run in
+    dependency order: a cell runs only after every cell it calls has
+    settled, and each cell runs at most once per datapulse.
     """
     def setUp(self):
         #    h     i     j
@@ -235,36 +229,43 @@ class AlgoTests_Rule4(unittest.TestCase):
         self.j.getvalue()
 
         self.runlog = []
-
-        # run an x.set(3) in the desired order:
-        self.x.propogation_list = lambda s,e: [ self.a, self.c ]
-        self.c.propogation_list = lambda s,e: [ self.b, self.j ]
-        self.b.propogation_list = lambda s,e: [ self.a, self.i ]
-
         self.x.set(3)
 
-    def testA_QueryingCellRecalcsFirst(self):
-        """Rule 4 part a: A cell which recalculates because of an
-        up-to-date query must first cause the querying cell to
-        recalculate (which recurses)"""
-        # x changes, and x tells a to recalc, a queries b queries c.
-        # c recalcs, then b recalcs, then a recalcs... Verify that last bit.
-        self.assertTrue(self.runlog[:3] == ["c", "b", "a"])
-
-    def testB_QueriedCellQueuesRecalcs(self):
-        """Rule 4 part b: After the querying cell is recalculated, the
-        remaining dependent cells must be run."""
-        # (continuing from test_4_QueryingCellRecalcsFirst:
-        # ... then c's queued cells recalc... Verify that bit.
-        self.assertTrue("j" in self.runlog)
-
-    def testC_QueuedCellsRunAfterQueryingCells(self):
-        """Rule 4 part c: The cells which were queued for
-        recalculation must run after all querying cells have been run,
-        FIFO."""
-        # (continuing from test_4_QueriedCellQueuesRecalcs) ... then
-        # b's, then a's. Verify that bit.
-        self.assertTrue(self.runlog[3:] == ["j", "i", "h"])
+    def testA_CalledCellsRunFirst(self):
+        """Rule 4 part a: A cell recalculates only after the cells it
+        calls have recalculated"""
+        # x changes; a calls b calls c, so c, then b, then a.
+        log = self.runlog
+        self.assertTrue(log.index("c") < log.index("b") < log.index("a"))
+        self.assertTrue(log.index("a") < log.index("h"))
+        self.assertTrue(log.index("b") < log.index("i"))
+        self.assertTrue(log.index("c") < log.index("j"))
+
+    def testB_AllDependentsRecalculate(self):
+        """Rule 4 part b: Every cell which (transitively) calls the
+        changed cell recalculates."""
+        self.assertTrue(sorted(self.runlog) == ["a", "b", "c", "h", "i", "j"])
+
+    def testC_EachCellRunsOncePerDatapulse(self):
+        """Rule 4 part c: Cells reachable along several paths from the
+        changed cell, like a, still run once."""
+        self.assertTrue(len(self.runlog) == len(set(self.runlog)))
+        self.assertTrue(self.a.getvalue() == self.b.getvalue() + 3 +
+                        self.a.last_value)
+
+    def testD_DeepChainsDoNotRecurse(self):
+        """Rule 4 part d: Propogation down a chain much deeper than the
+        recursion limit completes."""
+        prev = self.x
+        chain = []
+        for n in range(sys.getrecursionlimit() * 2):
+            cell = cells.Cell(None, name="d" + str(n),
+                              rule=lambda s,p,prev=prev: prev.getvalue() + 1)
+            cell.getvalue()
+            chain.append(cell)
+            prev = cell
+        self.x.set(10)
+        self.assertTrue(chain[-1].value == 10 + len(chain))
 
 class AlgoTests_Rule9999(unittest.TestCase):
     """All the 'trivial' rules go in here"""
@@ -295,6 +296,73 @@ class AlgoTests_Rule9999(unittest.TestCase):
         a.getvalue()
         del(self.x)
         self.assertFalse(ref_x())
+
+    def testC_DeadCellsAreUnlinked(self):
+        """7. When a cell is collected, its edges are removed from the
+        cells it was linked to, and its graph id is reused."""
+        x = cells.Cell(None, name="x", value=3)
+        a = cells.Cell(None, name="a", rule=lambda s,p: x.getvalue() + 1)
+        a.getvalue()
+        a_id = a._node.id
+        self.assertTrue(a_id in x.called_by)
+
+        del(a)
+        cells.cellenv.graph.collect()
+        self.assertFalse(a_id in x.called_by)
+
+        b = cells.Cell(None, name="b", rule=lambda s,p: x.getvalue() + 2)
+        b.getvalue()
+        self.assertTrue(b._node.id == a_id)
+        x.set(5)
+        self.assertTrue(b.getvalue() == 7)
+
+    def testD_RepeatedReadsLinkOnce(self):
+        """8. A rule which reads the same cell many times is linked to it
+        once, and a rule which raises still leaves the call stack and
+        its dependencies intact."""
+        x = cells.Cell(None, name="x", value=2)
+        d = cells.DictCell(None, name="d", value={"k": 1})
+        def rule(s, p):
+            total = 0
+            for i in range(100):
+                total += x.getvalue() + d["k"] + len(d.keys())
+            if total > 1000:
+                raise ValueError
+            return total
+        a = cells.Cell(None, name="a", rule=rule)
+        self.assertTrue(a.getvalue() == 400)
+        self.assertTrue(a.calls == set([x._node.id, d._node.id]))
+        self.assertTrue(a.height == 1)
+
+        self.assertRaises(ValueError, x.set, 20)
+        self.assertTrue(cells.cellenv.curr is None)
+        self.assertTrue(a.calls == set([x._node.id, d._node.id]))
+
+    def testE_RerunsOnlyRewireChangedEdges(self):
+        """9. When a rule reruns, the edges to cells it still reads are
+        kept, and only the edges which changed are rewired."""
+        flag = cells.Cell(None, name="flag", value=True)
+        x = cells.Cell(None, name="x", value=1)
+        y = cells.Cell(None, name="y", value=2)
+        a = cells.Cell(None, name="a", rule=lambda s,p:
+                       x.getvalue() if flag.getvalue() else y.getvalue())
+        a.getvalue()
+        graph = cells.cellenv.graph
+        graph.reset_stats()
+
+        x.set(5)                        # same reads: flag, x
+        self.assertTrue(graph.stats() == {"kept": 2, "added": 0,
+                                          "dropped": 0, "rewired": 0})
+        flag.set(False)                 # x swapped for y
+        self.assertTrue(graph.stats()["kept"] == 3)
+        self.assertTrue(graph.stats()["rewired"] == 2)
+        self.assertFalse(a._node.id in x.called_by)
+        self.assertTrue(a._node.id in y.called_by)
+
+        x.set(6)                        # a no longer depends on x
+        self.assertTrue(a.getvalue() == 2)
+        y.set(7)
+        self.assertTrue(a.getvalue() == 7)
         
 if __name__ == "__main__":
     unittest.main()
@@ -17,6 +17,10 @@ DictCells:
 1. Act like InputCells
 2. Also propogate changes if the hash is changed -- ie, if a key is
    set to a different value.
+3. Record each datapulse's changes as (key, old, new, op) in
+   .changes, and work out .last_value from them when asked.
+4. A rule which reads some keys is rerun only when one of those keys
+   changes; one which reads the whole dict, when any does.
 
 Rule Cells:
 1. Trying to set a rule cell throws an exception
@@ -197,6 +201,92 @@ class CellTypeTests_DictTests(unittest.TestCase):
         self.x['foo'] = 'blah blah'     # cause propogation
         self.failUnless(y.getvalue() == ['foo'])
 
+    def test_4_ChangesRecorded(self):
+        seen = []
+        y = cells.Cell(None, name="y",
+                       rule=lambda s, p: seen.append(list(self.x.changes)))
+        y.getvalue()
+        self.x["a"] = 1
+        self.x["a"] = 2
+        self.x["a"] = 2                 # unchanged; no datapulse
+        del self.x["a"]
+        self.assertEqual(seen[1:], [
+            [cells.DictChange("a", None, 1, "add")],
+            [cells.DictChange("a", 1, 2, "set")],
+            [cells.DictChange("a", 2, None, "del")]])
+
+        self.x.set({"b": 1, "c": 2})
+        self.x.set({"b": 1, "c": 3, "d": 4})
+        self.assertEqual(sorted(self.x.changes), [
+            ("c", 2, 3, "set"), ("d", None, 4, "add")])
+
+    def test_5_LastValueWorkedOut(self):
+        self.assertEqual(self.x.last_value, None)
+        self.x.set({"a": 1, "b": 2})
+        self.assertEqual(self.x.last_value, {})
+        self.x["a"] = 10
+        self.assertEqual(self.x.last_value, {"a": 1, "b": 2})
+        del self.x["b"]
+        self.assertEqual(self.x.last_value, {"a": 10, "b": 2})
+        self.assertEqual(self.x.value, {"a": 10})
+
+    def test_6_TransactionChangesShareADatapulse(self):
+        self.x.set({"a": 1})
+        runs = []
+        y = cells.Cell(None, name="y",
+                       rule=lambda s, p: runs.append(list(self.x.changes)))
+        y.getvalue()
+        with cells.transaction():
+            self.x["a"] = 2
+            self.x["b"] = 3
+            del self.x["a"]
+        self.assertEqual(len(runs), 2)
+        self.assertEqual([op for key, old, new, op in runs[1]],
+                         ["set", "add", "del"])
+        self.assertEqual(self.x.last_value, {"a": 1})
+
+    def test_7_KeyDependencies(self):
+        self.x.set({"a": 1, "b": 2})
+        runs = []
+        def reader(name, read):
+            def rule(s, p):
+                runs.append(name)
+                return read()
+            cell = cells.Cell(None, name=name, rule=rule)
+            cell.getvalue()
+            return cell
+        a = reader("a", lambda: self.x["a"])
+        b = reader("b", lambda: self.x.get("b"))
+        c = reader("c", lambda: "c" in self.x)
+        everything = reader("all", lambda: sorted(self.x.keys()))
+        switch = cells.Cell(None, name="switch", value="a")
+        either = reader("either", lambda: self.x[switch.getvalue()])
+
+        del runs[:]
+        self.x["b"] = 20
+        self.assertEqual(sorted(runs), ["all", "b"])
+        self.assertEqual(b.getvalue(), 20)
+
+        del runs[:]
+        self.x["c"] = 3
+        self.assertEqual(sorted(runs), ["all", "c"])
+        self.assertEqual(c.getvalue(), True)
+
+        switch.set("b")                 # now reads "b", not "a"
+        del runs[:]
+        self.x["a"] = 10
+        self.assertEqual(sorted(runs), ["a", "all"])
+        del runs[:]
+        self.x["b"] = 200
+        self.assertEqual(sorted(runs), ["all", "b", "either"])
+        self.assertEqual((a.getvalue(), either.getvalue()), (10, 200))
+
+        del runs[:]
+        with cells.transaction():
+            self.x["a"] = 11
+            del self.x["c"]
+        self.assertEqual(sorted(runs), ["a", "all", "c"])
+
 class CellTypeTests_Ephemerals(unittest.TestCase):
     def test_Ephemeral(self):
         x = cells.InputCell(None, name="x", value=None, ephemeral=True)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+
+import unittest, sys
+sys.path += "../"
+import cells
+
+"""
+Observers may be given an executor, which runs them off the
+propogation path:
+
+1. A queued observer doesn't run in the datapulse; it's called later
+   with the model and a snapshot of the attribute's old and new
+   values.
+
+2. A model's queued observers run one at a time, datapulse by
+   datapulse, and by priority within one.
+
+3. "asyncio" observers run on an event loop, which awaits them if
+   they're async.
+
+4. cells.flush_observers() waits for every queued observer, and
+   raises the first exception one raised. An observer raising
+   something which isn't an Exception doesn't wedge its model's
+   observers.
+
+5. An observer is called the same way, queued or not: with the model
+   and the change if it takes both, with the model alone otherwise.
+"""
+
+import threading, time
+
+class DispatchTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+        self.log = []
+
+        class Table(cells.Model):
+            rows = cells.makecell(value=0)
+            items = cells.makecell(celltype=cells.ListCell, value=[])
+
+        self.Table = Table
+
+    def tearDown(self):
+        cells.flush_observers()
+
+    def test_1_Queued(self):
+        release = threading.Event()
+
+        @self.Table.observer(attrib="rows", executor="thread")
+        def slow_obs(model, change):
+            release.wait(5)
+            self.log.append((change.name, change.old_value,
+                             change.new_value, change.model is model))
+
+        t = self.Table()
+        t.rows = 5                      # doesn't wait for the observer
+        self.assertEqual(self.log, [])
+        release.set()
+        cells.flush_observers()
+        self.assertEqual(self.log, [("rows", None, 0, True),
+                                    ("rows", 0, 5, True)])
+
+    def test_1_ContainerSnapshot(self):
+        @self.Table.observer(attrib="items", executor="thread")
+        def items_obs(model, change):
+            self.log.append(change.new_value)
+
+        t = self.Table()
+        cells.flush_observers()
+        t.items.append(1)
+        t.items.append(2)
+        cells.flush_observers()
+        self.assertEqual(self.log, [[], [1], [1, 2]])
+
+    def test_2_Ordering(self):
+        for name, priority in (("low", 1), ("high", 2)):
+            def observe(model, change, name=name):
+                if name == "high":
+                    time.sleep(0.001)     # give the other a chance
+                self.log.append((model.model_name, change.new_value, name))
+            observe.__name__ = name
+            self.Table.observer(attrib="rows", priority=priority,
+                                executor="thread")(observe)
+
+        tables = [self.Table(model_name=n) for n in range(3)]
+        cells.flush_observers()
+        self.log = []
+        for value in range(1, 4):
+            for t in tables:
+                t.rows = value
+        cells.flush_observers()
+        for n in range(3):
+            self.assertEqual([(value, name) for model, value, name
+                              in self.log if model == n],
+                             [(1, "high"), (1, "low"), (2, "high"),
+                              (2, "low"), (3, "high"), (3, "low")])
+
+    def test_3_Asyncio(self):
+        @self.Table.observer(attrib="rows", executor="asyncio")
+        async def async_obs(model, change):
+            await cells.aio.asyncio.sleep(0)
+            self.log.append((change.new_value,
+                             threading.current_thread().name))
+
+        t = self.Table()
+        t.rows = 2
+        cells.flush_observers()
+        self.assertEqual([value for value, thread in self.log], [0, 2])
+        self.assertNotEqual(self.log[0][1],
+                            threading.current_thread().name)
+
+    def test_4_Errors(self):
+        @self.Table.observer(attrib="rows", executor="thread")
+        def bad_obs(model, change):
+            if change.new_value == 3:
+                raise KeyError("bad")
+
+        t = self.Table()
+        t.rows = 3
+        self.assertRaises(KeyError, cells.flush_observers)
+        cells.flush_observers()         # reported once
+
+        @self.Table.observer(attrib="rows", executor="thread")
+        def flushing_obs(model, change):
+            cells.flush_observers()
+        self.Table()
+        self.assertRaises(RuntimeError, cells.flush_observers)
+
+        self.assertRaises(ValueError, self.Table.observer,
+                          executor="process")
+
+    def test_4_BaseExceptions(self):
+        for executor in ("thread", "asyncio"):
+            cells.reset()
+            log = []
+
+            class Table(cells.Model):
+                rows = cells.makecell(value=0)
+
+            @Table.observer(attrib="rows", executor=executor)
+            def stopping_obs(model, change):
+                if change.new_value == 1:
+                    raise KeyboardInterrupt
+                log.append(change.new_value)
+
+            t = Table()
+            t.rows = 1
+            self.assertRaises(KeyboardInterrupt, cells.flush_observers, 5)
+            t.rows = 2                  # the lane isn't stuck
+            cells.flush_observers(5)
+            self.assertEqual(log[-1], 2)
+
+    def test_5_OneCallingConvention(self):
+        for executor in (None, "thread"):
+            cells.reset()
+            log = []
+
+            class Table(cells.Model):
+                rows = cells.makecell(value=0)
+
+            @Table.observer(attrib="rows", executor=executor)
+            def model_only(model):
+                log.append(("model_only", model.rows))
+
+            @Table.observer(attrib="rows", executor=executor)
+            def with_change(model, change):
+                log.append(("with_change", change.old_value,
+                            change.new_value))
+
+            t = Table()
+            cells.flush_observers()
+            del log[:]
+            t.rows = 4
+            cells.flush_observers()
+            self.assertEqual(sorted(log), [("model_only", 4),
+                                           ("with_change", 0, 4)])
+
+if __name__ == "__main__":
+    unittest.main()
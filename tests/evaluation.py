@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+import unittest, sys
+sys.path += "../"
+import cells
+
+"""
+Pull evaluation only marks rules stale when their inputs change:
+
+1. Setting an input runs no rules; each stale rule reruns once, when
+   it's next read.
+
+2. The mode can be chosen for the whole graph, or per Model class.
+
+3. A rule an observer watches is still brought up to date during the
+   datapulse, so its observer fires as usual.
+
+4. Reading the end of a long stale chain doesn't recurse.
+
+5. A rule which starts reading a cell at its own height sees that
+   cell's new value, whether the height runs serially or on an
+   executor.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+class EvaluationTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+        self.runlog = []
+
+    def tearDown(self):
+        cells.set_evaluation("push")
+
+    def chain(self):
+        runlog = self.runlog
+        x = cells.InputCell(None, 1, name="x")
+        def a_rule(model, prev):
+            runlog.append("a")
+            return x.getvalue() * 2
+        a = cells.RuleCell(None, a_rule, name="a")
+        def b_rule(model, prev):
+            runlog.append("b")
+            return a.getvalue() + 1
+        b = cells.RuleCell(None, b_rule, name="b")
+        b.getvalue()
+        del runlog[:]
+        return x, a, b
+
+    def test_1_SetsOnlyMarkStale(self):
+        self.assertEqual(cells.set_evaluation("pull"), "push")
+        x, a, b = self.chain()
+        for n in range(10):
+            x.set(n)
+        self.assertEqual(self.runlog, [])
+        self.assertTrue(a.stale and b.stale)
+
+        self.assertEqual(b.getvalue(), 19)
+        self.assertEqual(self.runlog, ["a", "b"])
+        self.assertEqual(b.getvalue(), 19)
+        self.assertEqual(self.runlog, ["a", "b"])
+
+    def test_2_PushIsTheDefault(self):
+        x, a, b = self.chain()
+        x.set(5)
+        self.assertEqual(self.runlog, ["a", "b"])
+        self.assertRaises(ValueError, cells.set_evaluation, "sometimes")
+
+    def test_3_PerModelClass(self):
+        runlog = self.runlog
+        class Telemetry(cells.Model):
+            evaluation = "pull"
+            x = cells.makecell(value=1)
+            @cells.fun2cell()
+            def double(model, prev):
+                runlog.append("double")
+                return model.x * 2
+
+        class Display(cells.Model):
+            x = cells.makecell(value=1)
+            @cells.fun2cell()
+            def double(model, prev):
+                runlog.append("display")
+                return model.x * 2
+
+        t, d = Telemetry(), Display()
+        del runlog[:]
+        t.x = 2
+        t.x = 3
+        d.x = 2
+        self.assertEqual(runlog, ["display"])
+        self.assertEqual(t.double, 6)
+        self.assertEqual(runlog, ["display", "double"])
+
+    def test_4_ObservedRulesStayEager(self):
+        cells.set_evaluation("pull")
+        observerlog = []
+        class M(cells.Model):
+            x = cells.makecell(value=1)
+            @cells.fun2cell()
+            def watched(model, prev):
+                return model.x + 1
+            @cells.fun2cell()
+            def unwatched(model, prev):
+                self.runlog.append("unwatched")
+                return model.x + 2
+
+        @M.observer(attrib="watched")
+        def watched_obs(model):
+            observerlog.append(model.watched)
+
+        m = M()
+        del self.runlog[:]
+        m.x = 5
+        self.assertEqual(observerlog[-1], 6)
+        self.assertEqual(self.runlog, [])
+        self.assertEqual(m.unwatched, 7)
+
+    def test_5_LongStaleChainsDoNotRecurse(self):
+        cells.set_evaluation("pull")
+        x = cells.InputCell(None, 0, name="x")
+        prev = x
+        for n in range(5000):
+            prev = cells.RuleCell(None, (lambda c: lambda s, p:
+                                         c.getvalue() + 1)(prev), name="c")
+            prev.getvalue()
+        last = prev
+        self.assertEqual(last.getvalue(), 5000)
+        x.set(10)
+        self.assertEqual(last.getvalue(), 5010)
+
+    def test_6_DynamicReadAtTheSameHeight(self):
+        def run():
+            x = cells.InputCell(None, 1, name="x")
+            flag = cells.InputCell(None, False, name="flag")
+            a = cells.RuleCell(None, lambda s, p: x.getvalue() + 100,
+                               name="a")
+            b = cells.RuleCell(None, lambda s, p:
+                               ("via a", a.getvalue()) if flag.getvalue()
+                               else ("via x", x.getvalue()), name="b")
+            self.assertEqual((a.getvalue(), b.getvalue()),
+                             (101, ("via x", 1)))
+            with cells.transaction():
+                x.set(2)
+                flag.set(True)
+            return b.getvalue()
+
+        self.assertEqual(run(), ("via a", 102))
+        pool = ThreadPoolExecutor(4)
+        cells.set_executor(pool)
+        try:
+            self.assertEqual(run(), ("via a", 102))
+        finally:
+            cells.set_executor(None)
+            pool.shutdown()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+import unittest, sys
+sys.path += "../"
+import cells
+
+"""
+cells.export_graph writes the dependency graph around some cells:
+
+1. It follows calls and called-bys from the given cells, or from
+   every cell of the given models, and can stop after some hops.
+
+2. Nodes carry the owner class, attribute name, cell type, fan-in and
+   fan-out; edges point from the cell read to the cell reading it.
+
+3. Given a profile, nodes carry its run counts and times.
+
+4. It writes DOT or JSON.
+"""
+
+import json
+
+class ExportTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+
+        class Hub(cells.Model):
+            scale = cells.makecell(value=2)
+
+        hub = Hub()
+
+        class Spoke(cells.Model):
+            x = cells.makecell(value=1)
+            @cells.fun2cell()
+            def scaled(model, prev):
+                return model.x * hub.scale
+
+        self.hub = hub
+        self.spokes = [Spoke() for n in range(5)]
+
+    def nodes(self, text):
+        doc = json.loads(text)
+        return doc, dict((node["id"], node) for node in doc["nodes"])
+
+    def test_1_Walk(self):
+        doc, nodes = self.nodes(cells.export_graph(
+            self.hub.__dict__["scale"], format="json"))
+        names = sorted(node["name"] for node in nodes.values())
+        self.assertEqual(names, ["scale"] + ["scaled"] * 5 + ["x"] * 5)
+
+        doc, nodes = self.nodes(cells.export_graph(
+            self.hub.__dict__["scale"], format="json", depth=1))
+        self.assertEqual(len(nodes), 6)
+
+        doc, nodes = self.nodes(cells.export_graph(
+            self.spokes[:2], format="json"))
+        self.assertEqual(len([node for node in nodes.values()
+                              if node["name"] == "scaled"]), 5)
+
+    def test_2_Nodes(self):
+        doc, nodes = self.nodes(cells.export_graph(self.hub, format="json"))
+        scale = [node for node in nodes.values()
+                 if node["name"] == "scale"][0]
+        self.assertEqual((scale["owner"], scale["type"], scale["fanin"],
+                          scale["fanout"]), ("Hub", "InputCell", 0, 5))
+        for edge in doc["edges"]:
+            self.assertEqual(nodes[edge["target"]]["name"], "scaled")
+        self.assertEqual(len(set(node["model"] for node in nodes.values()
+                                 if node["owner"] == "Spoke")), 5)
+
+    def test_3_ProfileWeights(self):
+        with cells.profile() as p:
+            self.hub.scale = 3
+        doc, nodes = self.nodes(cells.export_graph(
+            self.hub, format="json", profile=p, weight="runs"))
+        for node in nodes.values():
+            expected = 5 if node["name"] == "scaled" else 0
+            self.assertEqual((node["runs"], node["weight"]),
+                             (expected, expected))
+
+    def test_4_Formats(self):
+        dot = cells.export_graph(self.spokes[0])
+        self.assertTrue(dot.startswith("digraph cells {"))
+        self.assertTrue('label="Hub.scale\\nInputCell' in dot)
+        self.assertEqual(dot.count(" -> "), 10)
+        self.assertRaises(ValueError, cells.export_graph, self.hub,
+                          format="png")
+        self.assertRaises(ValueError, cells.export_graph, self.hub,
+                          weight="bogus")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -80,6 +80,19 @@ class FamilyTest(unittest.TestCase):
         self.failUnless(f.kids[1].model_name == "Bee")
         self.failUnless(f.kids[2].model_value == 3)
 
+    def test_KidslotsChange(self):
+        "Kids made after kid_slots' class changes get the change"
+        f = self.F()
+        class A(cells.Model):
+            pass
+        f.make_kid(A)
+        self.K.y = cells.makecell(value=2)
+        self.K.y.name = "y"
+        class B(cells.Model):
+            pass
+        f.make_kid(B)
+        self.failUnless(f.kids[1].y == 2)
+
     def test_GrandparentMethod(self):
         f = self.F()
         f.make_kid(self.F)
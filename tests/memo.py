@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+import unittest, sys
+sys.path += "../"
+import cells
+
+"""
+A rule cell built with memo=N remembers its last N results:
+
+1. When the cells its rule read return to values they held before,
+   the remembered result is used and the rule isn't run.
+
+2. Only the N most recently used results are kept.
+
+3. Remembered runs keep their own dependencies: a rule which reads
+   different cells in different states is matched on the cells it
+   read in that state.
+
+4. Each cell counts its memo hits and misses.
+
+5. A remembered run's cells are the cells themselves, not their ids:
+   a cell which has died doesn't match, even if its id is reused.
+
+6. Looking up a remembered run doesn't run rules the current state
+   doesn't need; only cells which are already current are compared.
+"""
+
+import gc
+
+class MemoTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+        self.runlog = []
+        runlog = self.runlog
+
+        class M(cells.Model):
+            mode = cells.makecell(value="a")
+            a_input = cells.makecell(value=1)
+            b_input = cells.makecell(value=10)
+
+            @cells.fun2cell(memo=2)
+            def result(model, prev):
+                runlog.append(model.mode)
+                if model.mode == "a":
+                    return model.a_input * 2
+                return model.b_input * 3
+
+        self.m = M()
+        self.memo = self.m.__dict__["result"].memo
+
+    def test_1_ReturningToAStateReusesItsResult(self):
+        self.m.mode = "b"
+        self.assertEqual(self.m.result, 30)
+        self.m.mode = "a"
+        self.assertEqual(self.m.result, 2)
+        self.assertEqual(self.runlog, ["a", "b"])
+
+    def test_2_LeastRecentlyUsedIsEvicted(self):
+        self.m.mode = "b"
+        self.m.mode = "c"               # evicts "a"
+        self.assertEqual(len(self.memo), 2)
+        self.m.mode = "a"
+        self.assertEqual(self.runlog, ["a", "b", "c", "a"])
+        self.m.mode = "c"               # "c" was kept
+        self.assertEqual(self.runlog, ["a", "b", "c", "a"])
+
+    def test_3_MatchedOnTheCellsThatRunRead(self):
+        self.m.b_input = 20             # not read in mode "a"; no run
+        self.m.mode = "b"
+        self.assertEqual(self.m.result, 60)
+        self.m.mode = "a"               # reused, b_input notwithstanding
+        self.assertEqual(self.m.result, 2)
+        self.assertEqual(self.runlog, ["a", "b"])
+        # the reused result depends on what its run read
+        self.m.a_input = 5
+        self.assertEqual(self.m.result, 10)
+        self.assertEqual(self.runlog, ["a", "b", "a"])
+
+    def test_4_Counters(self):
+        self.m.mode = "b"
+        self.m.mode = "a"
+        self.m.mode = "b"
+        self.assertEqual(self.memo.hits, 2)
+        self.assertEqual(self.memo.misses, 2)  # the init run, and "b"
+
+    def test_5_MemoSizeMustBePositive(self):
+        self.assertRaises(ValueError, cells.RuleCell, None,
+                          lambda s, p: None, memo=-1)
+
+    def test_6_DeadCellsDontMatch(self):
+        with cells.World():             # so the freed id is the one reused
+            runlog = []
+            mode = cells.InputCell(None, value="t")
+            source = {"t": cells.InputCell(None, value=100)}
+
+            def rule(owner, prev):
+                runlog.append(mode.getvalue())
+                if mode.getvalue() == "t":
+                    return source["t"].getvalue() + 455
+                return 0
+
+            r = cells.RuleCell(None, rule, memo=4)
+            self.assertEqual(r.getvalue(), 555)
+            mode.set("other")
+            dead_id = source["t"]._node.id
+            del source["t"]
+            gc.collect()
+            intruder = cells.InputCell(None, value=100)
+            self.assertEqual(intruder._graphnode().id, dead_id)
+            source["t"] = cells.InputCell(None, value=7)
+            mode.set("t")
+            self.assertEqual(r.getvalue(), 462)
+            self.assertEqual(runlog, ["t", "other", "t"])
+            intruder.set(5)             # r doesn't read it
+            self.assertEqual(runlog, ["t", "other", "t"])
+
+    def test_7_LookupDoesntForceRules(self):
+        with cells.World():             # so ratio's id is below mode's
+            den = cells.InputCell(None, value=2)
+            ratio = cells.AlwaysLazyCell(None,
+                                         lambda s, p: 10 / den.getvalue())
+            ratio._graphnode()
+            mode = cells.InputCell(None, value="ratio")
+
+            def rule(owner, prev):
+                if mode.getvalue() == "ratio":
+                    return ratio.getvalue()
+                return mode.getvalue()
+
+            r = cells.RuleCell(None, rule, memo=4)
+            self.assertEqual(r.getvalue(), 5)
+            mode.set("b")
+            den.set(0)                  # ratio would raise now
+            mode.set("c")
+            self.assertEqual(r.getvalue(), "c")
+
+if __name__ == "__main__":
+    unittest.main()
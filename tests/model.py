@@ -38,6 +38,10 @@ And now, the model:
 
    These cells may be overridden by the normal cell override, or
    at class creation time.
+
+9. Models may be made in bulk, from rows or columns of constructor
+   keywords; their cells are evaluated, and then their observers run,
+   once all of them are made.
 """
 
 class SimpleModelTests(unittest.TestCase):
@@ -125,6 +129,66 @@ class SimpleModelTests(unittest.TestCase):
         self.failUnless(o.a == 10)
         self.failUnless(self.modified_a_ran)
 
+    def test_InitFollowsClassChanges(self):
+        "Cells added to a class (or its bases) after use are initialized"
+        class Sub(self.M):
+            pass
+        Sub()
+        self.M.y = cells.makecell(rule=lambda s, p: s.x * 2)
+        self.M.y.name = "y"
+        n = Sub()
+        self.assertTrue("y" in n.__dict__)  # run at init
+        self.assertEqual(n.y, 10)
+
+    def test_OverrideCelltypeAtInit(self):
+        "A cell overridden to be always-lazy isn't run at init"
+        self.M()
+        self.a_ran = False
+        m = self.M(a={'celltype': cells.AlwaysLazyCell})
+        self.assertFalse(self.a_ran)
+        self.assertEqual(m.a, 6)
+
+    def test_AttributeAccess(self):
+        "Cell attributes read as values, containers as cells"
+        class Box(self.M):
+            items = cells.makecell(value={}, celltype=cells.DictCell)
+            lazy = cells.makecell(rule=lambda s, p: s.x * 3,
+                                  celltype=cells.AlwaysLazyCell)
+        self.assertTrue(isinstance(Box.x, cells.CellAttr))
+        b = Box()
+        self.assertTrue("lazy" not in b.__dict__)  # built when first read
+        self.assertEqual(b.lazy, 15)
+        self.assertTrue(b.items is b.__dict__["items"])
+        b.x = 2
+        self.assertEqual((b.x, b.a, b.lazy), (2, 3, 6))
+
+    def test_SharedDefaults(self):
+        "Input cells left at their defaults are built when set or ruled on"
+        class Settings(cells.Model):
+            width = cells.makecell(value=10)
+            height = cells.makecell(value=20)
+            depth = cells.makecell(value=30)
+            @cells.fun2cell()
+            def area(model, prev):
+                return model.width * model.height
+
+        s = Settings(height=2)
+        self.assertEqual((s.width, s.height, s.depth, s.area), (10, 2, 30, 20))
+        self.assertTrue("depth" not in s.__dict__)   # never read by a rule
+        self.assertTrue("width" in s.__dict__)       # the rule read it
+        self.assertTrue("height" in s.__dict__)      # overridden
+        s.depth = 5
+        self.assertEqual(s.depth, 5)
+        self.assertEqual(Settings().depth, 30)
+        s.width = 3
+        self.assertEqual(s.area, 6)
+
+        @Settings.observer(attrib="depth")
+        def depth_obs(model):
+            self.depth_seen = model.depth
+        Settings()
+        self.assertEqual(self.depth_seen, 30)  # watched; built at init
+
     def test_hasName(self):
         self.failUnless(self.M().model_name == None)
 
@@ -276,6 +340,131 @@ class ObserverTests(unittest.TestCase):
         self.failUnless(1 == self.observerlog.count("model2"))
         self.failIf(self.observerlog.count("a"))
 
+    def test_ObserverPriority(self):
+        "Observers watching an attribute run in priority order"
+        class P(cells.Model):
+            x = cells.makecell(value=1)
+
+        for name, priority in (("low", 1), ("none", None), ("high", 10)):
+            def observe(model, name=name):
+                self.observerlog.append(name)
+            observe.__name__ = name
+            P.observer(attrib="x", priority=priority)(observe)
+
+        @P.observer(priority=5)
+        def everything(model):
+            self.observerlog.append("everything")
+
+        p = P()
+        self.observerlog = []
+        p.x = 2
+        self.assertEqual(self.observerlog,
+                         ["high", "everything", "low", "none"])
+
+    def test_ObserverAttribList(self):
+        "Observers may watch several attributes"
+        @self.M.observer(attrib=["x", "offset"])
+        def several_obs(model):
+            self.observerlog.append("several")
+
+        m = self.M()
+        self.failUnless(1 == self.observerlog.count("several"))
+        self.observerlog = []
+        m.x = 3
+        self.failUnless(1 == self.observerlog.count("several"))
+
+    def test_ObserverAddedLater(self):
+        "Models made after an observer is added have it"
+        self.m.x = 3
+        @self.M.observer(attrib="a")
+        def late_obs(model):
+            self.observerlog.append("late")
+
+        n = self.M()
+        self.observerlog = []
+        n.x = 4
+        self.failUnless(1 == self.observerlog.count("late"))
+
+
+class CreateManyTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+        self.observerlog = []
+
+        class Row(cells.Model):
+            a = cells.makecell(value=0)
+            b = cells.makecell(value=0)
+            lazy = cells.makecell(rule=lambda s, p: s.a * 100,
+                                  celltype=cells.AlwaysLazyCell)
+
+            @cells.fun2cell()
+            def total(model, prev):
+                return model.a + model.b
+
+        @Row.observer(attrib="total", newvalue=lambda v: v is not None and v > 5)
+        def big_total(model):
+            self.observerlog.append(("big", model.total))
+
+        @Row.observer()
+        def model_obs(model):
+            self.observerlog.append("model")
+
+        self.Row = Row
+        self.rows = [{"a": n, "b": n} for n in range(5)]
+
+    def test_CreateMany(self):
+        "create_many makes what a loop of constructor calls does"
+        made = self.Row.create_many(self.rows)
+        looped = [self.Row(**row) for row in self.rows]
+        self.assertEqual([m.total for m in made],
+                         [m.total for m in looped])
+        self.assertTrue("lazy" not in made[0].__dict__)
+        self.assertEqual(made[2].lazy, 200)
+        made[0].a = 10
+        self.assertEqual(made[0].total, 10)
+
+    def test_Overrides(self):
+        made = self.Row.create_many([{"total": lambda s, p: s.a * s.b},
+                                     {"lazy": {"celltype": cells.RuleCell}},
+                                     {"a": {"value": 3}}])
+        self.assertEqual(made[0].total, 0)
+        self.assertTrue("lazy" in made[1].__dict__)
+        self.assertEqual(made[2].total, 3)
+        self.assertRaises(cells.model.BadInitError, self.Row.create_many,
+                          [{"a": {"valu": 1}}])
+
+    def test_ObserversRunLast(self):
+        "Observers run once every model's cells are evaluated"
+        self.Row.create_many(self.rows)
+        # the new value test saw the evaluated totals
+        self.assertEqual(self.observerlog.count("model"), 5)
+        self.assertEqual([entry for entry in self.observerlog
+                          if entry != "model"],
+                         [("big", 6), ("big", 8)])
+
+    def test_CustomInit(self):
+        "Subclasses' constructors run as usual"
+        class Offset(self.Row):
+            def __init__(self, offset, **kwargs):
+                self.offset = offset
+                cells.Model.__init__(self, **kwargs)
+
+            @cells.fun2cell()
+            def total(model, prev):
+                return model.a + model.b + model.offset
+
+        made = Offset.create_many([{"offset": 10, "a": 1}])
+        self.assertEqual(made[0].total, 11)
+        self.assertRaises(cells.NonCellSetError, setattr, made[0],
+                          "offset", 1)
+
+    def test_CreateColumns(self):
+        made = self.Row.create_columns({"a": [1, 2], "b": [10, 20]})
+        self.assertEqual([m.total for m in made], [11, 22])
+        self.assertRaises(ValueError, self.Row.create_columns,
+                          {"a": [1, 2], "b": [10]})
+        self.assertEqual(self.Row.create_columns({}), [])
+
             
 if __name__ == "__main__":
     unittest.main()
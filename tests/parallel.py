@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+import unittest, sys
+sys.path += "../"
+import cells
+
+"""
+With an executor set, the rules of each height run on it together:
+
+1. Independent rules at one height run at the same time.
+
+2. The values computed are those a serial datapulse computes, and
+   rules still see the cells they read change.
+
+3. Observers fire in the same order as in a serial datapulse.
+
+4. An exception raised by a rule reaches the setter, and the cells
+   still work afterwards.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+class ParallelTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+        self.pool = ThreadPoolExecutor(4)
+        cells.set_executor(self.pool)
+
+    def tearDown(self):
+        cells.set_executor(None)
+        self.pool.shutdown()
+
+    def test_1_RulesRunConcurrently(self):
+        barrier = threading.Barrier(4, timeout=5)
+        x = cells.InputCell(None, 0, name="x")
+        def rule(s, p):
+            if x.getvalue():
+                barrier.wait()          # breaks unless all 4 are running
+            return x.getvalue()
+        fan = [cells.RuleCell(None, rule, name="f%d" % n) for n in range(4)]
+        for cell in fan:
+            cell.getvalue()
+        x.set(1)
+        self.assertEqual([cell.getvalue() for cell in fan], [1] * 4)
+
+    def test_2_SameValuesAsSerial(self):
+        def build():
+            x = cells.InputCell(None, 1, name="x")
+            flag = cells.InputCell(None, True, name="flag")
+            mids = [cells.RuleCell(None, (lambda k: lambda s, p:
+                                          x.getvalue() * k)(k), name="m")
+                    for k in range(10)]
+            pick = cells.RuleCell(None, lambda s, p:
+                                  mids[1].getvalue() if flag.getvalue()
+                                  else mids[2].getvalue(), name="pick")
+            total = cells.RuleCell(None, lambda s, p:
+                                   sum(m.getvalue() for m in mids) +
+                                   pick.getvalue(), name="total")
+            total.getvalue()
+            x.set(3)
+            flag.set(False)
+            x.set(4)
+            return total.getvalue()
+
+        parallel = build()
+        cells.set_executor(None)
+        self.assertEqual(parallel, build())
+        self.assertEqual(parallel, 4 * 45 + 8)
+
+    def test_3_ObserverOrder(self):
+        log = []
+        class M(cells.Model):
+            x = cells.makecell(value=1)
+            a = cells.makecell(rule=lambda s, p: s.x + 1)
+            b = cells.makecell(rule=lambda s, p: s.x + 2)
+            c = cells.makecell(rule=lambda s, p: s.a + s.b)
+
+        @M.observer(attrib="c")
+        def watch_c(model):
+            log.append("c")
+
+        @M.observer(attrib="a")
+        def watch_a(model):
+            log.append("a")
+
+        @M.observer(attrib="b")
+        def watch_b(model):
+            log.append("b")
+
+        m = M()
+        del log[:]
+        m.x = 5                         # in parallel
+        parallel = log[:]
+        cells.set_executor(None)
+        del log[:]
+        m.x = 6                         # the same graph, serially
+        self.assertEqual(sorted(log), ["a", "b", "c"])
+        self.assertEqual(log[-1], "c")  # above a and b
+        self.assertEqual(parallel, log)
+
+    def test_4_Exceptions(self):
+        x = cells.InputCell(None, 1, name="x")
+        def bad(s, p):
+            if x.getvalue() == 2:
+                raise ValueError
+            return x.getvalue()
+        cs = [cells.RuleCell(None, bad, name="bad"),
+              cells.RuleCell(None, lambda s, p: x.getvalue(), name="ok")]
+        for cell in cs:
+            cell.getvalue()
+        self.assertRaises(ValueError, x.set, 2)
+        x.set(3)
+        self.assertEqual([cell.getvalue() for cell in cs], [3, 3])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+
+import unittest, sys
+sys.path += "../"
+import cells
+
+"""
+A rule cell built with persist=True keeps its results in the store:
+
+1. A later process, with the store reopened, reuses a stored result
+   when the cells the rule read hold the same values, and doesn't
+   run the rule.
+
+2. A reused result depends on the cells its run read, so changing
+   one runs the rule again.
+
+3. Cells read from other models are found again through the
+   attribute holding the model. A model is keyed by its model_name;
+   models with different names don't share results, and a run which
+   read a model with no name isn't stored.
+
+4. The store stays under its size bound, evicting the least recently
+   used results, and counts hits, misses, writes, evictions and
+   skipped results.
+
+5. Results which can't be pickled, and runs which read cells that
+   can't be found again, aren't stored.
+
+6. An edited rule doesn't get the results of the rule it replaced,
+   even if only a constant in it changed.
+
+7. There's no default store; a persisted rule raises if none is set.
+
+8. Editing a helper function or a module-level constant a rule uses
+   changes the rule too, as does changing the version it's given as
+   persist.
+
+9. A stored result which can't be read back is counted as an error,
+   and the rule is run instead.
+
+10. The rule ids worked out for a model class don't keep it alive.
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+import weakref
+
+RUNS = []
+
+class Scaler(cells.Model):
+    x = cells.makecell(value=4)
+
+    @cells.fun2cell(persist=True)
+    def scaled(model, prev):
+        RUNS.append("scaled")
+        return model.x * 2
+Doubler = Scaler
+
+class Scaler(cells.Model):              # the same, the rule edited
+    x = cells.makecell(value=4)
+
+    @cells.fun2cell(persist=True)
+    def scaled(model, prev):
+        RUNS.append("scaled")
+        return model.x * 3
+Tripler = Scaler
+
+FACTOR = 2
+
+def bonus(x):
+    return x + 1
+
+def boosted(model, prev):
+    RUNS.append("boosted")
+    return bonus(model.x) * FACTOR
+
+def versioned(version):
+    """Returns a model class whose rule is persisted as C{version}"""
+    return type("Versioned", (cells.Model,), {
+        "x": cells.makecell(value=4),
+        "boosted": cells.makecell(rule=boosted, persist=version)})
+
+class PersistTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "results.sqlite")
+        self.old = cells.set_store(cells.Store(self.path))
+        self.runlog = []
+        runlog = self.runlog
+
+        class Site(cells.Model):
+            theme = cells.makecell(value="plain")
+
+        class Page(cells.Model):
+            source = cells.makecell(value="hello")
+            site = cells.makecell(value=None)
+
+            @cells.fun2cell(persist=True)
+            def html(model, prev):
+                runlog.append(model.source)
+                theme = model.site.theme if model.site else "none"
+                return "<%s>%s</%s>" % (theme, model.source, theme)
+
+        self.Site, self.Page = Site, Page
+
+    def tearDown(self):
+        cells.set_store(self.old).close()
+        shutil.rmtree(self.dir)
+
+    def restart(self, **kwargs):
+        """Reopens the store, as a new process would"""
+        cells.set_store(cells.Store(self.path, **kwargs)).close()
+        cells.reset()
+        cells.persist._rule_ids.clear()
+        return cells.persist.current_store()
+
+    def test_1_ReusedByALaterProcess(self):
+        self.Page()
+        self.assertEqual(self.runlog, ["hello"])
+        store = self.restart()
+        page = self.Page()
+        self.assertEqual(page.html, "<none>hello</none>")
+        self.assertEqual(self.runlog, ["hello"])
+        self.assertEqual((store.hits, store.misses), (1, 0))
+
+    def test_2_ReusedResultsKeepTheirDependencies(self):
+        self.Page()
+        self.restart()
+        page = self.Page()
+        page.source = "bye"
+        self.assertEqual(page.html, "<none>bye</none>")
+        page.source = "hello"           # stored, so not run
+        self.assertEqual(page.html, "<none>hello</none>")
+        self.assertEqual(self.runlog, ["hello", "bye"])
+
+    def test_3_ThroughAnotherModel(self):
+        self.Page(site=self.Site(model_name="main"))
+        self.restart()
+        site = self.Site(model_name="main")
+        page = self.Page(site=site)
+        self.assertEqual(page.html, "<plain>hello</plain>")
+        self.assertEqual(self.runlog, ["hello"])
+        site.theme = "dark"
+        self.assertEqual(page.html, "<dark>hello</dark>")
+        self.assertEqual(self.runlog, ["hello", "hello"])
+
+        other = self.Page(site=self.Site(model_name="other"))
+        self.assertEqual(other.html, "<plain>hello</plain>")
+        self.assertEqual(self.runlog, ["hello", "hello", "hello"])
+        store = self.restart()
+        self.Page(site=self.Site())     # no name, so not stored
+        self.assertEqual((store.writes, store.skipped), (0, 1))
+
+    def test_4_SizeBoundAndCounters(self):
+        store = self.restart(max_bytes=200)
+        page = self.Page()
+        for n in range(20):
+            page.source = "page %d" % n
+        stats = store.stats()
+        self.assertTrue(stats["bytes"] <= 200)
+        self.assertTrue(stats["evictions"] > 0)
+        self.assertEqual(stats["writes"], 21)
+        self.assertEqual(stats["entries"], 21 - stats["evictions"])
+        self.assertEqual((stats["hits"], stats["misses"]), (0, 21))
+        page.source = "page 18"         # still stored
+        page.source = "page 0"          # evicted
+        self.assertEqual(store.stats()["hits"], 1)
+        self.assertEqual(len(self.runlog), 22)
+
+    def test_5_Skipped(self):
+        elsewhere = self.Site()
+
+        class Unpicklable(cells.Model):
+            @cells.fun2cell(persist=True)
+            def thing(model, prev):
+                return lambda: None
+
+        class Unfindable(cells.Model):
+            @cells.fun2cell(persist=True)
+            def theme(model, prev):
+                return elsewhere.theme
+
+        Unpicklable()
+        Unfindable()
+        store = cells.persist.current_store()
+        self.assertEqual((store.skipped, store.writes), (2, 0))
+
+    def test_6_EditedRule(self):
+        del RUNS[:]
+        self.assertEqual(Doubler().scaled, 8)
+        self.restart()
+        self.assertEqual(Tripler().scaled, 12)
+        self.assertEqual(RUNS, ["scaled", "scaled"])
+        self.assertEqual(Doubler().scaled, 8)   # still stored
+        self.assertEqual(RUNS, ["scaled", "scaled"])
+
+    def test_7_NoDefaultStore(self):
+        store = cells.set_store(None)
+        try:
+            self.assertRaises(cells.StoreNotSetError, self.Page)
+        finally:
+            cells.set_store(store)
+
+    def test_8_EditedHelpersAndVersions(self):
+        global FACTOR, bonus
+        del RUNS[:]
+        self.assertEqual(versioned(True)().boosted, 10)
+        self.restart()
+        self.assertEqual(versioned(True)().boosted, 10)
+        self.assertEqual(RUNS, ["boosted"])
+        old = FACTOR, bonus
+        try:
+            FACTOR = 3
+            self.restart()
+            self.assertEqual(versioned(True)().boosted, 15)
+            FACTOR = 2
+            bonus = lambda x: x + 2
+            self.restart()
+            self.assertEqual(versioned(True)().boosted, 12)
+        finally:
+            FACTOR, bonus = old
+        self.assertEqual(RUNS, ["boosted"] * 3)
+        self.restart()
+        self.assertEqual(versioned("2")().boosted, 10)
+        self.assertEqual(RUNS, ["boosted"] * 4)
+
+    def test_9_UnreadableResults(self):
+        self.Page()
+        store = self.restart()
+        store.db.execute("UPDATE results SET value = ?", (b"junk",))
+        page = self.Page()
+        self.assertEqual(page.html, "<none>hello</none>")
+        self.assertEqual(self.runlog, ["hello", "hello"])
+        self.assertEqual((store.errors, store.hits, store.misses),
+                         (1, 0, 1))
+
+    def test_10_RuleIdsDontKeepClasses(self):
+        self.Page()
+        page = weakref.ref(self.Page)
+        self.assertTrue(self.Page in cells.persist._rule_ids)
+        del self.Page
+        cells.reset()
+        gc.collect()
+        self.assertEqual(page(), None)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+import unittest, sys
+sys.path += "../"
+import cells
+
+"""
+cells.profile() records what each cell's rule costs:
+
+1. Cells are grouped by model class and attribute name; each group
+   counts rule runs, changed and unchanged outcomes, currency checks
+   and fan-out.
+
+2. A rule's self time leaves out the rules it pulled up to date; its
+   cumulative time includes them.
+
+3. The report can be printed sorted on any column, and read by
+   pstats.
+
+4. The profiler is only installed inside the with block.
+"""
+
+import io
+import os
+import pstats
+import tempfile
+
+class ProfilerTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+
+        class Row(cells.Model):
+            x = cells.makecell(value=1)
+            @cells.fun2cell()
+            def parity(model, prev):
+                return model.x % 2
+            @cells.fun2cell()
+            def label(model, prev):
+                return "odd" if model.parity else "even"
+
+        self.rows = [Row() for n in range(3)]
+
+    def test_1_Counters(self):
+        with cells.profile() as p:
+            for row in self.rows:
+                row.x = 2               # parity and label change
+                row.x = 4               # parity doesn't
+        self.assertEqual(p.datapulses, 6)
+        self.assertEqual(sorted(s.name for s in p.cells.values()),
+                         ["Row.label", "Row.parity", "Row.x"])
+        parity = [s for s in p.cells.values() if s.name == "Row.parity"][0]
+        self.assertEqual((parity.runs, parity.changed, parity.unchanged),
+                         (6, 3, 3))
+        self.assertEqual(parity.fanout, 3)  # to label, three times
+        self.assertEqual(parity.checks, 6)  # label verifies, then reads it
+        x = [s for s in p.cells.values() if s.name == "Row.x"][0]
+        self.assertEqual((x.runs, x.fanout), (0, 6))
+
+    def test_2_SelfAndCumulativeTime(self):
+        inner = cells.RuleCell(None, lambda m, p: sum(range(20000)),
+                               name="inner")
+        outer = cells.RuleCell(None, lambda m, p: inner.getvalue() + 1,
+                               name="outer")
+        with cells.profile() as p:
+            outer.getvalue()            # runs inner from inside outer
+        stats = dict((s.name, s) for s in p.cells.values())
+        self.assertAlmostEqual(stats["outer"].selftime +
+                               stats["inner"].cumtime,
+                               stats["outer"].cumtime)
+        self.assertEqual(stats["inner"].selftime, stats["inner"].cumtime)
+        self.assertEqual(list(stats["inner"].callers), [stats["outer"]])
+
+    def test_3_Reports(self):
+        with cells.profile() as p:
+            for row in self.rows:
+                row.x = 2
+        out = io.StringIO()
+        p.print_stats(sort="runs", limit=2, out=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)   # summary, blank, header, 2 cells
+        self.assertEqual(lines[3].split()[0], "3")
+        self.assertRaises(ValueError, p.print_stats, sort="bogus")
+
+        funcs = pstats.Stats(p).stats
+        self.assertEqual(sorted(func[2] for func in funcs),
+                         ["Row.label", "Row.parity"])
+
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            p.dump_stats(filename)
+            self.assertEqual(len(pstats.Stats(filename).stats), 2)
+        finally:
+            os.remove(filename)
+
+    def test_4_OnlyInsideTheBlock(self):
+        with cells.profile() as p:
+            self.rows[0].x = 2
+        self.rows[0].x = 3
+        parity = [s for s in p.cells.values() if s.name == "Row.parity"][0]
+        self.assertEqual(parity.runs, 1)
+
+if __name__ == "__main__":
+    unittest.main()
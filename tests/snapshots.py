@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+import unittest, sys
+sys.path += "../"
+import cells
+
+"""
+cells.snapshot captures models, and cells.restore rebuilds them:
+
+1. Restored models hold the values, overrides and non-cell
+   attributes the originals did, and no rule runs to restore them.
+
+2. The dependency graph is restored, so the restored models
+   propogate changes as the originals would.
+
+3. Models the snapshotted ones read from, or hold in their cells, are
+   snapshotted too.
+
+4. Snapshots of unpicklable state, and blobs which aren't snapshots,
+   are refused.
+
+5. No rule runs to restore any type of cell, not even those whose
+   constructors run their rules.
+
+6. Cells which were stale when snapshotted, lazy ones and those of
+   pull-mode models, come back stale: read, they rerun.
+"""
+
+RUNS = []
+
+def double_x(model, prev):
+    RUNS.append("doubled")
+    return model.x * 2
+
+def scale_doubled(model, prev):
+    RUNS.append("scaled")
+    return model.doubled * model.hub.scale
+
+class Hub(cells.Model):
+    scale = cells.makecell(value=3)
+
+class Spoke(cells.Model):
+    x = cells.makecell(value=1)
+    hub = cells.makecell(value=None)
+    doubled = cells.makecell(rule=double_x)
+    scaled = cells.makecell(rule=scale_doubled)
+    lazy = cells.makecell(rule=double_x, celltype=cells.AlwaysLazyCell)
+
+def seeded(model, prev):
+    RUNS.append("seeded")
+    return model.x + 100
+
+async def fetched(model, prev):
+    RUNS.append("fetched")
+    return model.x + 1
+
+class Every(cells.Model):
+    x = cells.makecell(value=1)
+    rule = cells.makecell(rule=double_x)
+    seed = cells.makecell(rule=seeded, celltype=cells.RuleThenInputCell)
+    once = cells.makecell(rule=seeded, celltype=cells.OnceAskedLazyCell)
+    until = cells.makecell(rule=seeded, celltype=cells.UntilAskedLazyCell)
+    always = cells.makecell(rule=seeded, celltype=cells.AlwaysLazyCell)
+    table = cells.makecell(celltype=cells.DictCell)
+    items = cells.makecell(celltype=cells.ListCell)
+    fetch = cells.makecell(rule=fetched)
+
+def tenfold(model, prev):
+    RUNS.append("tenfold")
+    return model.x * 10
+
+def triple(model, prev):
+    RUNS.append("triple")
+    return model.x * 3
+
+class Lazy(cells.Model):
+    x = cells.makecell(value=2)
+    lazy = cells.makecell(rule=tenfold, celltype=cells.AlwaysLazyCell)
+
+class Pulled(cells.Model):
+    evaluation = "pull"
+    x = cells.makecell(value=1)
+    tripled = cells.makecell(rule=triple)
+
+class Kid(cells.Family):
+    x = cells.makecell(value=1)
+
+class Parent(cells.Family):
+    kid_slots = cells.makecell(value=Kid)
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+        self.hub = Hub()
+        self.spokes = [Spoke(hub=self.hub, x=n) for n in range(3)]
+        del RUNS[:]
+
+    def test_1_NoRulesRun(self):
+        self.spokes[1].offset = 7
+        blob = cells.snapshot(self.spokes)
+        spokes = cells.restore(blob)
+        self.assertEqual(RUNS, [])
+        self.assertEqual([s.scaled for s in spokes], [0, 6, 12])
+        self.assertEqual(spokes[1].offset, 7)
+        self.assertEqual(RUNS, [])
+        self.assertTrue("lazy" not in spokes[0].__dict__)
+        self.assertEqual(spokes[2].lazy, 4)
+        self.assertRaises(cells.NonCellSetError, setattr, spokes[1],
+                          "offset", 8)
+
+    def test_2_Propogates(self):
+        spokes = cells.restore(cells.snapshot(self.spokes))
+        spokes[1].x = 10
+        self.assertEqual(RUNS, ["doubled", "scaled"])
+        self.assertEqual(spokes[1].scaled, 60)
+        spokes[0].hub.scale = 1         # the restored hub
+        self.assertEqual([s.scaled for s in spokes], [0, 20, 4])
+        self.assertEqual(self.spokes[1].scaled, 6)   # originals untouched
+
+    def test_3_Connected(self):
+        spoke = cells.restore(cells.snapshot(self.spokes[2]))
+        self.assertTrue(isinstance(spoke.hub, Hub))
+        self.assertTrue(spoke.hub is not self.hub)
+
+        p = Parent()
+        for n in range(3):
+            p.make_kid(Kid)
+        p.kids[2].x = 5
+        kid = cells.restore(cells.snapshot(p.kids[0]))
+        self.assertEqual([k.x for k in kid.parent.kids], [1, 1, 5])
+        self.assertTrue(kid.parent.kids[0] is kid)
+
+    def test_4_Refused(self):
+        odd = Spoke(hub=self.hub, doubled=lambda model, prev: 0)
+        self.assertRaises(cells.SnapshotError, cells.snapshot, odd)
+        self.assertRaises(cells.SnapshotError, cells.restore, b"junk")
+
+    def test_5_NoRulesRunForAnyCellType(self):
+        every = Every()
+        every.table["k"] = 1
+        every.items.append(2)
+        every.x = 5
+        every.always
+        blob = cells.snapshot(every)
+        del RUNS[:]
+        restored = cells.restore(blob)
+        self.assertEqual(RUNS, [])
+        self.assertEqual((restored.rule, restored.seed, restored.always),
+                         (10, 101, 105))
+        self.assertEqual((dict(restored.table), list(restored.items)),
+                         ({"k": 1}, [2]))
+        self.assertEqual(RUNS, [])
+        restored.table["k"] = 2
+        self.assertEqual(restored.table.changes,
+                         [cells.DictChange("k", 1, 2, "set")])
+        restored.x = 6
+        self.assertEqual(restored.fetch, 7)
+        self.assertEqual(restored.seed, 101)   # an input now
+
+    def test_6_StaleCellsRerun(self):
+        lazy, pulled = Lazy(), Pulled()
+        self.assertEqual((lazy.lazy, pulled.tripled), (20, 3))
+        lazy.x = 5
+        pulled.x = 4                    # neither read since
+        lazy, pulled = cells.restore(cells.snapshot([lazy, pulled]))
+        del RUNS[:]
+        self.assertEqual((lazy.lazy, pulled.tripled), (50, 12))
+        self.assertEqual(RUNS, ["tenfold", "triple"])
+        self.assertEqual((lazy.lazy, pulled.tripled), (50, 12))
+        self.assertEqual(RUNS, ["tenfold", "triple"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+import unittest, sys
+sys.path += "../"
+import cells
+
+"""
+A tracer installed with cells.set_tracer hears about propogation:
+
+1. on_set for each set which changes a cell, on_propagate once per
+   datapulse, on_run for each rule run and on_observer for each
+   observer which fires, in that order.
+
+2. set_tracer returns the tracer it replaced; with None installed
+   nothing is reported.
+
+3. Rules run on an executor are reported too.
+
+4. PrintTracer prints a line per event.
+
+5. Hooks a tracer doesn't override aren't called, and any object
+   with the hook methods can be a tracer.
+"""
+
+class Recorder(cells.Tracer):
+    def __init__(self):
+        self.events = []
+
+    def on_set(self, cell, value):
+        self.events.append(("set", cell.name, value))
+
+    def on_run(self, cell, changed, elapsed):
+        assert elapsed >= 0
+        self.events.append(("run", cell.name, changed))
+
+    def on_propagate(self, world, changed):
+        self.events.append(("propagate", world.dp,
+                            [cell.name for cell in changed]))
+
+    def on_observer(self, observer, model, elapsed):
+        self.events.append(("observer", observer.func.__name__))
+
+
+class TracingTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+
+        class M(cells.Model):
+            x = cells.makecell(value=1)
+            @cells.fun2cell()
+            def parity(model, prev):
+                return model.x % 2
+            @cells.fun2cell()
+            def label(model, prev):
+                return "odd" if model.parity else "even"
+
+        @M.observer(attrib="label")
+        def label_obs(model):
+            pass
+
+        self.M = M
+        self.recorder = Recorder()
+
+    def tearDown(self):
+        cells.set_tracer(None)
+
+    def test_1_Events(self):
+        m = self.M()
+        cells.set_tracer(self.recorder)
+        dp = cells.cellenv.dp
+        m.x = 2
+        m.x = 2                         # no change; not reported
+        m.x = 4                         # parity doesn't change
+        self.assertEqual(self.recorder.events, [
+            ("set", "x", 2),
+            ("propagate", dp + 1, ["x"]),
+            ("run", "parity", True),
+            ("observer", "label_obs"),
+            ("run", "label", True),
+            ("set", "x", 4),
+            ("propagate", dp + 2, ["x"]),
+            ("run", "parity", False),
+        ])
+
+    def test_2_SetTracerReturnsTheOldOne(self):
+        self.assertTrue(cells.set_tracer(self.recorder) is None)
+        other = Recorder()
+        self.assertTrue(cells.set_tracer(other) is self.recorder)
+        self.assertTrue(cells.set_tracer(None) is other)
+        m = self.M()
+        m.x = 5
+        self.assertEqual(self.recorder.events, [])
+        self.assertEqual(other.events, [])
+
+    def test_3_ExecutorRuns(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        class Wide(cells.Model):
+            x = cells.makecell(value=1)
+            a = cells.makecell(rule=lambda s, p: s.x + 1)
+            b = cells.makecell(rule=lambda s, p: s.x + 2)
+
+        w = Wide()
+        pool = ThreadPoolExecutor(2)
+        cells.set_executor(pool)
+        try:
+            cells.set_tracer(self.recorder)
+            w.x = 10
+        finally:
+            cells.set_executor(None)
+            pool.shutdown()
+        runs = sorted(event for event in self.recorder.events
+                      if event[0] == "run")
+        self.assertEqual(runs, [("run", "a", True), ("run", "b", True)])
+
+    def test_4_PrintTracer(self):
+        import io
+        out = io.StringIO()
+        m = self.M()
+        cells.set_tracer(cells.PrintTracer(out))
+        m.x = 2
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[0].endswith("x setting to 2"))
+        self.assertTrue(lines[-1].endswith("label ran; changed."))
+
+    def test_5_OnlyOverriddenHooksAreCalled(self):
+        from cells import trace
+        cells.set_tracer(self.recorder)  # no on_check or on_start
+        self.assertTrue(trace.checker is None)
+        self.assertTrue(trace.runner is self.recorder)
+        cells.set_tracer(cells.Tracer())
+        self.assertTrue(trace.runner is None)
+
+        class Checks(object):             # not a Tracer
+            def __init__(self):
+                self.checked = []
+            def on_check(self, cell):
+                self.checked.append(cell.name)
+            def on_start(self, cell):
+                pass
+            def on_run(self, cell, changed, elapsed):
+                pass
+            def on_set(self, cell, value):
+                pass
+            def on_propagate(self, world, changed):
+                pass
+            def on_observer(self, observer, model, elapsed):
+                pass
+
+        checks = Checks()
+        m = self.M()
+        cells.set_tracer(checks)
+        m.x = 2
+        self.assertTrue("parity" in checks.checked)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+import unittest, sys
+sys.path += "../"
+import cells
+
+"""
+Transactions gather many sets into a single datapulse:
+
+1. Sets inside a transaction are buffered; reads inside it see the
+   values from before it.
+
+2. On commit, the buffered sets are applied in one datapulse, and
+   each dependent rule runs once no matter how many of its inputs
+   changed.
+
+3. Observers fire once, at commit.
+
+4. If the transaction's block raises, the buffered sets are dropped.
+
+5. Transactions nest; only the outermost commits.
+
+6. A transaction may be used as a decorator.
+
+7. Sets made by observers during the commit get a datapulse of
+   their own.
+
+8. A cell set and then set back to its value from before the
+   transaction isn't propogated.
+
+9. If a nested block raises and the enclosing block catches it, only
+   the nested block's sets are dropped.
+"""
+
+class TransactionTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+        self.runlog = []
+        self.observerlog = []
+
+        class M(cells.Model):
+            x = cells.makecell(value=1)
+            y = cells.makecell(value=2)
+            l = cells.makecell(celltype=cells.ListCell)
+
+            @cells.fun2cell()
+            def total(model, prev):
+                self.runlog.append("total")
+                return model.x + model.y + len(model.l)
+
+        @M.observer(attrib="total")
+        def total_obs(model):
+            self.observerlog.append(model.total)
+
+        @M.observer(attrib="x", oldvalue=lambda v: v == 1)
+        def x_was_one_obs(model):
+            self.observerlog.append("x was 1")
+
+        self.m = M()
+        self.runlog = []
+        self.observerlog = []
+
+    def test_1_SetsAreBuffered(self):
+        with cells.transaction():
+            self.m.x = 10
+            self.assertEqual(self.m.x, 1)
+            self.assertEqual(self.m.total, 3)
+        self.assertEqual(self.m.x, 10)
+
+    def test_2_OneDatapulse(self):
+        dp = cells.cellenv.dp
+        with cells.transaction():
+            self.m.x = 10
+            self.m.y = 20
+            self.m.l.append("foo")
+        self.assertEqual(cells.cellenv.dp, dp + 1)
+        self.assertEqual(self.runlog, ["total"])
+        self.assertEqual(self.m.total, 31)
+
+    def test_3_ObserversFireOnceAtCommit(self):
+        with cells.transaction():
+            self.m.x = 10
+            self.m.x = 11
+            self.m.y = 20
+            self.assertEqual(self.observerlog, [])
+        self.assertEqual(self.observerlog.count(31), 1)
+        # the old value observers see is the one from before the
+        # transaction
+        self.assertEqual(self.observerlog.count("x was 1"), 1)
+
+    def test_4_RaisingDiscards(self):
+        try:
+            with cells.transaction():
+                self.m.x = 10
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(self.m.x, 1)
+        self.assertEqual(self.runlog, [])
+        self.m.x = 5                    # and the cells still work
+        self.assertEqual(self.m.total, 7)
+
+    def test_5_Nesting(self):
+        with cells.transaction():
+            with cells.batch():
+                self.m.x = 10
+            self.assertEqual(self.m.x, 1)
+            self.m.y = 20
+        self.assertEqual(self.runlog, ["total"])
+        self.assertEqual(self.m.total, 30)
+
+    def test_6_Decorator(self):
+        @cells.transaction()
+        def move(m, x, y):
+            m.x = x
+            m.y = y
+
+        move(self.m, 10, 20)
+        self.assertEqual(self.runlog, ["total"])
+        move(self.m, 3, 4)
+        self.assertEqual(self.runlog, ["total", "total"])
+        self.assertEqual(self.m.total, 7)
+
+    def test_7_SetsDuringCommitDefer(self):
+        "A set made by an observer during the commit gets its own datapulse"
+        @self.m.__class__.observer(attrib="y")
+        def y_obs(model):
+            model.x = model.y * 2
+
+        m = self.m.__class__()
+        self.runlog = []
+        with cells.transaction():
+            m.y = 5
+        self.assertEqual(m.x, 10)
+        self.assertEqual(m.total, 15)
+
+    def test_8_SetBackIsNoChange(self):
+        dp = cells.cellenv.dp
+        with cells.transaction():
+            self.m.x = 10
+            self.m.x = 1
+        self.assertEqual((self.runlog, self.observerlog), ([], []))
+        self.assertEqual(cells.cellenv.dp, dp)
+        with cells.transaction():
+            self.m.x = 10
+            self.m.x = 1
+            self.m.y = 20
+        self.assertEqual(self.runlog, ["total"])
+        self.assertEqual(self.observerlog, [21])   # no "x was 1"
+
+    def test_9_RaisingNestedBlockDiscardsItsOwnSets(self):
+        with cells.transaction():
+            self.m.y = 20
+            try:
+                with cells.transaction():
+                    self.m.x = 10
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual((self.m.x, self.m.y), (1, 20))
+        self.assertEqual(self.runlog, ["total"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+import unittest, sys
+sys.path += "../"
+import cells
+
+"""
+Worlds are independent dependency graphs:
+
+1. Models and cells belong to the world current when they're created;
+   outside of any world, the default one (cells.cellenv).
+
+2. Each world has its own datapulse counter; propogating in one
+   doesn't touch another's.
+
+3. Resetting a world, or opening a transaction in it, affects only
+   that world.
+
+4. Worlds may be driven from different threads at once.
+
+5. Dropping a world and its models frees their cells.
+"""
+
+class WorldTests(unittest.TestCase):
+    def setUp(self):
+        cells.reset()
+
+        class M(cells.Model):
+            x = cells.makecell(value=1)
+            @cells.fun2cell()
+            def double(model, prev):
+                return model.x * 2
+
+        self.M = M
+
+    def test_1_Membership(self):
+        w = cells.World()
+        self.assertTrue(cells.current_world() is cells.cellenv)
+        with w:
+            self.assertTrue(cells.current_world() is w)
+            m = self.M()
+            c = cells.InputCell(None, 1, name="c")
+        self.assertTrue(cells.current_world() is cells.cellenv)
+        self.assertTrue(m._world is w)
+        self.assertTrue(m.__dict__["double"].world is w)
+        self.assertTrue(c.world is w)
+        self.assertTrue(self.M()._world is cells.cellenv)
+
+    def test_2_IndependentDatapulses(self):
+        w1, w2 = cells.World(), cells.World()
+        with w1:
+            m1 = self.M()
+        with w2:
+            m2 = self.M()
+        default_dp = cells.cellenv.dp
+        for n in range(5):
+            m1.x = n + 10
+        m2.x = 3
+        self.assertEqual(w1.dp, 6)
+        self.assertEqual(w2.dp, 2)
+        self.assertEqual(cells.cellenv.dp, default_dp)
+        self.assertEqual((m1.double, m2.double), (28, 6))
+
+    def test_3_ResetAndTransactionsAreLocal(self):
+        w = cells.World()
+        with w:
+            m1 = self.M()
+        m2 = self.M()
+        with cells.transaction(world=w):
+            m1.x = 7
+            m2.x = 7                    # not buffered; other world
+            self.assertEqual((m1.double, m2.double), (2, 14))
+        self.assertEqual(m1.double, 14)
+
+        default_dp = cells.cellenv.dp
+        with w:
+            cells.reset()
+        self.assertEqual(w.dp, 1)
+        self.assertEqual(cells.cellenv.dp, default_dp)
+
+    def test_4_Threads(self):
+        import threading
+        results = {}
+        def work(n):
+            with cells.World():
+                m = self.M()
+                for i in range(200):
+                    m.x = i * n
+                results[n] = m.double
+        threads = [threading.Thread(target=work, args=(n,))
+                   for n in range(1, 5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, dict((n, 398 * n) for n in range(1, 5)))
+
+    def test_5_DroppingAWorldFreesIt(self):
+        import weakref, gc
+        w = cells.World()
+        with w:
+            m = self.M()
+        ref = weakref.ref(m.__dict__["double"])
+        del w, m
+        gc.collect()
+        self.assertTrue(ref() is None)
+
+if __name__ == "__main__":
+    unittest.main()